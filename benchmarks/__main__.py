@@ -0,0 +1,47 @@
+import argparse
+import json
+import sys
+
+from benchmarks.harness import BENCHMARKS, best, compare
+import benchmarks.bench_client # noqa: F401 (registers benchmarks)
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run pyjiit benchmarks")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (all if empty)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", nargs="+", help="baseline results files to compare against (best value of each metric)")
+    parser.add_argument("--results", nargs="+", help="use the best values of these results files instead of running")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    if args.results:
+        results = best([load(path) for path in args.results])
+        for name, result in results.items():
+            print(f"{name:45} {result['value']:12.2f} {result['unit']}")
+    else:
+        results = {}
+        for name in args.names or list(BENCHMARKS):
+            for result in BENCHMARKS[name]():
+                results[result.name] = result.to_json()
+                print(f"{result.name:45} {result.value:12.2f} {result.unit}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, best([load(path) for path in args.compare]), args.tolerance)
+        for message in regressions:
+            print("REGRESSION", message)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
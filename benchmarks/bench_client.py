@@ -0,0 +1,222 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+from benchmarks.harness import Result, benchmark, import_time, per_call, throughput
+from pyjiit import Webportal, AsyncWebportal
+from pyjiit.default import CAPTCHA
+from pyjiit.encryption import generate_local_name, serialize_payload, deserialize_payload
+from pyjiit.fakeportal import FakePortal
+from pyjiit.transport import RequestsTransport
+
+
+@benchmark("startup")
+def bench_startup():
+    # cold imports, what a short lived worker pays before its first request
+    return [
+        Result("startup.import_pyjiit", import_time("import pyjiit"), "us"),
+        Result("startup.import_webportal", import_time("from pyjiit import Webportal"), "us"),
+        Result("startup.first_login_payload", import_time(
+            "from pyjiit.default import CAPTCHA; from pyjiit.encryption import serialize_payload; serialize_payload(CAPTCHA.payload())"
+        ), "us"),
+    ]
+
+
+@benchmark("encryption")
+def bench_encryption():
+    payload = {"username": "21103000", "usertype": "S", "captcha": CAPTCHA.payload()}
+    encrypted = serialize_payload(payload)
+
+    return [
+        Result("encryption.generate_local_name", per_call(generate_local_name, 5000), "us/call"),
+        Result("encryption.serialize_payload", per_call(lambda: serialize_payload(payload), 5000), "us/call"),
+        Result("encryption.deserialize_payload", per_call(lambda: deserialize_payload(encrypted), 5000), "us/call"),
+    ]
+
+
+@benchmark("overhead")
+def bench_overhead():
+    # in-process transport: only the client side work (headers, encryption, json, parsing) is measured
+    portal = FakePortal()
+    w = Webportal(portal.transport(), api=portal.url)
+    w.student_login("user", "password", CAPTCHA)
+    meta = w.get_attendance_meta()
+    header, semester = meta.latest_header(), meta.latest_semester()
+
+    results = [
+        Result("overhead.get_attendance_meta", per_call(w.get_attendance_meta, 500), "us/call"),
+        Result("overhead.get_attendance_detail", per_call(lambda: w.get_attendance_detail(header, semester), 200), "us/call"),
+    ]
+    portal.stop()
+    return results
+
+
+@benchmark("roundtrip")
+def bench_roundtrip():
+    with FakePortal() as portal:
+        w = Webportal(RequestsTransport(), api=portal.url)
+        w.student_login("user", "password", CAPTCHA)
+
+        return [Result("roundtrip.get_attendance_meta", per_call(w.get_attendance_meta, 200), "us/call")]
+
+
+@benchmark("login")
+def bench_login():
+    n, workers = 200, 8
+    with FakePortal() as portal:
+        transport = RequestsTransport(pool_size=workers)
+
+        def login(i):
+            Webportal(transport, api=portal.url).student_login(f"user{i}", "password", CAPTCHA)
+
+        def run():
+            with ThreadPoolExecutor(workers) as pool:
+                list(pool.map(login, range(n)))
+
+        return [Result("login.throughput_8_threads", throughput(run, n), "logins/s", True)]
+
+
+@benchmark("fanout")
+def bench_fanout():
+    # every call waits 20ms on the server, so this measures how well the calls overlap
+    semesters = 12
+    with FakePortal(latency=0.02, semesters=semesters) as portal:
+        w = Webportal(RequestsTransport(), api=portal.url)
+        w.student_login("user", "password", CAPTCHA)
+
+        return [
+            Result("fanout.get_all_attendance", throughput(lambda: w.get_all_attendance(max_workers=8), semesters), "semesters/s", True),
+        ]
+
+
+@benchmark("threads")
+def bench_threads():
+    # one shared client, every call waits 20ms on the server, so throughput should grow with the threads
+    calls = 240
+    with FakePortal(latency=0.02) as portal:
+        w = Webportal(RequestsTransport(pool_size=16), api=portal.url)
+        w.student_login("user", "password", CAPTCHA)
+        meta = w.get_attendance_meta()
+        header, semester = meta.latest_header(), meta.latest_semester()
+
+        def run(threads):
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(lambda _: w.get_attendance(header, semester), range(calls)))
+
+        results = [
+            Result(f"threads.shared_client_{n}", throughput(lambda: run(n), calls), "calls/s", True) for n in (1, 4, 16)
+        ]
+        w.close()
+        return results
+
+
+@benchmark("async")
+def bench_async():
+    try:
+        from pyjiit.transport import AiohttpTransport
+        AiohttpTransport()
+    except ImportError:
+        return []
+
+    students = 50
+    with FakePortal(latency=0.02) as portal:
+        async def run():
+            transport = AiohttpTransport(pool_size=100)
+            clients = [AsyncWebportal(transport, api=portal.url) for _ in range(students)]
+            await asyncio.gather(*[c.student_login(f"user{i}", "password", CAPTCHA) for i, c in enumerate(clients)])
+            await asyncio.gather(*[c.get_attendance_meta() for c in clients])
+            await transport.close()
+
+        # two logins and one meta call per student
+        return [Result("async.concurrent_sessions", throughput(lambda: asyncio.run(run()), 3 * students), "requests/s", True)]
+
+
+@benchmark("replay")
+def bench_replay():
+    # a recorded session served back at full speed, so only pyjiit's own work (and parsing) is measured
+    import os
+    import tempfile
+    from pyjiit.cassette import Cassette, RecordingTransport, ReplayTransport
+
+    portal = FakePortal(subjects=12)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.cassette")
+        with Cassette(path) as cassette:
+            w = Webportal(RecordingTransport(portal.transport(), cassette), api=portal.url)
+            w.student_login("user", "password", CAPTCHA)
+            w.get_attendance_detail(w.get_attendance_meta().latest_header(), w.get_attendance_meta().latest_semester())
+            w.get_registered_subjects_and_faculties(w.get_registered_semesters()[0])
+
+        w = Webportal(ReplayTransport(path), api=portal.url)
+        w.student_login("user", "password", CAPTCHA)
+        meta = w.get_attendance_meta()
+        header, semester = meta.latest_header(), meta.latest_semester()
+        registered = w.get_registered_semesters()[0]
+
+    return [
+        Result("replay.get_attendance_meta", per_call(w.get_attendance_meta, 500), "us/call"),
+        Result("replay.get_attendance_detail", per_call(lambda: w.get_attendance_detail(header, semester), 500), "us/call"),
+        Result("replay.get_registrations", per_call(lambda: w.get_registered_subjects_and_faculties(registered), 500), "us/call"),
+    ]
+
+
+@benchmark("analytics")
+def bench_analytics():
+    # 10k students built from a few real shaped responses, only the batch computations are timed
+    from pyjiit.analytics import AttendanceTable
+    from pyjiit.attendance import AttendanceDetail
+
+    portal = FakePortal(subjects=8)
+    responses = []
+    for i in range(16):
+        w = Webportal(portal.transport(), api=portal.url)
+        w.student_login(f"user{i}", "password", CAPTCHA)
+        meta = w.get_attendance_meta()
+        responses.append(AttendanceDetail(w.get_attendance(meta.latest_header(), meta.latest_semester())))
+    portal.stop()
+
+    details = {f"student{i}": responses[i % len(responses)] for i in range(10000)}
+    results = [Result("analytics.build_10k", per_call(lambda: AttendanceTable.from_details(details), 1, 3), "us/call")]
+    for backend, use_numpy in (("numpy", True), ("array", False)):
+        table = AttendanceTable.from_details(details, use_numpy)
+        if use_numpy and table.np is None:
+            continue # NumPy is not installed
+        results += [
+            Result(f"analytics.{backend}.required_10k", per_call(table.required, 10, 3), "us/call"),
+            Result(f"analytics.{backend}.below_10k", per_call(table.below, 10, 3), "us/call"),
+            Result(f"analytics.{backend}.combined_10k", per_call(table.combined, 10, 3), "us/call"),
+        ]
+    return results
+
+
+@benchmark("registration_index")
+def bench_registration_index():
+    # 10k students spread over the sections of a few real shaped responses
+    import os
+    import tempfile
+    from pyjiit.registration import RegistrationIndex
+
+    portal = FakePortal(subjects=8)
+    registrations = []
+    for i in range(32):
+        w = Webportal(portal.transport(), api=portal.url)
+        w.student_login(f"user{i}", "password", CAPTCHA)
+        semester = w.get_registered_semesters()[0]
+        registrations.append((semester.registration_id, w.get_registered_subjects_and_faculties(semester)))
+    portal.stop()
+
+    students = {(f"student{i}", registrations[i % 32][0]): registrations[i % 32][1] for i in range(10000)}
+    index = RegistrationIndex()
+    results = [Result("registration_index.build_10k", per_call(lambda: RegistrationIndex().update_many(students), 1, 3), "us/call")]
+    index.update_many(students)
+    entry = next(iter(index))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "registrations.idx")
+        index.save(path)
+        results += [
+            Result("registration_index.students_of_employee", per_call(lambda: index.students(employee_code=entry.subject.employee_code), 100), "us/call"),
+            Result("registration_index.sections", per_call(lambda: index.sections(entry.subject.subject_code, entry.registration_id), 100), "us/call"),
+            Result("registration_index.file_size", os.path.getsize(path), "bytes"),
+            Result("registration_index.load_10k", per_call(lambda: RegistrationIndex.load(path), 1, 3), "us/call"),
+        ]
+    return results
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+import subprocess
+import sys
+import time
+
+
+BENCHMARKS = {}
+
+@dataclass
+class Result:
+    """Class containing one measured metric"""
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = False
+
+    def to_json(self) -> dict:
+        return {"value": self.value, "unit": self.unit, "higher_is_better": self.higher_is_better}
+
+
+def benchmark(name: str):
+    """
+    Registers a benchmark function under name, it must return a list of Result objects
+    """
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def per_call(fn, n: int, repeat: int = 5) -> float:
+    """
+    :returns: Best time of repeat runs, in microseconds per call of fn
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, time.perf_counter() - start)
+
+    return best / n * 1e6
+
+
+def import_time(statement: str, repeat: int = 5) -> float:
+    """
+    :param statement: Import statement, run in a fresh interpreter every time
+    :returns: Best time of repeat runs, in microseconds
+    """
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    best = float("inf")
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        best = min(best, float(out))
+
+    return best * 1e6
+
+
+def throughput(fn, n: int) -> float:
+    """
+    :param fn: Function doing n operations
+    :returns: Operations per second
+    """
+    start = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - start)
+
+
+def best(runs: list) -> dict:
+    """
+    :param runs: Results of several runs of the same benchmarks, as written by --json
+    :returns: Results with the best value of every metric over runs
+    """
+    merged = {}
+    for results in runs:
+        for name, result in results.items():
+            if name not in merged:
+                merged[name] = dict(result)
+                continue
+            pick = max if result["higher_is_better"] else min
+            merged[name]["value"] = pick(merged[name]["value"], result["value"])
+
+    return merged
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    :returns: A list of messages for metrics which got worse than baseline by more than tolerance (a fraction)
+    """
+    regressions = []
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+
+        old, new = baseline[name]["value"], result["value"]
+        if result["higher_is_better"]:
+            worse = new < old * (1 - tolerance)
+        else:
+            worse = new > old * (1 + tolerance)
+
+        if worse:
+            regressions.append(f"{name}: {old:.2f} -> {new:.2f} {result['unit']}")
+
+    return regressions
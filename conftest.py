@@ -0,0 +1,25 @@
+import pytest
+
+from pyjiit.default import CAPTCHA
+from pyjiit.fakeportal import FakePortal
+from pyjiit.wrapper import Webportal
+
+
+# logs in to the real portal with credentials from the environment, run it by hand
+collect_ignore = ["test_signin.py"]
+
+
+@pytest.fixture
+def portal():
+    """A FakePortal answering in-process through portal.transport()"""
+    portal = FakePortal()
+    yield portal
+    portal.stop()
+
+
+@pytest.fixture
+def client(portal):
+    """A Webportal logged in to portal as user"""
+    w = Webportal(portal.transport(), api=portal.url)
+    w.student_login("user", "password", CAPTCHA)
+    return w
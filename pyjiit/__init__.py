@@ -1,3 +1,22 @@
-from pyjiit.wrapper import Webportal
+# the clients are imported on first access, so "import pyjiit" (and modules which only need part of it) stay cheap
+_LAZY = {
+    "Webportal": "pyjiit.wrapper",
+    "AsyncWebportal": "pyjiit.async_wrapper",
+}
 
+__all__ = list(_LAZY)
 
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'pyjiit' has no attribute {name!r}")
+
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,5 @@
+import sys
+
+from pyjiit.cli import main
+
+sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Attendance analytics over many students at once
+
+Rows are kept in columns, so percentages, projections and alerts are computed for every row in one pass.
+Results are NumPy arrays if NumPy is installed (:code:`pip install pyjiit[analytics]`), and :code:`array('d')`
+otherwise, computed with plain loops.
+"""
+from array import array
+from dataclasses import dataclass
+import math
+
+from pyjiit.attendance import COMPONENTS, AttendanceDetail
+
+
+# component index of rows which sum every component of a subject (see AttendanceTable.combined)
+ALL = len(COMPONENTS)
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@dataclass
+class AttendanceAlert:
+    """
+    Class containing one subject (or component) of a student below the threshold
+
+    required is the number of classes to attend in a row to get back to the threshold, math.inf if it can not be
+    reached any more (a threshold of 100 after a missed class).
+    """
+    student: str
+    subject_code: str
+    component: str
+    attended: float
+    total: float
+    percentage: float
+    required: float
+
+
+class AttendanceTable:
+    """
+    Class which holds attendance of many students in columns: student, subject, component, attended and total
+
+    There is one row per student, subject and component the subject has. student and subject are indexes into
+    :code:`students` and :code:`subjects`, component is an index into COMPONENTS (or ALL for combined rows).
+    Rows are appended with :code:`add`, then the batch methods compute a value for every row at once.
+    """
+    def __init__(self, use_numpy: bool = True) -> None:
+        """
+        :param use_numpy: Use NumPy if it is installed (the array fallback is used otherwise)
+        """
+        self.np = _numpy() if use_numpy else None
+        self.students = []
+        self.subjects = []
+        self._student_index = {}
+        self._subject_index = {}
+
+        self.student = array("l")
+        self.subject = array("l")
+        self.component = array("b")
+        self.attended = array("d")
+        self.total = array("d")
+
+    def __len__(self) -> int:
+        return len(self.total)
+
+    @staticmethod
+    def from_details(details: dict, use_numpy: bool = True) -> 'AttendanceTable':
+        """
+        :param details: A dictionary of student -> AttendanceDetail or attendance detail response
+        :returns: An AttendanceTable of every student
+        """
+        table = AttendanceTable(use_numpy)
+        for student, detail in details.items():
+            table.add(student, detail)
+        return table
+
+    def add(self, student: str, detail):
+        """
+        Appends the rows of one semester of a student
+
+        :param student: A student identifier (e.g. a username)
+        :param detail: An AttendanceDetail, or a response of the attendance detail API
+        """
+        if not isinstance(detail, AttendanceDetail):
+            detail = AttendanceDetail(detail, keep_raw=False)
+
+        s = self._student_index.get(student)
+        if s is None:
+            s = self._student_index[student] = len(self.students)
+            self.students.append(student)
+
+        subjects = [self._subject(code) for code in detail.subject_codes]
+        for c, component in enumerate(COMPONENTS):
+            attended = detail.attended[component]
+            for i, total in enumerate(detail.total[component]):
+                if math.isnan(total):
+                    continue # the subject has no such component
+                a = attended[i]
+                self.student.append(s)
+                self.subject.append(subjects[i])
+                self.component.append(c)
+                self.attended.append(0.0 if math.isnan(a) else a)
+                self.total.append(total)
+
+    def _subject(self, code: str) -> int:
+        i = self._subject_index.get(code)
+        if i is None:
+            i = self._subject_index[code] = len(self.subjects)
+            self.subjects.append(code)
+        return i
+
+    def columns(self) -> tuple:
+        """
+        :returns: A tuple of the attended and total columns, as NumPy arrays or arrays. Both are copies, so rows can
+                  still be added while they are in use (an array cannot grow while a view of its memory exists)
+        """
+        if self.np is None:
+            return array("d", self.attended), array("d", self.total)
+        return self.np.array(self.attended, dtype=float), self.np.array(self.total, dtype=float)
+
+    def percentages(self):
+        """
+        :returns: Attendance percentage of every row (NaN where no class was held)
+        """
+        attended, total = self.columns()
+        if self.np is not None:
+            with self.np.errstate(divide="ignore", invalid="ignore"):
+                return self.np.where(total > 0, attended * 100.0 / total, self.np.nan)
+        return array("d", [a * 100.0 / t if t > 0 else math.nan for a, t in zip(attended, total)])
+
+    def required(self, threshold: float = 75.0):
+        """
+        :param threshold: Target percentage
+        :returns: Number of classes to attend in a row to reach threshold, for every row (0 if it is reached)
+        """
+        p = threshold / 100.0
+        attended, total = self.columns()
+        if p >= 1:
+            # only reachable if every class so far was attended
+            if self.np is not None:
+                return self.np.where(attended >= total, 0.0, self.np.inf)
+            return array("d", [0.0 if a >= t else math.inf for a, t in zip(attended, total)])
+
+        # (attended + x) / (total + x) >= p  <=>  x >= (p * total - attended) / (1 - p)
+        if self.np is not None:
+            return self.np.maximum(0.0, self.np.ceil((p * total - attended) / (1 - p) - 1e-9))
+        return array("d", [max(0.0, math.ceil((p * t - a) / (1 - p) - 1e-9)) for a, t in zip(attended, total)])
+
+    def skippable(self, threshold: float = 75.0):
+        """
+        :param threshold: Percentage to stay at or above
+        :returns: Number of classes which can be missed in a row while staying at threshold, for every row
+        """
+        p = threshold / 100.0
+        attended, total = self.columns()
+        if p <= 0:
+            return self.np.full(len(self), self.np.inf) if self.np is not None else array("d", [math.inf] * len(self))
+
+        # attended / (total + y) >= p  <=>  y <= attended / p - total
+        if self.np is not None:
+            return self.np.maximum(0.0, self.np.floor(attended / p - total + 1e-9))
+        return array("d", [max(0.0, math.floor(a / p - t + 1e-9)) for a, t in zip(attended, total)])
+
+    def below(self, threshold: float = 75.0, margin: float = 0.0) -> list:
+        """
+        :param threshold: Target percentage
+        :param margin: Also include rows less than margin points above threshold
+        :returns: Indexes of the rows below threshold + margin (rows without classes are never included)
+        """
+        percentages = self.percentages()
+        limit = threshold + margin
+        if self.np is not None:
+            return self.np.flatnonzero(percentages < limit).tolist()
+        return [i for i, v in enumerate(percentages) if v < limit]
+
+    def alerts(self, threshold: float = 75.0, margin: float = 0.0) -> list:
+        """
+        :param threshold: Target percentage
+        :param margin: Also alert rows less than margin points above threshold
+        :returns: A list of AttendanceAlert of every row below threshold + margin
+        """
+        rows = self.below(threshold, margin)
+        if not rows:
+            return []
+
+        percentages = self.percentages()
+        required = self.required(threshold)
+        if self.np is not None:
+            # gathered in bulk, indexing NumPy arrays one element at a time is slow
+            attended, total = self.columns()
+            percentages, required = percentages[rows].tolist(), required[rows].tolist()
+            attended, total = attended[rows].tolist(), total[rows].tolist()
+        else:
+            percentages, required = [percentages[i] for i in rows], [required[i] for i in rows]
+            attended, total = [self.attended[i] for i in rows], [self.total[i] for i in rows]
+
+        names = COMPONENTS + ("ALL",)
+        students, subjects = self.students, self.subjects
+        return [
+            AttendanceAlert(
+                students[self.student[i]], subjects[self.subject[i]], names[self.component[i]],
+                attended[k], total[k], percentages[k], required[k]
+            )
+            for k, i in enumerate(rows)
+        ]
+
+    def combined(self) -> 'AttendanceTable':
+        """
+        :returns: A new table with one row per student and subject, summing attended and total over the components,
+                  ordered by student and subject index
+        """
+        out = AttendanceTable(use_numpy=self.np is not None)
+        out.students = self.students
+        out.subjects = self.subjects
+        out._student_index = self._student_index
+        out._subject_index = self._subject_index
+
+        if self.np is not None and len(self):
+            np = self.np
+            attended, total = self.columns()
+            n = max(1, len(self.subjects))
+            index = f"i{self.student.itemsize}" # the C long of array("l")
+            students = np.array(self.student, dtype=np.int64)
+            subjects = np.array(self.subject, dtype=index)
+            unique, inverse = np.unique(students * n + subjects, return_inverse=True)
+            out.student = array("l", (unique // n).astype(index).tobytes())
+            out.subject = array("l", (unique % n).astype(index).tobytes())
+            out.attended = array("d", np.bincount(inverse, weights=attended, minlength=len(unique)).tobytes())
+            out.total = array("d", np.bincount(inverse, weights=total, minlength=len(unique)).tobytes())
+        else:
+            sums = {}
+            for s, j, a, t in zip(self.student, self.subject, self.attended, self.total):
+                row = sums.get((s, j))
+                if row is None:
+                    sums[(s, j)] = [a, t]
+                else:
+                    row[0] += a
+                    row[1] += t
+            for (s, j), (a, t) in sorted(sums.items()):
+                out.student.append(s)
+                out.subject.append(j)
+                out.attended.append(a)
+                out.total.append(t)
+
+        out.component = array("b", [ALL]) * len(out.total)
+        return out
@@ -0,0 +1,515 @@
+from datetime import datetime, timedelta
+from pyjiit.encryption import LocalNameProvider
+from pyjiit.exam import ExamEvent, ExamScheduleEntry, ExamScheduleIndex
+from pyjiit.registration import Registrations
+from pyjiit.token import Captcha
+from pyjiit.cache import ResponseCache
+from pyjiit.captcha import CaptchaPool, is_captcha_error
+from pyjiit.exceptions import LoginError, AccountAPIError
+from pyjiit.attendance import AttendanceMeta, AttendanceHeader, Semester, AttendanceDetail
+from pyjiit.changes import AttendanceTracker
+from pyjiit.transport import AsyncTransport, AiohttpTransport
+from pyjiit.fanout import FanOutResult, async_fan_out
+from pyjiit.metrics import RequestEvent
+from pyjiit.ratelimit import RateLimiter
+from pyjiit.hedge import Hedger
+from pyjiit.singleflight import AsyncSingleFlight
+from pyjiit.wrapper import API, WebportalSession, _RequestPipeline, authenticated
+
+import asyncio
+import time
+
+
+class AsyncWebportal(_RequestPipeline):
+    """
+    Class which implements the functionality for
+    JIIT Webportal using asyncio
+
+    Every method mirrors the one in Webportal, but has to be awaited. Requests are prepared and their responses
+    handled by the same code as Webportal's, only the transport, limiter, backoff and hedges are awaited.
+    A single instance holds one session, while all instances can share one transport (and its connection pool).
+    """
+
+    def __init__(self, transport: AsyncTransport = None, local_names: LocalNameProvider = None,
+                 cache: ResponseCache = None, keep_raw: bool = True, api: str = API, hooks: list = None,
+                 limiter: RateLimiter = None, singleflight: AsyncSingleFlight = None, hedger: Hedger = None) -> None:
+        """
+        :param transport: AsyncTransport used for HTTP requests (defaults to an AiohttpTransport)
+        :param local_names: LocalNameProvider for LocalName headers (defaults to the shared one)
+        :param cache: ResponseCache for slow changing endpoints (no caching if None). Its SQLite reads and writes
+                      run on the event loop, they are local and short
+        :param keep_raw: Keep raw_response on returned models, set to False to save memory
+        :param api: Base URL of the StudentPortalAPI (e.g. of a local FakePortal)
+        :param hooks: A list of callables called with a RequestEvent after every request (e.g. a MetricsRegistry)
+        :param limiter: RateLimiter pacing and retrying requests (e.g. the process wide shared_limiter())
+        :param singleflight: AsyncSingleFlight coalescing identical concurrent requests, can be shared by many clients
+        :param hedger: Hedger sending a duplicate of read requests which are slower than usual (no hedging if None)
+        """
+        super().__init__(
+            transport if transport is not None else AiohttpTransport(), local_names, cache, keep_raw, api, hooks,
+            limiter, singleflight, hedger
+        )
+        self._login_lock = None # asyncio.Lock, created inside the event loop
+
+    def __str__(self) -> str:
+        return "Async Driver Class for JIIT Webportal"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Closes the underlying transport (and its pooled connections)"""
+        await self.transport.close()
+
+    async def __hit(self, method, endpoint, **kwargs):
+        exception = self._options(kwargs)
+        key = self._flight_key(endpoint, exception, kwargs)
+        if key is None:
+            return await self.__call(method, endpoint, exception, **kwargs)
+
+        ran = False
+        async def call():
+            nonlocal ran
+            ran = True
+            return await self.__call(method, endpoint, exception, **kwargs)
+
+        # callers which only waited for another one's request get a coalesced event
+        event = RequestEvent(endpoint, method, coalesced=True)
+        start = time.perf_counter()
+        try:
+            return await self.singleflight.do(key, call)
+        except Exception as e:
+            event.error = e
+            raise
+        finally:
+            if not ran:
+                self._emit(event, start)
+
+    async def __call(self, method, endpoint, exception, **kwargs):
+        attempt = 0
+        while True:
+            event = RequestEvent(endpoint, method)
+            start = time.perf_counter()
+            try:
+                resp = await self.__attempt(method, endpoint, event, exception, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, endpoint, exception, attempt, event):
+                    raise
+            else:
+                self._succeeded(endpoint, event)
+                return resp
+            finally:
+                self._emit(event, start)
+
+            await asyncio.sleep(self.limiter.backoff_delay(attempt))
+            attempt += 1
+
+    async def __attempt(self, method, endpoint, event, exception, **kwargs):
+        if not self._hedged(endpoint, kwargs):
+            return await self.__send(method, endpoint, event, exception, **kwargs)
+
+        async def send(hedge):
+            # the duplicate gets its own event, the first request fills the event of the attempt
+            sent = RequestEvent(endpoint, method, hedge=True) if hedge else event
+            start = time.perf_counter()
+            try:
+                return await self.__send(method, endpoint, sent, exception, **kwargs)
+            except Exception as e:
+                sent.error = e
+                raise
+            finally:
+                if hedge:
+                    self._emit(sent, start)
+
+        start = time.perf_counter()
+        resp = await self.hedger.async_run(endpoint, send)
+        self._hedge_done(endpoint, event, start)
+        return resp
+
+    async def __send(self, method, endpoint, event, exception, **kwargs):
+        session, resp, kwargs = self._prepare(endpoint, event, kwargs)
+        if resp is not None:
+            return resp
+
+        if self.limiter is not None:
+            await self.limiter.async_wait(self.host, endpoint)
+
+        response = await self.transport.request(method, self.api+endpoint, **kwargs)
+        return self._receive(endpoint, event, exception, response, session, kwargs.get("json"))
+
+
+    async def student_login(self, username: str, password: str, captcha: Captcha) -> WebportalSession:
+        """
+        :param username: A username
+        :param password: A password
+        :param captcha: Captcha object, or a CaptchaPool to take one from (a rejected captcha is replaced by a fresh one once)
+        :returns: WebportalSession object (Also sets the internal session variable to this)
+        :raises LoginError: Raised for any error in the remote API while Logging in
+        """
+        if isinstance(captcha, CaptchaPool):
+            return await self.__pooled_login(username, password, captcha)
+
+        payload = self._pretoken_payload(username, captcha)
+        resp = await self.__hit("POST", self.PRETOKEN_ENDPOINT, data=payload, encrypt=True, exception=LoginError)
+
+        payload = self._token_payload(resp, password)
+        resp = await self.__hit("POST", self.TOKEN_ENDPOINT, data=payload, encrypt=True, exception=LoginError)
+
+        self.username = username
+        self.session = WebportalSession(resp['response'], self.keep_raw)
+
+        return self.session
+
+    async def ensure_login(self, username: str, password: str, captcha: Captcha, min_ttl: timedelta = timedelta(minutes=1)) -> WebportalSession:
+        """
+        Logs in only if the client has no session of username valid for at least min_ttl.
+        Tasks calling it at the same time (e.g. all of them after SessionExpired) wait for a single login
+
+        :param username: A username
+        :param password: A password
+        :param captcha: Captcha object, or a CaptchaPool to take one from
+        :param min_ttl: Sessions expiring sooner than this are replaced
+        :returns: WebportalSession object (Also sets the internal session variable to this)
+        :raises LoginError: Raised for any error in the remote API while Logging in
+        """
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+
+        async with self._login_lock:
+            session = self.session
+            if session is not None and self.username == username and session.expiry - datetime.now() > min_ttl:
+                return session
+            return await self.student_login(username, password, captcha)
+
+    async def __pooled_login(self, username, password, pool):
+        captcha = await pool.async_get(self.get_captcha)
+        try:
+            session = await self.student_login(username, password, captcha)
+        except LoginError as e:
+            if not is_captcha_error(e):
+                raise
+            pool.reject(captcha)
+            captcha = await pool.async_get(self.get_captcha)
+            session = await self.student_login(username, password, captcha)
+
+        pool.accept(captcha)
+        return session
+
+    async def restore_session(self, vault, username: str, password: str = None, captcha: Captcha = None,
+                        min_ttl: timedelta = timedelta(0)) -> WebportalSession:
+        """
+        Restores the session of username from a SessionVault without any network call, and logs in
+        (then stores the new session in the vault) only if there is no session valid for min_ttl
+
+        :param vault: A SessionVault
+        :param username: A username
+        :param password: A password, needed only if a login is required
+        :param captcha: Captcha object for the login (defaults to pyjiit.default.CAPTCHA)
+        :param min_ttl: Sessions expiring sooner than this are not restored
+        :returns: WebportalSession object (Also sets the internal session variable to this), None if there is
+                  no valid session and no password was given
+        :raises LoginError: Raised for any error in the remote API while Logging in
+        """
+        session = vault.load(username, min_ttl, self.keep_raw)
+        if session is not None:
+            self.username = username
+            self.session = session
+            return session
+
+        if password is None:
+            return None
+
+        if captcha is None:
+            from pyjiit.default import CAPTCHA as captcha
+        session = await self.student_login(username, password, captcha)
+        vault.save(username, session)
+        return session
+
+    async def get_captcha(self) -> Captcha:
+        """
+        :returns: Captcha object with empty answer field
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/token/getcaptcha"
+
+        resp = await self.__hit("GET", ENDPOINT)
+
+        return Captcha.from_json(resp["response"])
+
+    @authenticated
+    async def get_student_bank_info(self):
+        """
+        :returns: A dictionary with student bank info
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/studentbankdetails/getstudentbankinfo"
+
+        payload = {
+                "instituteid": self.session.instituteid,
+                "studentid": self.session.memberid
+        }
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return resp["response"]
+
+    @authenticated
+    async def get_attendance_meta(self):
+        """
+        :returns: AttendanceMeta object
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/StudentClassAttendance/getstudentInforegistrationforattendence"
+
+        payload = {
+            "clientid": self.session.clientid,
+            "instituteid": self.session.instituteid,
+            "membertype": self.session.membertype
+        }
+
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return AttendanceMeta(resp["response"], self.keep_raw)
+
+    @authenticated
+    async def get_attendance(self, header: AttendanceHeader, semester: Semester):
+        """
+        :param header: An AttendanceHeader object
+        :param semester: A Semester object
+        :returns: A dictionary with attendance data
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/StudentClassAttendance/getstudentattendancedetail"
+
+        payload = {
+            "clientid": self.session.clientid,
+            "instituteid": self.session.instituteid,
+            "registrationcode": semester.registration_code,
+            "registrationid": semester.registration_id,
+            "stynumber": header.stynumber
+        }
+
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return resp["response"]
+
+    @authenticated
+    async def get_attendance_detail(self, header: AttendanceHeader, semester: Semester) -> AttendanceDetail:
+        """
+        :param header: An AttendanceHeader object
+        :param semester: A Semester object
+        :returns: AttendanceDetail object (same data as get_attendance, parsed lazily into compact columns)
+        :raises APIError: Raised for generic API error
+        """
+        return AttendanceDetail(await self.get_attendance(header, semester), self.keep_raw)
+
+    @authenticated
+    async def get_attendance_changes(self, header: AttendanceHeader, semester: Semester, tracker: AttendanceTracker) -> list:
+        """
+        :param header: An AttendanceHeader object
+        :param semester: A Semester object
+        :param tracker: AttendanceTracker holding the previous snapshot of this student and semester
+        :returns: A list of AttendanceChange since the previous call (empty if nothing changed)
+        :raises APIError: Raised for generic API error
+        """
+        resp = await self.get_attendance(header, semester)
+        return tracker.update(self.session.userid, semester.registration_id, resp)
+
+    @authenticated
+    async def set_password(self, old_pswd: str, new_pswd: str):
+        """
+        :param old_pswd: Old password string
+        :param new_pswd: New password string
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/clxuser/changepassword"
+
+        payload = {
+            "membertype": self.session.membertype,
+            "oldpassword": old_pswd,
+            "newpassword": new_pswd,
+            "confirmpassword": new_pswd
+        }
+
+        await self.__hit("POST", ENDPOINT, json=payload, authenticated=True, exception=AccountAPIError)
+
+    @authenticated
+    async def get_registered_semesters(self):
+        """
+        :returns: A list of Semester objects
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/reqsubfaculty/getregistrationList"
+
+        payload = {
+            "instituteid": self.session.instituteid,
+            "studentid": self.session.memberid
+        }
+
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return [Semester.from_json(i) for i in resp["response"]["registrations"]]
+
+    @authenticated
+    async def get_registered_subjects_and_faculties(self, semester: Semester):
+        """
+        :param semester: A Semester object
+        :returns: A Registrations object
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/reqsubfaculty/getfaculties"
+
+        payload = {
+            "instituteid": self.session.instituteid,
+            "studentid": self.session.memberid,
+            "registrationid": semester.registration_id
+        }
+
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return Registrations(resp["response"], self.keep_raw)
+
+    @authenticated
+    async def get_semesters_for_exam_events(self):
+        """
+        :returns: A list of Semester objects
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/studentcommonsontroller/getsemestercode-withstudentexamevents"
+
+        payload = {
+            "clientid": self.session.clientid,
+            "instituteid": self.session.instituteid,
+            "memberid": self.session.memberid
+        }
+
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return [Semester.from_json(i) for i in resp["response"]["semesterCodeinfo"]["semestercode"]]
+
+    @authenticated
+    async def get_exam_events(self, semester: Semester):
+        """
+        :param semester: A Semester object
+        :returns: A list of ExamEvent objects
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/studentcommonsontroller/getstudentexamevents"
+
+        payload = {
+            "instituteid": self.session.instituteid,
+            "registationid": semester.registration_id # not a typo
+        }
+
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return [ExamEvent.from_json(i) for i in resp["response"]["eventcode"]["examevent"]]
+
+    @authenticated
+    async def get_exam_schedule(self, exam_event: ExamEvent):
+        """
+        :param exam_event: An ExamEvent object
+        :returns: A dictionary with exam schedule data
+        :raises APIError: Raised for generic API error
+        """
+        ENDPOINT = "/studentsttattview/getstudent-examschedule"
+
+        payload = {
+            "instituteid": self.session.instituteid,
+            "registrationid": exam_event.registration_id,
+            "exameventid": exam_event.exam_event_id
+        }
+
+        resp = await self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
+
+        return resp["response"]
+
+    @authenticated
+    async def get_all_attendance(self, header: AttendanceHeader = None, max_workers: int = 4) -> FanOutResult:
+        """
+        :param header: An AttendanceHeader object (defaults to the latest header)
+        :param max_workers: Maximum number of concurrent requests
+        :returns: A FanOutResult of registration code -> attendance data for every semester
+        :raises APIError: Raised for generic API error while getting the attendance meta
+        """
+        meta = await self.get_attendance_meta()
+        if header is None:
+            header = meta.latest_header()
+
+        return await async_fan_out(
+            lambda semester: self.get_attendance(header, semester),
+            meta.semesters,
+            lambda semester: semester.registration_code,
+            max_workers
+        )
+
+    @authenticated
+    async def get_all_exam_schedules(self, max_workers: int = 4) -> FanOutResult:
+        """
+        :param max_workers: Maximum number of concurrent requests
+        :returns: A FanOutResult of registration code -> {exam event code: exam schedule data}.
+                  Errors are keyed by registration code if the events could not be fetched,
+                  or by (registration code, exam event code) if one schedule could not be fetched
+        :raises APIError: Raised for generic API error while getting the semesters
+        """
+        semesters = await self.get_semesters_for_exam_events()
+
+        events = await async_fan_out(self.get_exam_events, semesters, lambda semester: semester.registration_code, max_workers)
+        schedules = await async_fan_out(
+            lambda pair: self.get_exam_schedule(pair[1]),
+            [(code, event) for code, semester_events in events.results.items() for event in semester_events],
+            lambda pair: (pair[0], pair[1].exam_event_code),
+            max_workers
+        )
+
+        result = FanOutResult(errors=events.errors)
+        for code in events.results:
+            result.results[code] = {}
+        for (code, event_code), schedule in schedules.results.items():
+            result.results[code][event_code] = schedule
+        result.errors.update(schedules.errors)
+
+        return result
+
+    @authenticated
+    async def get_exam_schedule_entries(self, exam_event: ExamEvent) -> list:
+        """
+        :param exam_event: An ExamEvent object
+        :returns: A list of ExamScheduleEntry, one per subject
+        :raises APIError: Raised for generic API error
+        """
+        return ExamScheduleEntry.list_from_json(await self.get_exam_schedule(exam_event), exam_event)
+
+    @authenticated
+    async def get_exam_index(self, max_workers: int = 4, index: ExamScheduleIndex = None) -> ExamScheduleIndex:
+        """
+        :param max_workers: Maximum number of concurrent requests
+        :param index: An ExamScheduleIndex to update (a new one if None)
+        :returns: index with the schedules of every exam event of every semester.
+                  Events which could not be fetched keep their previous entries, the errors are in index.errors
+                  keyed like in get_all_exam_schedules
+        :raises APIError: Raised for generic API error while getting the semesters
+        """
+        if index is None:
+            index = ExamScheduleIndex()
+
+        semesters = await self.get_semesters_for_exam_events()
+
+        events = await async_fan_out(self.get_exam_events, semesters, lambda semester: semester.registration_code, max_workers)
+        pairs = [(code, event) for code, semester_events in events.results.items() for event in semester_events]
+        entries = await async_fan_out(
+            lambda pair: self.get_exam_schedule_entries(pair[1]),
+            pairs,
+            lambda pair: (pair[0], pair[1].exam_event_code),
+            max_workers
+        )
+
+        for code, event in pairs:
+            key = (code, event.exam_event_code)
+            if key in entries.results:
+                index.update(event, entries.results[key])
+
+        index.errors = {**events.errors, **entries.errors}
+        return index
@@ -1,4 +1,7 @@
+from array import array
 from dataclasses import dataclass
+import math
+import sys
 
 @dataclass
 class AttendanceHeader:
@@ -38,8 +41,12 @@ class Semester:
 
 
 class AttendanceMeta:
-    def __init__(self, resp) -> None:
-        self.raw_response = resp
+    def __init__(self, resp, keep_raw: bool = True) -> None:
+        """
+        :param resp: Response of the attendance meta API
+        :param keep_raw: Keep the response in raw_response after parsing (None otherwise)
+        """
+        self.raw_response = resp if keep_raw else None
         self.headers = [AttendanceHeader.from_json(i) for i in resp["headerlist"]]
         self.semesters = [Semester.from_json(i) for i in resp["semlist"]]
 
@@ -50,3 +57,159 @@ class AttendanceMeta:
         return self.semesters[0]
 
 
+
+
+COMPONENTS = ("L", "T", "P")
+
+def _number(value) -> float:
+    return math.nan if value is None or value == "" else float(value)
+
+def _intern(value):
+    # subject strings repeat across every student of a batch, keep one copy of each
+    return sys.intern(value) if isinstance(value, str) else value
+
+class SubjectAttendance:
+    """
+    Class containing attendance of one subject (created on demand by AttendanceDetail, not stored)
+
+    attended, total and percentage are dictionaries of component code ("L", "T", "P") to value, for the components the subject has
+    """
+    __slots__ = ("subject_code", "subject_desc", "subject_id", "overall_percentage", "attended", "total", "percentage")
+
+    def __init__(self, subject_code: str, subject_desc: str, subject_id: str, overall_percentage: float,
+                 attended: dict, total: dict, percentage: dict) -> None:
+        self.subject_code = subject_code
+        self.subject_desc = subject_desc
+        self.subject_id = subject_id
+        self.overall_percentage = overall_percentage
+        self.attended = attended
+        self.total = total
+        self.percentage = percentage
+
+    def __repr__(self) -> str:
+        return f"SubjectAttendance(subject_code={self.subject_code!r}, overall_percentage={self.overall_percentage!r}, " \
+               f"attended={self.attended!r}, total={self.total!r})"
+
+
+class AttendanceDetail:
+    """
+    Class containing attendance of every subject in a semester
+
+    Numbers are stored column wise in :code:`array('d')` (one entry per subject, NaN where a subject has no such component)
+    and subject strings are interned, which takes a fraction of the memory of the response dictionaries.
+    The response is parsed on first access, and dropped afterwards unless keep_raw is True.
+    """
+    __slots__ = ("_raw", "_keep_raw", "_parsed", "_current_sem", "_subject_codes", "_subject_descs", "_subject_ids",
+                 "_overall", "_attended", "_total", "_percentage")
+
+    def __init__(self, resp: dict, keep_raw: bool = True) -> None:
+        """
+        :param resp: Response of the attendance detail API
+        :param keep_raw: Keep the response in raw_response after parsing (None otherwise)
+        """
+        self._raw = resp
+        self._keep_raw = keep_raw
+        self._parsed = False
+
+    def _parse(self):
+        if self._parsed:
+            return
+
+        rows = self._raw["studentattendancelist"]
+        self._current_sem = self._raw.get("currentSem")
+        self._subject_codes = [_intern(row.get("individualsubjectcode")) for row in rows]
+        self._subject_descs = [_intern(row.get("subjectcode")) for row in rows]
+        self._subject_ids = [_intern(row.get("subjectid")) for row in rows]
+        self._overall = array("d", [_number(row.get("LTpercantage")) for row in rows])
+
+        self._attended = {}
+        self._total = {}
+        self._percentage = {}
+        for c in COMPONENTS:
+            self._attended[c] = array("d", [_number(row.get(c + "totalpres")) for row in rows])
+            self._total[c] = array("d", [_number(row.get(c + "totalclass")) for row in rows])
+            self._percentage[c] = array("d", [_number(row.get(c + "percentage")) for row in rows])
+
+        self._parsed = True
+        if not self._keep_raw:
+            self._raw = None
+
+    @property
+    def raw_response(self):
+        """The response dictionary (None if it was dropped after parsing)"""
+        return self._raw
+
+    @property
+    def current_sem(self):
+        self._parse()
+        return self._current_sem
+
+    @property
+    def subject_codes(self) -> list:
+        self._parse()
+        return self._subject_codes
+
+    @property
+    def subject_descs(self) -> list:
+        self._parse()
+        return self._subject_descs
+
+    @property
+    def subject_ids(self) -> list:
+        self._parse()
+        return self._subject_ids
+
+    @property
+    def overall_percentage(self) -> array:
+        """Overall attendance percentage of every subject"""
+        self._parse()
+        return self._overall
+
+    @property
+    def attended(self) -> dict:
+        """A dictionary of component code -> classes attended of every subject"""
+        self._parse()
+        return self._attended
+
+    @property
+    def total(self) -> dict:
+        """A dictionary of component code -> total classes of every subject"""
+        self._parse()
+        return self._total
+
+    @property
+    def percentage(self) -> dict:
+        """A dictionary of component code -> attendance percentage of every subject"""
+        self._parse()
+        return self._percentage
+
+    def __len__(self) -> int:
+        return len(self.subject_codes)
+
+    def __getitem__(self, i: int) -> SubjectAttendance:
+        self._parse()
+        present = [c for c in COMPONENTS if not math.isnan(self._total[c][i])]
+        return SubjectAttendance(
+            self._subject_codes[i],
+            self._subject_descs[i],
+            self._subject_ids[i],
+            self._overall[i],
+            {c: self._attended[c][i] for c in present},
+            {c: self._total[c][i] for c in present},
+            {c: self._percentage[c][i] for c in present}
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def subject(self, subject_code: str) -> SubjectAttendance:
+        """
+        :param subject_code: A subject code like "15B11CI111"
+        :returns: SubjectAttendance of the subject
+        :raises KeyError: Raised if there is no such subject
+        """
+        try:
+            return self[self.subject_codes.index(subject_code)]
+        except ValueError:
+            raise KeyError(subject_code) from None
@@ -0,0 +1,148 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+
+DAY = 24 * 60 * 60
+
+# endpoints whose data changes about once a semester
+DEFAULT_TTLS = {
+    "/reqsubfaculty/getregistrationList": DAY,
+    "/reqsubfaculty/getfaculties": 7 * DAY,
+    "/studentcommonsontroller/getsemestercode-withstudentexamevents": DAY,
+    "/studentcommonsontroller/getstudentexamevents": DAY,
+    "/studentbankdetails/getstudentbankinfo": 7 * DAY,
+}
+
+class ResponseCache:
+    """
+    Class which caches successful API responses for slow changing endpoints
+
+    Entries are keyed by endpoint, payload and user and expire after a per endpoint TTL.
+    An in-memory LRU sits in front of an optional SQLite file, so cached data survives restarts.
+    Only endpoints present in :code:`ttls` are cached. Methods are thread safe.
+    """
+
+    def __init__(self, path: str = None, ttls: dict = None, max_entries: int = 1024) -> None:
+        """
+        :param path: Path of the SQLite database (memory only if None)
+        :param ttls: A dictionary of endpoint to TTL in seconds (defaults to DEFAULT_TTLS)
+        :param max_entries: Maximum number of entries in the in-memory LRU
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict() # key -> (expires, endpoint, user, text)
+        self._db = None
+
+        if path is not None:
+            import sqlite3
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, endpoint TEXT, user TEXT, expires REAL, response TEXT)"
+            )
+            self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def close(self):
+        """Closes the SQLite database"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def cacheable(self, endpoint: str) -> bool:
+        """
+        :param endpoint: An endpoint path like "/reqsubfaculty/getfaculties"
+        :returns: True if responses of the endpoint are cached
+        """
+        return endpoint in self.ttls
+
+    @staticmethod
+    def key(endpoint: str, payload, user: str) -> str:
+        """
+        :returns: The cache key for endpoint, payload and user
+        """
+        raw = json.dumps([endpoint, payload, user], sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, endpoint: str, payload, user: str):
+        """
+        :returns: The cached response dictionary or None on miss/expiry
+        """
+        key = self.key(endpoint, payload, user)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return json.loads(entry[3])
+                del self._memory[key]
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                "SELECT expires, response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] <= now:
+                return None
+
+            self._remember(key, (row[0], endpoint, user, row[1]))
+            return json.loads(row[1])
+
+    def set(self, endpoint: str, payload, user: str, response: dict):
+        """
+        Stores response if the endpoint is cacheable
+        """
+        ttl = self.ttls.get(endpoint)
+        if ttl is None:
+            return
+
+        key = self.key(endpoint, payload, user)
+        expires = time.time() + ttl
+        # stored as text so callers mutating a returned dictionary never touch the cache
+        text = json.dumps(response, separators=(',', ':'))
+
+        with self._lock:
+            self._remember(key, (expires, endpoint, user, text))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, endpoint, user, expires, text)
+                )
+                self._db.commit()
+
+    def invalidate(self, endpoint: str = None, user: str = None):
+        """
+        Drops cached entries matching endpoint and user (None matches everything)
+        """
+        with self._lock:
+            for key, entry in list(self._memory.items()):
+                if (endpoint is None or entry[1] == endpoint) and (user is None or entry[2] == user):
+                    del self._memory[key]
+
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM responses WHERE (? IS NULL OR endpoint = ?) AND (? IS NULL OR user = ?)",
+                    (endpoint, endpoint, user, user)
+                )
+                self._db.commit()
+
+    def clear(self):
+        """Drops every cached entry"""
+        self.invalidate()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
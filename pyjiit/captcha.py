@@ -0,0 +1,188 @@
+from collections import deque
+import threading
+import time
+
+from pyjiit.token import Captcha
+
+
+# error messages of a pretoken-check with a wrong or expired captcha, compared ignoring case
+CAPTCHA_ERRORS = frozenset({"invalid captcha"})
+
+def is_captcha_error(error: Exception) -> bool:
+    """
+    :returns: True if a login failed because the portal did not accept the captcha (False for any other failure)
+    """
+    status = getattr(error, "status", None)
+    if not isinstance(status, dict):
+        return False
+
+    errors = status.get("errors")
+    if isinstance(errors, str):
+        errors = [errors]
+    return any(isinstance(message, str) and message.strip().lower() in CAPTCHA_ERRORS for message in errors or ())
+
+
+class CaptchaPool:
+    """
+    Class which hands out captchas for student_login, so logins do not have to fetch (and solve) one first
+
+    Known-good captchas (answered captcha/hidden pairs, like :code:`pyjiit.default.CAPTCHA`) are reused for every login
+    until the portal rejects them. Next to them, a buffer of fetched and solved captchas is kept filled on a background
+    thread (if fetch and solver are given); those expire after ttl and are promoted to known-good once a login with
+    them succeeds. Pass the pool as the captcha of :code:`student_login`. Methods are thread safe.
+    Only :code:`get` (when nothing is buffered), :code:`new` and :code:`fill` fetch on the calling thread.
+    """
+    def __init__(self, known: list = None, fetch=None, solver=None, size: int = 4, ttl: float = 300.0, background: bool = True) -> None:
+        """
+        :param known: A list of answered Captcha objects (defaults to [pyjiit.default.CAPTCHA])
+        :param fetch: A callable returning a new Captcha, e.g. :code:`Webportal().get_captcha`
+        :param solver: A callable returning the answer of a Captcha (from its base64 image)
+        :param size: Number of fetched captchas kept ready
+        :param ttl: Seconds a fetched captcha is used for before it is dropped
+        :param background: Refill the buffer on a background thread when it runs low (call :code:`fill` to refill
+                           it otherwise)
+        """
+        if known is None:
+            from pyjiit.default import CAPTCHA
+            known = [CAPTCHA]
+
+        self.fetch = fetch
+        self.solver = solver
+        self.size = size
+        self.ttl = ttl
+        self.background = background
+
+        self._known = list(known)
+        self._fresh = deque() # (expires, captcha)
+        self._fetching = 0 # captchas being fetched by fill, counted against size
+        self._lock = threading.Lock()
+        self._refilling = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._known) + len(self._fresh)
+
+    @property
+    def can_fetch(self) -> bool:
+        return self.fetch is not None and self.solver is not None
+
+    def get(self, fetch=None) -> Captcha:
+        """
+        :param fetch: Callable used instead of the pool's own fetch if a captcha has to be fetched now
+        :returns: A known-good captcha, else a prefetched one, else a freshly fetched one
+        :raises LookupError: Raised if the pool is empty and can not fetch
+        """
+        captcha = self.ready()
+        if captcha is None:
+            captcha = self.new(fetch)
+        return captcha
+
+    def ready(self) -> Captcha:
+        """
+        Hands out what is buffered and never fetches on the calling thread, so it is safe to call from an event
+        loop. If the buffer runs low, a background refill is started (with background=False, refilling is left to
+        :code:`fill`)
+
+        :returns: A known-good captcha, else a prefetched one, None if there is neither
+        """
+        with self._lock:
+            captcha = self._known[0] if self._known else self._pop_fresh()
+            low = len(self._fresh) + self._fetching < self.size
+
+        if low and self.background and self.can_fetch:
+            self._refill_in_background()
+
+        return captcha
+
+    def new(self, fetch=None) -> Captcha:
+        """
+        Fetches and solves a captcha on the calling thread
+
+        :param fetch: Callable used instead of the pool's own fetch
+        :raises LookupError: Raised if there is no fetch or no solver
+        """
+        return self.solve(self._fetcher(fetch)())
+
+    async def async_get(self, fetch) -> Captcha:
+        """
+        get for AsyncWebportal
+
+        :param fetch: Coroutine function used if a captcha has to be fetched now, e.g. :code:`AsyncWebportal.get_captcha`
+        :raises LookupError: Raised if the pool is empty and has no solver
+        """
+        captcha = self.ready()
+        if captcha is None:
+            captcha = self.solve(await self._fetcher(fetch)())
+        return captcha
+
+    def _fetcher(self, fetch):
+        fetch = fetch if fetch is not None else self.fetch
+        if fetch is None or self.solver is None:
+            raise LookupError("no usable captcha, give CaptchaPool a fetch and a solver")
+        return fetch
+
+    def solve(self, captcha: Captcha) -> Captcha:
+        """
+        :returns: captcha with its answer filled in by the solver
+        """
+        captcha.captcha = self.solver(captcha)
+        return captcha
+
+    def accept(self, captcha: Captcha):
+        """Marks captcha as accepted by the portal, it becomes known-good"""
+        with self._lock:
+            if captcha not in self._known:
+                self._known.append(captcha)
+
+    def reject(self, captcha: Captcha):
+        """Drops captcha, the portal did not accept it"""
+        with self._lock:
+            if captcha in self._known:
+                self._known.remove(captcha)
+
+    def add(self, captcha: Captcha):
+        """Adds an answered captcha to the prefetched ones"""
+        with self._lock:
+            self._fresh.append((time.monotonic() + self.ttl, captcha))
+
+    def fill(self):
+        """Fetches captchas until size of them are ready, or being fetched by other threads"""
+        while True:
+            # a slot is reserved under the lock, the fetch itself runs without it
+            with self._lock:
+                if len(self._fresh) + self._fetching >= self.size:
+                    return
+                self._fetching += 1
+
+            try:
+                captcha = self.new()
+            except BaseException:
+                with self._lock:
+                    self._fetching -= 1
+                raise
+
+            with self._lock:
+                self._fetching -= 1
+                self._fresh.append((time.monotonic() + self.ttl, captcha))
+
+    def _pop_fresh(self):
+        now = time.monotonic()
+        while self._fresh:
+            expires, captcha = self._fresh.popleft()
+            if expires > now:
+                return captcha
+        return None
+
+    def _refill_in_background(self):
+        # at most one refill thread at a time, callers never wait for it
+        if not self._refilling.acquire(blocking=False):
+            return
+
+        threading.Thread(target=self._background_fill, name="pyjiit-captcha", daemon=True).start()
+
+    def _background_fill(self):
+        try:
+            self.fill()
+        except Exception:
+            pass # the next get() fetches on its own thread and raises
+        finally:
+            self._refilling.release()
@@ -0,0 +1,290 @@
+"""
+Recording of portal traffic to a file, and transports which serve it back without a network
+
+A cassette is an append-only file of exchanges (one request and its response). Each exchange is stored as a
+4 byte length followed by a zlib compressed record, so a file cut short by a crash loses at most its last exchange.
+Passwords and tokens are replaced with placeholders before anything is written.
+"""
+from collections import deque
+from dataclasses import dataclass
+import base64
+import json
+import struct
+import threading
+import time
+import zlib
+
+from pyjiit.encryption import deserialize_payload
+from pyjiit.transport import AsyncTransport, Response, Transport
+
+
+MAGIC = b"PYJIITC1"
+
+# fields never written to a cassette, in request payloads (passwords) and responses (bearer tokens)
+SECRET_FIELDS = frozenset({"passwordotpvalue", "password", "oldpassword", "newpassword", "confirmpassword", "token"})
+
+REDACTED = "<redacted>"
+
+# stands in for recorded tokens: it parses like a token which never expires, so a replayed login works,
+# but it is not signed and the portal never accepts it
+REDACTED_TOKEN = ".".join(
+    base64.b64encode(json.dumps(part, separators=(",", ":")).encode()).decode()
+    for part in ({"alg": "none", "typ": "JWT"}, {"sub": REDACTED, "exp": 4102444800})
+) + ".redacted"
+
+_LENGTH = struct.Struct("<I")
+
+
+def _redact(value):
+    if isinstance(value, dict):
+        return {
+            k: (REDACTED_TOKEN if k.lower() == "token" else REDACTED) if k.lower() in SECRET_FIELDS else _redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+def _canonical(payload) -> str:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+def _endpoint(url: str) -> str:
+    return url.split("/StudentPortalAPI", 1)[-1]
+
+def _payload(kwargs: dict):
+    # login payloads are stored decrypted, so they can be read and matched whatever day they are replayed on.
+    # Secrets are redacted here, for recording and for matching alike, so a login matches its recording by key
+    if "json" in kwargs:
+        return _redact(kwargs["json"])
+    data = kwargs.get("data")
+    if not data:
+        return None
+    try:
+        return _redact(deserialize_payload(data))
+    except ValueError:
+        return data
+
+def _content(content: bytes) -> bytes:
+    # responses are rewritten only if they hold a secret, others are stored byte for byte
+    try:
+        resp = json.loads(content)
+    except ValueError:
+        return content
+    redacted = _redact(resp)
+    if redacted == resp:
+        return content
+    return json.dumps(redacted, separators=(",", ":")).encode()
+
+
+@dataclass
+class Exchange:
+    """
+    Class containing one recorded request and its response
+
+    at is the unix time the request was sent, latency is in seconds and content is the raw response body.
+    """
+    at: float
+    latency: float
+    method: str
+    endpoint: str
+    payload: object
+    status: int
+    content: bytes
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps(
+            [self.at, self.latency, self.method, self.endpoint, self.payload, self.status], separators=(",", ":")
+        ).encode()
+        record = zlib.compress(meta + b"\n" + self.content)
+        return _LENGTH.pack(len(record)) + record
+
+    @staticmethod
+    def from_record(record: bytes) -> 'Exchange':
+        meta, content = zlib.decompress(record).split(b"\n", 1)
+        return Exchange(*json.loads(meta), content)
+
+
+class Cassette:
+    """
+    Class which appends exchanges to a cassette file, thread safe
+
+    An existing cassette is appended to, so several runs can record into the same file.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, exchange: Exchange):
+        data = exchange.to_bytes()
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_cassette(path: str):
+    """
+    Yields the Exchanges of the cassette at path in recorded order (a truncated last exchange is skipped)
+
+    :raises ValueError: Raised if path is not a cassette
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a pyjiit cassette")
+
+        while True:
+            header = f.read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                return
+            record = f.read(_LENGTH.unpack(header)[0])
+            try:
+                yield Exchange.from_record(record)
+            except zlib.error:
+                return
+
+
+class RecordingTransport(Transport):
+    """
+    Transport which passes requests to another transport and records every exchange to a Cassette
+    """
+    def __init__(self, transport: Transport, cassette: Cassette) -> None:
+        """
+        :param transport: Transport doing the actual requests, e.g. a RequestsTransport
+        :param cassette: Cassette the exchanges are appended to
+        """
+        self.transport = transport
+        self.cassette = cassette
+
+    def request(self, method: str, url: str, **kwargs):
+        at = time.time()
+        start = time.perf_counter()
+        response = self.transport.request(method, url, **kwargs)
+        latency = time.perf_counter() - start
+
+        self.cassette.append(
+            Exchange(at, latency, method, _endpoint(url), _payload(kwargs), response.status_code, _content(response.content))
+        )
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRecordingTransport(AsyncTransport):
+    """
+    AsyncTransport which passes requests to another one and records every exchange to a Cassette
+    """
+    def __init__(self, transport: AsyncTransport, cassette: Cassette) -> None:
+        self.transport = transport
+        self.cassette = cassette
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        at = time.time()
+        start = time.perf_counter()
+        response = await self.transport.request(method, url, **kwargs)
+        latency = time.perf_counter() - start
+
+        self.cassette.append(
+            Exchange(at, latency, method, _endpoint(url), _payload(kwargs), response.status_code, _content(response.content))
+        )
+        return response
+
+    async def close(self):
+        await self.transport.close()
+
+
+class _Replay:
+    # picks the recorded response of a request, shared by the sync and async replay transports
+    def __init__(self, exchanges, pace: float) -> None:
+        if isinstance(exchanges, str):
+            exchanges = read_cassette(exchanges)
+
+        self.pace = pace
+        self.served = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._exact: dict[tuple, deque] = {}
+        self._endpoints: dict[tuple, deque] = {}
+        for e in exchanges:
+            # cassettes written before redaction still hold secrets, so they are matched by key too
+            self._exact.setdefault((e.method, e.endpoint, _canonical(_redact(e.payload))), deque()).append(e)
+            self._endpoints.setdefault((e.method, e.endpoint), deque()).append(e)
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._endpoints.values())
+
+    def _pick(self, method: str, url: str, kwargs: dict) -> Exchange:
+        endpoint = _endpoint(url)
+        with self._lock:
+            # same payload if it was recorded, else any exchange of the endpoint, round robin
+            queue = self._exact.get((method, endpoint, _canonical(_payload(kwargs))))
+            if queue is None:
+                queue = self._endpoints.get((method, endpoint))
+            if queue is None:
+                self.missed += 1
+                return None
+            exchange = queue[0]
+            queue.rotate(-1)
+            self.served += 1
+            return exchange
+
+    @staticmethod
+    def _response(exchange: Exchange) -> Response:
+        if exchange is None:
+            return Response(404, b'{"status":{"responseStatus":"Failure","errors":["Not recorded"]},"response":null}')
+        return Response(exchange.status, exchange.content)
+
+
+class ReplayTransport(_Replay, Transport):
+    """
+    Transport which answers requests from recorded exchanges, without any network
+
+    A request gets the response recorded for the same endpoint and payload, or, if there is none, the next
+    response recorded for the endpoint (round robin, so a short recording can serve a long benchmark).
+    Passwords and tokens are matched by key only, and LocalName headers are not checked. Endpoints which were
+    never recorded get a 404.
+    """
+    def __init__(self, exchanges, pace: float = 0.0) -> None:
+        """
+        :param exchanges: Path of a cassette, or an iterable of Exchange
+        :param pace: Multiplier of the recorded latency to wait before answering (0 answers at full speed,
+                     1 at the recorded pacing)
+        """
+        super().__init__(exchanges, pace)
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        exchange = self._pick(method, url, kwargs)
+        if exchange is not None and self.pace:
+            time.sleep(exchange.latency * self.pace)
+        return self._response(exchange)
+
+
+class AsyncReplayTransport(_Replay, AsyncTransport):
+    """
+    AsyncTransport version of ReplayTransport
+    """
+    def __init__(self, exchanges, pace: float = 0.0) -> None:
+        super().__init__(exchanges, pace)
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        exchange = self._pick(method, url, kwargs)
+        if exchange is not None and self.pace:
+            import asyncio
+            await asyncio.sleep(exchange.latency * self.pace)
+        return self._response(exchange)
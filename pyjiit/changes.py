@@ -0,0 +1,261 @@
+from dataclasses import dataclass
+import hashlib
+import json
+import math
+import struct
+import threading
+
+from pyjiit.attendance import COMPONENTS
+
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+
+# little endian without padding, so a database can be read on any platform
+_DIGEST = struct.Struct("<16sI") # response digest, number of subjects
+_SUBJECT = struct.Struct("<H8sdd") # length of subject code, row hash, attended, total
+
+# native formats of databases written before user_version 1, converted when they are opened
+_NATIVE_DIGEST = struct.Struct("16sI")
+_NATIVE_SUBJECT = struct.Struct("H8sdd")
+
+SCHEMA_VERSION = 1
+
+def _dumps(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+def _hash(text: str, size: int) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=size).digest()
+
+def _count(row: dict, suffix: str) -> float:
+    out = 0.0
+    for c in COMPONENTS:
+        value = row.get(c + suffix)
+        if value is not None and value != "" and not math.isnan(float(value)):
+            out += float(value)
+    return out
+
+
+@dataclass
+class AttendanceChange:
+    """
+    Class containing one changed subject, as found by AttendanceTracker
+
+    kind is one of ADDED, CHANGED and REMOVED. attended and total are classes summed over all components,
+    row is the new record from the response (None if the subject was removed).
+    """
+    user: str
+    semester: str
+    subject_code: str
+    kind: str
+    attended_before: float
+    total_before: float
+    attended: float
+    total: float
+    row: dict = None
+
+    @property
+    def new_classes(self) -> float:
+        """Number of classes held since the previous snapshot"""
+        return self.total - self.total_before
+
+    @property
+    def new_attended(self) -> float:
+        """Number of classes attended since the previous snapshot"""
+        return self.attended - self.attended_before
+
+
+class AttendanceSnapshot:
+    """
+    Class containing the compact state of one attendance response
+
+    Only a digest of the whole response and, per subject, a row hash and the attended/total counters are kept,
+    which is about 30 bytes a subject when serialized with :code:`to_bytes` (little endian, the same on every platform).
+    """
+    __slots__ = ("digest", "subjects")
+
+    def __init__(self, digest: bytes, subjects: dict) -> None:
+        """
+        :param digest: Hash of the whole attendance list
+        :param subjects: A dictionary of subject code -> (row hash, attended, total)
+        """
+        self.digest = digest
+        self.subjects = subjects
+
+    @staticmethod
+    def digest_of(resp: dict) -> tuple:
+        """
+        :param resp: Response of the attendance detail API
+        :returns: A tuple of the digest and the rows it was computed from
+        """
+        rows = resp["studentattendancelist"]
+        return _hash(_dumps(rows), 16), rows
+
+    @staticmethod
+    def from_json(resp: dict) -> 'AttendanceSnapshot':
+        digest, rows = AttendanceSnapshot.digest_of(resp)
+        return AttendanceSnapshot.from_rows(digest, rows)
+
+    @staticmethod
+    def from_rows(digest: bytes, rows: list) -> 'AttendanceSnapshot':
+        subjects = {}
+        for row in rows:
+            subjects[row["individualsubjectcode"]] = (_hash(_dumps(row), 8), _count(row, "totalpres"), _count(row, "totalclass"))
+        return AttendanceSnapshot(digest, subjects)
+
+    def to_bytes(self) -> bytes:
+        out = [_DIGEST.pack(self.digest, len(self.subjects))]
+        for code, (row_hash, attended, total) in self.subjects.items():
+            encoded = code.encode()
+            out.append(_SUBJECT.pack(len(encoded), row_hash, attended, total))
+            out.append(encoded)
+        return b"".join(out)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'AttendanceSnapshot':
+        return AttendanceSnapshot._unpack(data, _DIGEST, _SUBJECT)
+
+    @staticmethod
+    def _unpack(data: bytes, digest_format: struct.Struct, subject_format: struct.Struct) -> 'AttendanceSnapshot':
+        digest, n = digest_format.unpack_from(data)
+        offset = digest_format.size
+        subjects = {}
+        for _ in range(n):
+            length, row_hash, attended, total = subject_format.unpack_from(data, offset)
+            offset += subject_format.size
+            subjects[data[offset:offset + length].decode()] = (row_hash, attended, total)
+            offset += length
+        return AttendanceSnapshot(digest, subjects)
+
+
+class AttendanceTracker:
+    """
+    Class which keeps an AttendanceSnapshot per student and semester and turns new responses into change events
+
+    An unchanged response costs one hash comparison, otherwise only rows whose hash differs become events.
+    Snapshots are kept in memory and, if a path is given, in an SQLite file so polling can resume after a restart.
+    Methods are thread safe.
+    """
+
+    def __init__(self, path: str = None) -> None:
+        """
+        :param path: Path of the SQLite database (memory only if None)
+        """
+        self._lock = threading.Lock()
+        self._snapshots: dict[tuple, AttendanceSnapshot] = {}
+        self._db = None
+
+        if path is not None:
+            import sqlite3
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "user TEXT, semester TEXT, snapshot BLOB, PRIMARY KEY (user, semester))"
+            )
+            if self._db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._migrate()
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def close(self):
+        """Closes the SQLite database"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def snapshot(self, user: str, semester: str) -> AttendanceSnapshot:
+        """
+        :param user: A user id
+        :param semester: A registration id
+        :returns: The last snapshot of user and semester (None if there is none)
+        """
+        with self._lock:
+            return self._load(user, semester)
+
+    def update(self, user: str, semester: str, resp: dict) -> list:
+        """
+        Stores a snapshot of resp and compares it with the previous one
+
+        :param user: A user id
+        :param semester: A registration id
+        :param resp: Response of the attendance detail API (as returned by Webportal.get_attendance)
+        :returns: A list of AttendanceChange, empty if nothing changed. Every subject is ADDED on the first update.
+        """
+        digest, rows = AttendanceSnapshot.digest_of(resp)
+
+        with self._lock:
+            old = self._load(user, semester)
+            if old is not None and old.digest == digest:
+                return []
+
+            new = AttendanceSnapshot.from_rows(digest, rows)
+            self._store(user, semester, new)
+
+        old_subjects = old.subjects if old is not None else {}
+        changes = []
+        for row in rows:
+            code = row["individualsubjectcode"]
+            row_hash, attended, total = new.subjects[code]
+            before = old_subjects.get(code)
+            if before is None:
+                changes.append(AttendanceChange(user, semester, code, ADDED, 0.0, 0.0, attended, total, row))
+            elif before[0] != row_hash:
+                changes.append(AttendanceChange(user, semester, code, CHANGED, before[1], before[2], attended, total, row))
+
+        for code, (_, attended, total) in old_subjects.items():
+            if code not in new.subjects:
+                changes.append(AttendanceChange(user, semester, code, REMOVED, attended, total, 0.0, 0.0))
+
+        return changes
+
+    def forget(self, user: str = None, semester: str = None):
+        """
+        Drops snapshots matching user and semester (None matches everything)
+        """
+        with self._lock:
+            for key in list(self._snapshots):
+                if (user is None or key[0] == user) and (semester is None or key[1] == semester):
+                    del self._snapshots[key]
+
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM snapshots WHERE (? IS NULL OR user = ?) AND (? IS NULL OR semester = ?)",
+                    (user, user, semester, semester)
+                )
+                self._db.commit()
+
+    def _migrate(self):
+        # snapshots written with the native struct formats were written on this platform, so they can be read here
+        rows = self._db.execute("SELECT user, semester, snapshot FROM snapshots").fetchall()
+        for user, semester, blob in rows:
+            snapshot = AttendanceSnapshot._unpack(blob, _NATIVE_DIGEST, _NATIVE_SUBJECT)
+            self._db.execute(
+                "UPDATE snapshots SET snapshot = ? WHERE user = ? AND semester = ?", (snapshot.to_bytes(), user, semester)
+            )
+        self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _load(self, user, semester):
+        snapshot = self._snapshots.get((user, semester))
+        if snapshot is not None or self._db is None:
+            return snapshot
+
+        row = self._db.execute(
+            "SELECT snapshot FROM snapshots WHERE user = ? AND semester = ?", (user, semester)
+        ).fetchone()
+        if row is None:
+            return None
+
+        snapshot = self._snapshots[(user, semester)] = AttendanceSnapshot.from_bytes(row[0])
+        return snapshot
+
+    def _store(self, user, semester, snapshot):
+        self._snapshots[(user, semester)] = snapshot
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)", (user, semester, snapshot.to_bytes())
+            )
+            self._db.commit()
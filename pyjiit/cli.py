@@ -0,0 +1,268 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+
+from pyjiit.default import CAPTCHA
+from pyjiit.transport import RequestsTransport
+from pyjiit.wrapper import API, Webportal
+
+
+SECTIONS = ("attendance", "registrations", "exams")
+
+
+def read_credentials(f):
+    """
+    Yields (username, password) from a CSV file of :code:`username,password` lines, skipping blank lines and # comments
+
+    :raises ValueError: Raised for a line without a username and a password, naming its line number
+    """
+    reader = csv.reader(f)
+    for row in reader:
+        if not any(cell.strip() for cell in row) or row[0].lstrip().startswith("#"):
+            continue
+        if len(row) < 2 or not row[0].strip():
+            raise ValueError(f"line {reader.line_num}: expected username,password")
+        yield row[0].strip(), row[1]
+
+
+def read_checkpoint(path: str) -> set:
+    """
+    :returns: The set of usernames already exported according to the checkpoint file at path
+    """
+    if path is None or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.split("\t", 1)[0].strip() for line in f if line.strip()}
+
+
+def checkpoint_offset(path: str) -> int:
+    """
+    :returns: Size the output had when the last account of the checkpoint file at path was written
+              (None if it is not known, e.g. the output was not a file)
+    """
+    offset = None
+    if path is None or not os.path.exists(path):
+        return offset
+    with open(path) as f:
+        for line in f:
+            _, _, value = line.strip().partition("\t")
+            if value:
+                offset = int(value)
+    return offset
+
+
+class NDJSONWriter:
+    """
+    Writes every record as one JSON line
+
+    Records of an account are held back until the account is done, so the output never contains part of an account,
+    and each account's lines are contiguous. The checkpoint gets the username and the size of the output after its
+    records, so an interrupted export can be cut back to the last checkpointed account.
+    """
+    def __init__(self, out, checkpoint=None) -> None:
+        self.out = out
+        self.checkpoint = checkpoint
+        self._lock = threading.Lock()
+        self._accounts: dict[str, list] = {} # username -> records not written yet
+
+    def write(self, record: dict):
+        with self._lock:
+            self._accounts.setdefault(record["user"], []).append(record)
+
+    def done(self, username: str):
+        """Writes every record of username and checkpoints it"""
+        with self._lock:
+            self._emit(username, self._accounts.pop(username, []))
+
+    def fail(self, username: str, record: dict):
+        """Drops the records of username and writes record (usually an error record) instead, without checkpointing"""
+        with self._lock:
+            self._accounts.pop(username, None)
+            self._emit(None, [record])
+
+    def close(self):
+        with self._lock:
+            self.out.flush()
+
+    def _emit(self, username, records):
+        self.out.write("".join(json.dumps(record, separators=(",", ":"), default=str) + "\n" for record in records))
+        self.out.flush()
+        if username is not None:
+            self._mark([username])
+
+    def _mark(self, usernames):
+        if self.checkpoint is None or not usernames:
+            return
+        offset = f"\t{self.out.tell()}" if self.out.seekable() else ""
+        self.checkpoint.write("".join(f"{u}{offset}\n" for u in usernames))
+        self.checkpoint.flush()
+
+
+class ColumnarWriter(NDJSONWriter):
+    """
+    Buffers at most batch_size records per record type and writes them as one JSON line
+    of :code:`{"type": ..., "count": n, "columns": {field: [values]}}`
+
+    Only records of accounts which are done are batched, so a batch never holds part of an account.
+    """
+    def __init__(self, out, checkpoint=None, batch_size: int = 1000) -> None:
+        super().__init__(out, checkpoint)
+        self.batch_size = batch_size
+        self._batches: dict[str, list] = {}
+        self._finished = [] # accounts whose records are still buffered
+
+    def close(self):
+        with self._lock:
+            self._flush()
+
+    def _emit(self, username, records):
+        full = False
+        for record in records:
+            batch = self._batches.setdefault(record["type"], [])
+            batch.append(record)
+            full = full or len(batch) >= self.batch_size
+        if username is not None:
+            self._finished.append(username)
+        if full:
+            self._flush()
+
+    def _flush(self):
+        # everything is flushed at once, so an account is checkpointed only after all of its records are out
+        for kind, batch in self._batches.items():
+            if not batch:
+                continue
+            fields = list(dict.fromkeys(k for record in batch for k in record if k != "type"))
+            columns = {k: [record.get(k) for record in batch] for k in fields}
+            self.out.write(json.dumps({"type": kind, "count": len(batch), "columns": columns}, separators=(",", ":"), default=str) + "\n")
+        self._batches = {}
+        self.out.flush()
+        self._mark(self._finished)
+        self._finished = []
+
+
+def export_account(w: Webportal, username: str, sections, write):
+    """
+    Calls write with a flat record dictionary for every row of the selected sections of one logged in account
+    """
+    if "attendance" in sections:
+        meta = w.get_attendance_meta()
+        header = meta.latest_header()
+        for semester in meta.semesters:
+            resp = w.get_attendance(header, semester)
+            for row in resp["studentattendancelist"]:
+                write({"type": "attendance", "user": username, "semester": semester.registration_code, **row})
+
+    if "registrations" in sections:
+        for semester in w.get_registered_semesters():
+            for subject in w.get_registered_subjects_and_faculties(semester).subjects:
+                write({"type": "registration", "user": username, "semester": semester.registration_code, **asdict(subject)})
+
+    if "exams" in sections:
+        for semester in w.get_semesters_for_exam_events():
+            for event in w.get_exam_events(semester):
+                write({"type": "exam_event", "user": username, "semester": semester.registration_code, **asdict(event)})
+
+                schedule = w.get_exam_schedule(event)
+                rows = schedule.get("subjectinfo") if isinstance(schedule, dict) else None
+                for row in rows if isinstance(rows, list) else [schedule]:
+                    write({"type": "exam_schedule", "user": username, "semester": semester.registration_code,
+                           "exam_event_code": event.exam_event_code, **row})
+
+
+def export(credentials, writer: NDJSONWriter, sections=SECTIONS, concurrency: int = 4, skip: set = frozenset(), api: str = API) -> int:
+    """
+    Exports every account of credentials, at most concurrency at a time
+
+    :param credentials: An iterable of (username, password), consumed lazily
+    :param writer: NDJSONWriter or ColumnarWriter receiving the records
+    :param skip: Usernames to leave out (already exported)
+    :returns: Number of accounts which failed, each is written as an "error" record (instead of its other records)
+              and not checkpointed
+    """
+    transport = RequestsTransport(pool_size=max(10, concurrency))
+    slots = threading.BoundedSemaphore(concurrency)
+    failed = []
+
+    def job(username, password):
+        try:
+            w = Webportal(transport, api=api, keep_raw=False)
+            w.student_login(username, password, CAPTCHA)
+            export_account(w, username, sections, writer.write)
+            writer.done(username)
+        except Exception as e:
+            failed.append(username)
+            writer.fail(username, {"type": "error", "user": username, "error": f"{type(e).__name__}: {e}"})
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="pyjiit-export") as executor:
+        for username, password in credentials:
+            if username in skip:
+                continue
+            slots.acquire() # keeps at most concurrency accounts queued or running
+            executor.submit(job, username, password)
+
+    writer.close()
+    transport.close()
+    return len(failed)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="pyjiit", description="Tools for the JIIT webportal")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("export", help="Export the data of many accounts as newline delimited JSON")
+    p.add_argument("credentials", help="CSV file of username,password lines")
+    p.add_argument("-o", "--output", help="Output file (default: stdout)")
+    p.add_argument("--format", choices=("ndjson", "columnar"), default="ndjson",
+                   help="ndjson writes one line per record, columnar one line per batch of records of a type")
+    p.add_argument("--batch-size", type=int, default=1000, help="Records per columnar batch")
+    p.add_argument("-j", "--concurrency", type=int, default=4, help="Accounts exported at the same time")
+    p.add_argument("--checkpoint", help="File of exported usernames, they are skipped when the export is run again")
+    p.add_argument("--sections", default=",".join(SECTIONS), help=f"Comma separated subset of {','.join(SECTIONS)}")
+    p.add_argument("--api", default=API, help="Base URL of the StudentPortalAPI")
+    args = parser.parse_args(argv)
+
+    sections = [s for s in args.sections.split(",") if s]
+    for s in sections:
+        if s not in SECTIONS:
+            parser.error(f"unknown section {s!r}")
+
+    # read up front, so a malformed line stops the export before anything is written
+    try:
+        with open(args.credentials, newline="") as f:
+            credentials = list(read_credentials(f))
+    except ValueError as e:
+        parser.error(f"{args.credentials}: {e}")
+
+    skip = read_checkpoint(args.checkpoint)
+    # resuming appends to the output of the interrupted run, cut back to its last checkpointed account
+    out = open(args.output, "a" if skip else "w") if args.output else sys.stdout
+    offset = checkpoint_offset(args.checkpoint) if skip and args.output else None
+    if offset is not None:
+        out.truncate(offset)
+    checkpoint = open(args.checkpoint, "a") if args.checkpoint else None
+
+    if args.format == "columnar":
+        writer = ColumnarWriter(out, checkpoint, args.batch_size)
+    else:
+        writer = NDJSONWriter(out, checkpoint)
+
+    try:
+        failed = export(credentials, writer, sections, args.concurrency, skip, args.api)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        if out is not sys.stdout:
+            out.close()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
-from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad, unpad
+from collections import deque
 import json
 import base64
+import threading
+import time
 import pyjiit.utils
 
 IV = b"dcek9wb8frty1pnm"
+_IV_INT = int.from_bytes(IV, "big")
 
 def generate_key(date=None) -> bytes:
     """Returns AES key for decrypting/encrypting payload (resets everyday on 0000 hrs IST)"""
@@ -12,27 +15,227 @@ def generate_key(date=None) -> bytes:
 
 def generate_local_name(date=None) -> str:
     """Returns LocalName Header required for every HTTP request sent to the server"""
-    name_bytes = (pyjiit.utils.get_random_char_seq(4) + pyjiit.utils.generate_date_seq(date) + pyjiit.utils.get_random_char_seq(5)).encode()
-    
+    date_seq = CONTEXT.date_seq() if date is None else pyjiit.utils.generate_date_seq(date)
+    name_bytes = (pyjiit.utils.get_random_char_seq(4) + date_seq + pyjiit.utils.get_random_char_seq(5)).encode()
+
     return base64.b64encode(encrypt(name_bytes)).decode()
 
 
 def get_crypt(key: bytes, iv: bytes):
+    from Crypto.Cipher import AES # loaded on first use, it takes longer to import than the rest of pyjiit
     return AES.new(key, AES.MODE_CBC, iv)
 
+def _xor_block(block: bytes, mask: int) -> bytes:
+    return (int.from_bytes(block, "big") ^ mask).to_bytes(16, "big")
+
+
+class CryptoContext:
+    """
+    Class which holds the AES key of one IST day and reuses the cipher objects across calls
+
+    Creating an AES object is the bulk of the cost of a small encrypt/decrypt, so one CBC encryptor and
+    one decryptor are kept alive for the whole day. A CBC object continues its chain from the last
+    block it processed instead of the IV, so only the first block of every message needs correcting
+    (xor with last block ^ IV) to get exactly what a fresh AES.new(key, MODE_CBC, IV) would produce.
+    The key rolls over at 0000 hrs IST, cipher objects are created on first use. Methods are thread safe.
+    """
+    def __init__(self, date=None) -> None:
+        """
+        :param date: A datetime.date to pin the key to (defaults to the current IST day, with rollover)
+        """
+        self.date = date
+        self._lock = threading.Lock()
+        self._expires = 0.0
+
+    def _rollover(self):
+        if time.time() < self._expires:
+            return
+
+        if self.date is None:
+            today = pyjiit.utils.ist_now().date()
+            self._expires = pyjiit.utils.next_ist_midnight(today)
+        else:
+            today = self.date
+            self._expires = float("inf")
+
+        self._date_seq = pyjiit.utils.generate_date_seq(today)
+        self._key = generate_key(today)
+        self._encryptor = get_crypt(self._key, IV)
+        self._decryptor = get_crypt(self._key, IV)
+        self._enc_last = _IV_INT
+        self._dec_last = _IV_INT
+
+    def date_seq(self) -> str:
+        """Returns the date sequence of the current day"""
+        with self._lock:
+            self._rollover()
+            return self._date_seq
+
+    def key(self) -> bytes:
+        """Returns the AES key of the current day"""
+        with self._lock:
+            self._rollover()
+            return self._key
+
+    def _encrypt(self, data: bytes) -> bytes:
+        padded = pad(data, 16)
+        first = _xor_block(padded[:16], self._enc_last ^ _IV_INT)
+        out = self._encryptor.encrypt(first + padded[16:])
+        self._enc_last = int.from_bytes(out[-16:], "big")
+        return out
+
+    def encrypt(self, data: bytes) -> bytes:
+        """Returns data padded and encrypted with AES-CBC"""
+        with self._lock:
+            self._rollover()
+            return self._encrypt(data)
+
+    def encrypt_many(self, datas: list) -> list:
+        """Returns a list of encrypted byte strings (same as calling encrypt on each)"""
+        with self._lock:
+            self._rollover()
+            return [self._encrypt(data) for data in datas]
+
+    def local_names(self, n: int) -> tuple:
+        """
+        :param n: Number of values to generate
+        :returns: A tuple of a list of n LocalName header values and the unix timestamp until which they are valid
+        """
+        rand = pyjiit.utils.get_random_char_seq(9 * n)
+        with self._lock:
+            self._rollover()
+            seq = self._date_seq
+            names = [self._encrypt((rand[i:i+4] + seq + rand[i+4:i+9]).encode()) for i in range(0, 9 * n, 9)]
+            expires = self._expires
+
+        return [base64.b64encode(name).decode() for name in names], expires
+
+    def decrypt(self, data: bytes) -> bytes:
+        """Returns data decrypted with AES-CBC and unpadded"""
+        return self.decrypt_many([data])[0]
+
+    def decrypt_many(self, datas: list) -> list:
+        """
+        Returns a list of decrypted byte strings (same as calling decrypt on each)
+
+        CBC decryption does not chain through the plaintext, so all messages are decrypted with a single call
+        and only the first block of each one is fixed up afterwards.
+        """
+        for data in datas:
+            if not data or len(data) % 16:
+                raise ValueError("Data must be padded to 16 byte boundary in CBC mode")
+
+        with self._lock:
+            self._rollover()
+            raw = self._decryptor.decrypt(b"".join(datas))
+            prev = self._dec_last
+            self._dec_last = int.from_bytes(datas[-1][-16:], "big") if datas else prev
+
+        out = []
+        offset = 0
+        for data in datas:
+            end = offset + len(data)
+            first = _xor_block(raw[offset:offset+16], prev ^ _IV_INT)
+            out.append(unpad(first + raw[offset+16:end], 16))
+            prev = int.from_bytes(data[-16:], "big")
+            offset = end
+
+        return out
+
+
+CONTEXT = CryptoContext()
+
+
+class LocalNameProvider:
+    """
+    Class which keeps a buffer of pregenerated LocalName header values for the current IST day
+
+    Values are generated in bulk (one lock and one date lookup per batch). When the buffer runs low it is
+    refilled on a background thread, and the whole buffer is dropped at 0000 hrs IST. Every value is handed out once.
+    """
+    def __init__(self, size: int = 512, refill_at: int = None, background: bool = True, context: CryptoContext = None) -> None:
+        """
+        :param size: Number of values kept in the buffer
+        :param refill_at: Buffer length below which a refill is started (defaults to a quarter of size)
+        :param background: Refill on a background thread instead of the calling thread
+        :param context: CryptoContext used to generate the values (defaults to the shared one)
+        """
+        self.size = size
+        self.refill_at = refill_at if refill_at is not None else size // 4
+        self.background = background
+        self.context = context if context is not None else CONTEXT
+
+        self._names = deque()
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._refilling = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def get(self) -> str:
+        """Returns a LocalName header value valid for the current IST day"""
+        if time.time() >= self._expires:
+            self.fill()
+
+        while True:
+            try:
+                name = self._names.popleft()
+                break
+            except IndexError:
+                self.fill()
+
+        if len(self._names) < self.refill_at:
+            if self.background:
+                self._refill_in_background()
+            else:
+                self.fill()
+
+        return name
+
+    def fill(self):
+        """Generates values until the buffer is full (drops values of a previous day)"""
+        with self._lock:
+            if time.time() >= self._expires:
+                self._names.clear()
+
+            n = self.size - len(self._names)
+            if n <= 0:
+                return
+
+            names, expires = self.context.local_names(n)
+            if expires != self._expires:
+                self._names.clear()
+                self._expires = expires
+            self._names.extend(names)
+
+    def _refill_in_background(self):
+        # at most one refill thread at a time, callers never wait for it
+        if not self._refilling.acquire(blocking=False):
+            return
+
+        threading.Thread(target=self._background_fill, name="pyjiit-localname", daemon=True).start()
+
+    def _background_fill(self):
+        try:
+            self.fill()
+        finally:
+            self._refilling.release()
+
+
+LOCAL_NAMES = LocalNameProvider()
+
 def decrypt(data: bytes) -> bytes:
-    crypt = get_crypt(generate_key(), IV)
-    return unpad(crypt.decrypt(data), 16)
+    return CONTEXT.decrypt(data)
 
 def encrypt(data: bytes) -> bytes:
-    crypt = get_crypt(generate_key(), IV)
-    return crypt.encrypt(pad(data, 16))
+    return CONTEXT.encrypt(data)
 
 def deserialize_payload(payload: str) -> dict:
     """Returns decrypted json from payload"""
     pbytes = base64.b64decode(payload)
     raw = decrypt(pbytes)
-    
+
     return json.loads(raw)
 
 
@@ -44,7 +247,20 @@ def serialize_payload(payload: dict) -> str:
     return base64.b64encode(pbytes).decode()
 
 
+def deserialize_payloads(payloads: list) -> list:
+    """Returns a list of decrypted jsons from a list of payloads (with one key lookup and one AES call)"""
+    raws = CONTEXT.decrypt_many([base64.b64decode(payload) for payload in payloads])
+
+    return [json.loads(raw) for raw in raws]
+
+
+def serialize_payloads(payloads: list) -> list:
+    """Returns a list of encrypted payloads from a list of dictionaries (with one key lookup)"""
+    raws = [json.dumps(payload, separators=(',', ':')).encode() for payload in payloads]
+
+    return [base64.b64encode(pbytes).decode() for pbytes in CONTEXT.encrypt_many(raws)]
+
+
 if __name__ == "__main__":
     import sys
     print(deserialize_payload(sys.argv[1], True))
-
@@ -1,4 +1,9 @@
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+import bisect
+import re
+
+from pyjiit.utils import IST, ist_now
 
 @dataclass
 class ExamEvent:
@@ -20,4 +25,157 @@ class ExamEvent:
         )
 
 
+_CODE = re.compile(r"\(([^()]*)\)\s*$")
+
+def _parse_time(date: str, clock: str):
+    # the portal sends "dd/mm/yyyy" and "hh:mm AM", both are local to IST
+    if not date:
+        return None
+    text = f"{date} {clock.strip()}" if clock else date
+    for fmt in ("%d/%m/%Y %I:%M %p", "%d/%m/%Y %H:%M", "%d/%m/%Y"):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=IST)
+    return None
+
+
+@dataclass
+class ExamScheduleEntry:
+    """Class containing one exam (subject, time and seat) of an exam event"""
+    subject_code: str
+    subject_desc: str
+    start: datetime
+    end: datetime
+    room_code: str
+    seat_no: str
+    exam_event_code: str
+    exam_event_id: str
+
+    @staticmethod
+    def from_json(resp: dict, exam_event: ExamEvent) -> 'ExamScheduleEntry':
+        # subjectcode is "SUBJECT NAME(CODE)"
+        match = _CODE.search(resp.get("subjectcode") or "")
+        date = resp.get("datetime")
+        return ExamScheduleEntry(
+            match.group(1) if match else resp.get("subjectcode"),
+            resp.get("subjectdesc"),
+            _parse_time(date, resp.get("datetimefrom")),
+            _parse_time(date, resp.get("datetimeupto")) if resp.get("datetimeupto") else None,
+            resp.get("roomcode"),
+            resp.get("seatno"),
+            exam_event.exam_event_code,
+            exam_event.exam_event_id
+        )
+
+    @staticmethod
+    def list_from_json(resp: dict, exam_event: ExamEvent) -> list:
+        """
+        :param resp: Response of the exam schedule API
+        :returns: A list of ExamScheduleEntry of every subject in it
+        """
+        return [ExamScheduleEntry.from_json(i, exam_event) for i in resp.get("subjectinfo") or []]
+
+
+class ExamScheduleIndex:
+    """
+    Class which indexes ExamScheduleEntries of many exam events by start time and by subject code
+
+    Entries are kept sorted by start time, so time range queries are two bisections. Entries of one exam event
+    can be replaced on their own with :code:`update` when that event is fetched again.
+    Entries without a parsable time are only reachable by subject (and :code:`undated`).
+    """
+    def __init__(self) -> None:
+        self._times = [] # sorted start timestamps
+        self._entries = [] # entries in the order of _times
+        self._events: dict[str, list] = {} # exam_event_id -> its entries
+        self._subjects: dict[str, list] = {} # subject code -> entries sorted by time
+        self.undated = []
+        self.errors = {}
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self.undated)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def update(self, exam_event: ExamEvent, entries: list):
+        """
+        Replaces the entries of exam_event with entries
+        """
+        subjects = set()
+        for old in self._events.pop(exam_event.exam_event_id, []):
+            subjects.add(old.subject_code)
+            if old.start is None:
+                self.undated.remove(old)
+                continue
+            t = old.start.timestamp()
+            i = bisect.bisect_left(self._times, t)
+            while self._entries[i] is not old:
+                i += 1
+            del self._times[i]
+            del self._entries[i]
+
+        for entry in entries:
+            subjects.add(entry.subject_code)
+            if entry.start is None:
+                self.undated.append(entry)
+                continue
+            t = entry.start.timestamp()
+            i = bisect.bisect_right(self._times, t)
+            self._times.insert(i, t)
+            self._entries.insert(i, entry)
+        self._events[exam_event.exam_event_id] = list(entries)
+
+        for code in subjects:
+            self._subjects.pop(code, None)
+
+    def remove(self, exam_event: ExamEvent):
+        """Drops every entry of exam_event"""
+        self.update(exam_event, [])
+
+    def between(self, start: datetime, end: datetime) -> list:
+        """
+        :returns: Entries starting in [start, end), sorted by start time
+        """
+        lo = bisect.bisect_left(self._times, start.timestamp())
+        hi = bisect.bisect_left(self._times, end.timestamp())
+        return self._entries[lo:hi]
+
+    def upcoming(self, within: timedelta = timedelta(days=7), now: datetime = None) -> list:
+        """
+        :param within: Length of the window
+        :param now: Start of the window (defaults to the current time)
+        :returns: Entries starting in the next within, sorted by start time
+        """
+        if now is None:
+            now = ist_now()
+        return self.between(now, now + within)
+
+    def next(self, now: datetime = None) -> ExamScheduleEntry:
+        """
+        :returns: The first entry starting at or after now (None if there is none)
+        """
+        if now is None:
+            now = ist_now()
+        i = bisect.bisect_left(self._times, now.timestamp())
+        return self._entries[i] if i < len(self._entries) else None
+
+    def subject(self, subject_code: str) -> list:
+        """
+        :returns: Entries of subject_code over all events, sorted by start time (undated ones last)
+        """
+        entries = self._subjects.get(subject_code)
+        if entries is None:
+            entries = [e for e in self._entries if e.subject_code == subject_code]
+            entries += [e for e in self.undated if e.subject_code == subject_code]
+            self._subjects[subject_code] = entries
+        return entries
 
+    def subjects(self) -> dict:
+        """
+        :returns: A dictionary of subject code -> entries sorted by start time
+        """
+        codes = dict.fromkeys(e.subject_code for e in self._entries + self.undated)
+        return {code: self.subject(code) for code in codes}
@@ -16,3 +16,8 @@ class NotLoggedIn(SessionError):
 class AccountAPIError(Exception):
     pass
 
+class VaultError(Exception):
+    pass
+
+class WorkerCrashed(Exception):
+    pass
@@ -0,0 +1,454 @@
+"""
+A local stand-in for the StudentPortalAPI, for offline tests and benchmarks
+
+It speaks the same protocol as the real portal (encrypted login payloads, LocalName checks,
+bearer tokens with an :code:`exp` claim) and serves generated but deterministic data for every account.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+
+from pyjiit.encryption import CONTEXT, decrypt, deserialize_payload
+from pyjiit.transport import AsyncTransport, Transport, Response
+
+
+OK = {"responseStatus": "Success", "errors": None}
+
+def failure(message: str) -> dict:
+    return {"status": {"responseStatus": "Failure", "errors": [message]}, "response": None}
+
+def success(response) -> dict:
+    return {"status": OK, "response": response}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024 # hundreds of clients may connect at once
+
+
+class FakePortal:
+    """
+    Class which runs a fake StudentPortalAPI on a local port
+
+    latency and error_rate can be a number for every endpoint or a dictionary of endpoint to number
+    (endpoints missing from the dictionary get 0).
+    """
+
+    def __init__(self, accounts: dict = None, latency=0.0, error_rate=0.0, token_ttl: int = 3600,
+                 semesters: int = 6, subjects: int = 7, captchas: dict = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        """
+        :param accounts: A dictionary of username to password (any username logs in with password "password" if None)
+        :param latency: Seconds to wait before answering
+        :param error_rate: Fraction of requests answered with a non "Success" responseStatus
+        :param token_ttl: Lifetime of issued tokens in seconds
+        :param semesters: Number of semesters of every account
+        :param subjects: Number of subjects in every semester
+        :param captchas: A dictionary of hidden -> answer of accepted captchas, issued captchas are added to it
+                         (any captcha is accepted if None). The image of an issued captcha is its answer in base64
+        :param host: Host to bind to
+        :param port: Port to bind to (a free one if 0)
+        """
+        self.accounts = accounts
+        self.latency = latency
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.semesters = semesters
+        self.subjects = subjects
+        self.captchas = captchas
+
+        self.requests = 0
+        self.logins = 0
+        self._lock = threading.Lock()
+        self._secret = os.urandom(16)
+        self._random = random.Random()
+
+        self._route_table = self._routes()
+        self.server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass as :code:`api` to Webportal"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/StudentPortalAPI"
+
+    def start(self) -> 'FakePortal':
+        """Starts serving on a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="pyjiit-fakeportal", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops the server"""
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread = None
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _setting(self, value, endpoint: str) -> float:
+        if isinstance(value, dict):
+            return value.get(endpoint, 0.0)
+        return value
+
+    # tokens
+
+    def issue_token(self, username: str) -> str:
+        """Returns a signed token for username, valid for token_ttl seconds"""
+        header = base64.b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}).encode()).decode()
+        claims = base64.b64encode(json.dumps({"sub": username, "exp": int(time.time()) + self.token_ttl}).encode()).decode()
+        signature = hmac.new(self._secret, f"{header}.{claims}".encode(), hashlib.sha256).hexdigest()
+        return f"{header}.{claims}.{signature}"
+
+    def check_token(self, authorization: str):
+        """Returns the username of a valid bearer token, None otherwise"""
+        if not authorization or not authorization.startswith("Bearer "):
+            return None
+        try:
+            header, claims, signature = authorization[len("Bearer "):].split(".")
+        except ValueError:
+            return None
+
+        expected = hmac.new(self._secret, f"{header}.{claims}".encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            return None
+
+        claims = json.loads(base64.b64decode(claims))
+        if claims["exp"] < time.time():
+            return None
+        return claims["sub"]
+
+    @staticmethod
+    def check_local_name(value: str) -> bool:
+        """Returns True if value is a LocalName header valid today"""
+        try:
+            name = decrypt(base64.b64decode(value)).decode()
+        except Exception:
+            return False
+        return len(name) == 16 and name[4:11] == CONTEXT.date_seq()
+
+    # generated data, deterministic for every username
+
+    def _rng(self, *parts) -> random.Random:
+        return random.Random("/".join(str(p) for p in parts))
+
+    def _semesters(self, username: str) -> list:
+        out = []
+        for i in range(self.semesters):
+            year = 2024 - (i + 1) // 2
+            kind = "ODDSEM" if i % 2 == 0 else "EVESEM"
+            out.append({"registrationid": f"JIRUM{year}{i:06d}", "registrationcode": f"{year}{kind}"})
+        return out
+
+    def _subjects(self, username: str, registration_id: str) -> list:
+        rng = self._rng(username, registration_id)
+        out = []
+        for i in range(self.subjects):
+            code = f"{rng.choice(['15B11', '18B11', '15B17'])}CI{rng.randint(100, 999)}"
+            out.append({
+                "code": code,
+                "desc": f"SUBJECT {code[-3:]}",
+                "id": str(150000 + int(code[-3:])),
+                "components": ["L", "T"] if rng.random() < 0.7 else ["P"],
+                "employee": f"TEACHER {rng.randint(1, 200)}",
+                "employeecode": f"JIIT{rng.randint(1000, 9999)}",
+                "credits": float(rng.choice([1, 2, 3, 4])),
+            })
+        return out
+
+    def _attendance_row(self, username: str, registration_id: str, slno: int, subject: dict) -> dict:
+        rng = self._rng(username, registration_id, subject["code"], "attendance")
+        row = {
+            "slno": slno,
+            "subjectcode": f"{subject['desc']}({subject['code']})",
+            "individualsubjectcode": subject["code"],
+            "subjectid": subject["id"],
+            "abseent": 0.0,
+        }
+        attended = total = 0.0
+        for c in subject["components"]:
+            t = float(rng.randint(10, 45))
+            p = float(rng.randint(int(t * 0.4), int(t)))
+            attended += p
+            total += t
+            row.update({
+                c + "totalclass": t,
+                c + "totalpres": p,
+                c + "percentage": round(100 * p / t, 1),
+                c + "subjectcomponentcode": c,
+                c + "subjectcomponentid": f"JISCP{registration_id[-6:]}{c}",
+            })
+        row["LTpercantage"] = round(100 * attended / total, 1)
+        return row
+
+    # endpoint handlers, each gets (username, payload) and returns the "response" part
+
+    def getcaptcha(self, username, payload):
+        hidden = base64.b64encode(os.urandom(8)).decode()
+        answer = "".join(self._random.choice("abcdefghijkmnpqrstuvwxyz23456789") for _ in range(5))
+        if self.captchas is not None:
+            with self._lock:
+                self.captchas[hidden] = answer
+        return {"captcha": {"captcha": "", "hidden": hidden, "image": base64.b64encode(answer.encode()).decode()}}
+
+    def pretoken_check(self, username, payload):
+        captcha = payload["captcha"]
+        if self.captchas is not None and self.captchas.get(captcha["hidden"]) != captcha["captcha"]:
+            raise ValueError("Invalid Captcha")
+
+        return {
+            "username": payload["username"],
+            "usertype": payload["usertype"],
+            "captcha": payload["captcha"],
+            "rejectedData": None,
+        }
+
+    def generate_token1(self, username, payload):
+        username = payload["username"]
+        password = payload["passwordotpvalue"]
+        expected = "password" if self.accounts is None else self.accounts.get(username)
+        if expected is None or password != expected:
+            raise ValueError("Invalid Password")
+
+        with self._lock:
+            self.logins += 1
+
+        member = hashlib.sha1(username.encode()).hexdigest()[:12].upper()
+        return {"regdata": {
+            "institutelist": [{"label": "JAYPEE INSTITUTE OF INFORMATION TECHNOLOGY", "value": "11IN1902J000001"}],
+            "memberid": f"JIST{member}",
+            "userid": f"JIUS{member}",
+            "token": self.issue_token(username),
+            "clientid": "JAYPEE",
+            "membertype": "S",
+            "name": f"STUDENT {username}",
+        }}
+
+    def changepassword(self, username, payload):
+        expected = "password" if self.accounts is None else self.accounts.get(username)
+        if payload["oldpassword"] != expected:
+            raise ValueError("Old password is wrong")
+        if self.accounts is not None:
+            self.accounts[username] = payload["newpassword"]
+        return {}
+
+    def getstudentbankinfo(self, username, payload):
+        return {"bankname": "STATE BANK OF INDIA", "accountno": "XXXXXXXX" + str(self._rng(username).randint(0, 9999)).zfill(4)}
+
+    def attendance_meta(self, username, payload):
+        return {
+            "headerlist": [{"branchdesc": "CSE", "name": f"STUDENT {username}", "programdesc": "B.TECH", "stynumber": str(len(self._semesters(username)))}],
+            "semlist": self._semesters(username),
+        }
+
+    def attendance_detail(self, username, payload):
+        registration_id = payload["registrationid"]
+        rows = [self._attendance_row(username, registration_id, i + 1, s) for i, s in enumerate(self._subjects(username, registration_id))]
+        return {"currentSem": payload.get("stynumber"), "studentattendancelist": rows}
+
+    def registration_list(self, username, payload):
+        return {"registrations": self._semesters(username)}
+
+    def faculties(self, username, payload):
+        subjects = self._subjects(username, payload["registrationid"])
+        registrations = []
+        for s in subjects:
+            for c in s["components"]:
+                registrations.append({
+                    "employeename": s["employee"], "employeecode": s["employeecode"], "minorsubject": "N",
+                    "remarks": "REG", "stytype": "REG", "credits": s["credits"], "subjectcode": s["code"],
+                    "subjectcomponentcode": c, "subjectdesc": s["desc"], "subjectid": s["id"], "audtsubject": "N",
+                })
+        return {"totalcreditpoints": sum(s["credits"] for s in subjects), "registrations": registrations}
+
+    def exam_semesters(self, username, payload):
+        return {"semesterCodeinfo": {"semestercode": self._semesters(username)}}
+
+    def exam_events(self, username, payload):
+        registration_id = payload["registationid"]
+        events = []
+        for i, desc in enumerate(["T1", "T2", "END TERM"]):
+            events.append({
+                "exameventcode": f"{desc.replace(' ', '')}",
+                "eventfrom": 1700000000000 + i * 30 * 86400000,
+                "exameventdesc": desc,
+                "registrationid": registration_id,
+                "exameventid": f"{registration_id}E{i}",
+            })
+        return {"eventcode": {"examevent": events}}
+
+    def exam_schedule(self, username, payload):
+        registration_id = payload["registrationid"]
+        event = payload["exameventid"]
+        rng = self._rng(username, event)
+        start = 1700000000 + int(event[-1]) * 30 * 86400
+        info = []
+        for i, s in enumerate(self._subjects(username, registration_id)):
+            day = time.gmtime(start + i * 86400)
+            slot = rng.choice(["09:00 AM", "11:30 AM", "02:00 PM"])
+            info.append({
+                "subjectcode": f"{s['desc']}({s['code']})",
+                "subjectdesc": s["desc"],
+                "datetime": time.strftime("%d/%m/%Y", day),
+                "datetimefrom": slot,
+                "datetimeupto": "",
+                "roomcode": f"G{rng.randint(1, 9)}",
+                "seatno": str(rng.randint(1, 60)),
+            })
+        return {"subjectinfo": info}
+
+    def _routes(self) -> dict:
+        return {
+            ("GET", "/token/getcaptcha"): (self.getcaptcha, False, None),
+            ("POST", "/token/pretoken-check"): (self.pretoken_check, False, "encrypted"),
+            ("POST", "/token/generate-token1"): (self.generate_token1, False, "encrypted"),
+            ("POST", "/studentbankdetails/getstudentbankinfo"): (self.getstudentbankinfo, True, "json"),
+            ("POST", "/StudentClassAttendance/getstudentInforegistrationforattendence"): (self.attendance_meta, True, "json"),
+            ("POST", "/StudentClassAttendance/getstudentattendancedetail"): (self.attendance_detail, True, "json"),
+            ("POST", "/clxuser/changepassword"): (self.changepassword, True, "json"),
+            ("POST", "/reqsubfaculty/getregistrationList"): (self.registration_list, True, "json"),
+            ("POST", "/reqsubfaculty/getfaculties"): (self.faculties, True, "json"),
+            ("POST", "/studentcommonsontroller/getsemestercode-withstudentexamevents"): (self.exam_semesters, True, "json"),
+            ("POST", "/studentcommonsontroller/getstudentexamevents"): (self.exam_events, True, "json"),
+            ("POST", "/studentsttattview/getstudent-examschedule"): (self.exam_schedule, True, "json"),
+        }
+
+    def handle(self, method: str, path: str, headers, body: bytes) -> tuple:
+        """
+        Answers one request, used by both the HTTP server and FakeTransport
+
+        :param method: HTTP method
+        :param path: Request path (or full URL)
+        :param headers: Request headers (anything with a :code:`get` method)
+        :param body: Request body
+        :returns: A tuple of HTTP status code and JSON body
+        """
+        with self._lock:
+            self.requests += 1
+
+        endpoint = path.split("/StudentPortalAPI", 1)[-1]
+        route = self._route_table.get((method, endpoint))
+        if route is None:
+            return 404, failure("Not Found")
+        handler, needs_token, body_type = route
+
+        delay = self._setting(self.latency, endpoint)
+        if delay:
+            time.sleep(delay)
+
+        if not self.check_local_name(headers.get("LocalName")):
+            return 401, failure("Invalid LocalName")
+
+        username = None
+        if needs_token:
+            username = self.check_token(headers.get("Authorization"))
+            if username is None:
+                return 401, failure("Invalid or expired token")
+
+        if self._random.random() < self._setting(self.error_rate, endpoint):
+            return 200, failure("Injected error")
+
+        try:
+            if body_type == "encrypted":
+                payload = deserialize_payload(body.decode())
+            elif body_type == "json":
+                payload = json.loads(body)
+            else:
+                payload = None
+            response = handler(username, payload)
+        except Exception as e:
+            return 200, failure(str(e))
+
+        return 200, success(response)
+
+    def transport(self) -> 'FakeTransport':
+        """Returns a Transport which calls this portal in-process (no sockets, the server need not be started)"""
+        return FakeTransport(self)
+
+    def async_transport(self) -> 'AsyncFakeTransport':
+        """Returns an AsyncTransport which calls this portal in-process (latency blocks the event loop)"""
+        return AsyncFakeTransport(self)
+
+    def _handler(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, like the real server
+            disable_nagle_algorithm = True # headers and body are written separately
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+
+                code, reply = portal.handle(method, self.path, self.headers, body)
+
+                data = json.dumps(reply).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+        return Handler
+
+
+class FakeTransport(Transport):
+    """
+    Transport which answers requests with a FakePortal in the same process
+    """
+    def __init__(self, portal: FakePortal) -> None:
+        self.portal = portal
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        if "json" in kwargs:
+            body = json.dumps(kwargs["json"]).encode()
+        else:
+            body = (kwargs.get("data") or "").encode()
+
+        code, reply = self.portal.handle(method, url, kwargs.get("headers") or {}, body)
+        return Response(code, json.dumps(reply).encode())
+
+
+class AsyncFakeTransport(AsyncTransport):
+    """
+    AsyncTransport which answers requests with a FakePortal in the same process
+    """
+    def __init__(self, portal: FakePortal) -> None:
+        self._transport = FakeTransport(portal)
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        return self._transport.request(method, url, **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake StudentPortalAPI")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    portal = FakePortal(latency=args.latency, error_rate=args.error_rate, port=args.port)
+    print(f"Serving on {portal.url}")
+    portal.server.serve_forever()
@@ -0,0 +1,66 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class FanOutResult:
+    """
+    Class containing results of concurrent calls, and the exceptions of the calls which failed (under the same keys)
+    """
+    results: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """True if no call failed"""
+        return not self.errors
+
+
+def fan_out(fn, items, key, max_workers: int = 4) -> FanOutResult:
+    """
+    :param fn: Function called with every item
+    :param items: Iterable of arguments for fn
+    :param key: Function returning the result key of an item
+    :param max_workers: Maximum number of concurrent calls
+    :returns: FanOutResult of key(item) -> fn(item)
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    result = FanOutResult()
+    with ThreadPoolExecutor(max_workers) as pool:
+        futures = {pool.submit(fn, item): key(item) for item in items}
+        for future in as_completed(futures):
+            try:
+                result.results[futures[future]] = future.result()
+            except Exception as e:
+                result.errors[futures[future]] = e
+
+    return result
+
+
+async def async_fan_out(fn, items, key, max_workers: int = 4) -> FanOutResult:
+    """
+    :param fn: Coroutine function called with every item
+    :param items: Iterable of arguments for fn
+    :param key: Function returning the result key of an item
+    :param max_workers: Maximum number of concurrent calls
+    :returns: FanOutResult of key(item) -> await fn(item)
+    """
+    import asyncio
+
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def call(item):
+        async with semaphore:
+            return await fn(item)
+
+    items = list(items)
+    outcomes = await asyncio.gather(*[call(item) for item in items], return_exceptions=True)
+
+    result = FanOutResult()
+    for item, outcome in zip(items, outcomes):
+        if isinstance(outcome, BaseException):
+            result.errors[key(item)] = outcome
+        else:
+            result.results[key(item)] = outcome
+
+    return result
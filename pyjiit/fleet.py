@@ -0,0 +1,293 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import os
+import pickle
+import queue
+import threading
+import time
+
+from pyjiit.exceptions import WorkerCrashed
+from pyjiit.wrapper import API
+
+
+@dataclass
+class FleetResult:
+    """
+    Class containing the outcome of the task of one account
+
+    value is what the task returned, error the exception it raised (or WorkerCrashed) if it failed.
+    """
+    username: str
+    value: object = None
+    error: Exception = None
+    worker: int = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class WorkerStats:
+    """
+    Class containing the counters of one worker (summed over its restarts)
+
+    requests, cpu_time and wall_time are reported by the worker when it finishes, so they miss crashed runs.
+    crashes counts every time the worker died, restarts every time it was started again after a crash.
+    exitcode is the exit code of its last crash (None if it never crashed).
+    """
+    worker: int
+    pid: int = None
+    accounts: int = 0
+    ok: int = 0
+    failed: int = 0
+    requests: int = 0
+    cpu_time: float = 0.0
+    wall_time: float = 0.0
+    crashes: int = 0
+    restarts: int = 0
+    exitcode: int = None
+
+
+class _Counter:
+    # hook counting requests, shared by every client of a worker
+    def __init__(self) -> None:
+        self.n = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        if not event.cached and not event.coalesced:
+            with self._lock:
+                self.n += 1
+
+
+def _picklable(error: Exception) -> Exception:
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _work(worker, accounts, task, api, threads, quota, results):
+    # runs in the worker process, every message is (kind, worker, ...)
+    from pyjiit.pool import SessionPool
+    from pyjiit.ratelimit import RateLimiter
+    from pyjiit.transport import RequestsTransport
+
+    start, cpu = time.perf_counter(), time.process_time()
+    counter = _Counter()
+    # the local buckets are as wide as the quota, so only the quota and the failure backoff pace requests
+    limiter = RateLimiter(quota.rate, quota.rate, quota=quota) if quota is not None else None
+    pool = SessionPool(RequestsTransport(pool_size=threads), workers=1, api=api, limiter=limiter, hooks=[counter])
+    pool.add_many(accounts)
+
+    def run(account):
+        username = account[0]
+        results.put(("start", worker, username))
+        try:
+            # pickled here, so a result which can not be sent is reported as an error of its account
+            value = pickle.dumps(task(pool.get(username)))
+        except Exception as e:
+            results.put(("error", worker, username, _picklable(e)))
+        else:
+            results.put(("result", worker, username, value))
+
+    with ThreadPoolExecutor(threads, thread_name_prefix="pyjiit-fleet") as executor:
+        list(executor.map(run, accounts))
+    pool.close()
+
+    results.put(("stats", worker, os.getpid(), counter.n, time.process_time() - cpu, time.perf_counter() - start))
+
+
+class _Shard:
+    # accounts of one worker, and which of them were started but not reported yet
+    def __init__(self, index: int, accounts: list, threads: int) -> None:
+        self.index = index
+        self.accounts = accounts
+        self.threads = threads
+        self.pending = {username for username, _ in accounts}
+        self.running = set()
+        self.finished = False
+        self.process = None
+        self.crashed = False # since it was last started
+        self.idle_crashes = 0 # crashes while running no account, limited by max_restarts
+
+    def remaining(self) -> list:
+        return [account for account in self.accounts if account[0] in self.pending]
+
+
+class FleetRunner:
+    """
+    Class which runs a task for many accounts on several processes, to use more than one core
+
+    The accounts are split into one shard per process. Every process keeps a SessionPool of its accounts and runs
+    the task for up to threads accounts at a time. All processes take their requests from one SharedQuota,
+    so the whole fleet stays under rate requests per second. Results are streamed back to the parent as they come in.
+
+    If a process dies, the accounts it was running are moved to a quarantine process which runs them one at a time,
+    and the process is started again for the rest. An account which also kills the quarantine process fails with
+    WorkerCrashed, so one bad account or crash does not stop the run. Accounts running during a crash may run twice.
+    """
+    def __init__(self, task, processes: int = None, threads: int = 8, rate: float = None, burst: float = None,
+                 api: str = API, max_restarts: int = 2, context: str = None) -> None:
+        """
+        :param task: A function called with a logged in Webportal of every account, its return value is the result.
+                     It has to be picklable (defined at the top level of a module), and so does its return value
+        :param processes: Number of worker processes (defaults to the number of CPUs)
+        :param threads: Accounts run at the same time in every process
+        :param rate: Maximum requests per second over all processes (no limit if None)
+        :param burst: Maximum burst of requests over all processes (defaults to rate)
+        :param api: Base URL of the StudentPortalAPI
+        :param max_restarts: Times a worker which crashed while running no account is started again (crashes while
+                             running accounts are blamed on those accounts and always restart the worker)
+        :param context: multiprocessing start method, e.g. "spawn" (defaults to the platform default)
+        """
+        self.task = task
+        self.processes = processes or os.cpu_count() or 1
+        self.threads = threads
+        self.rate = rate
+        self.burst = burst
+        self.api = api
+        self.max_restarts = max_restarts
+        self.context = context
+        self.stats: dict[int, WorkerStats] = {}
+
+    def run(self, credentials):
+        """
+        :param credentials: An iterable of (username, password) or a dictionary of username -> password
+        :returns: A generator of FleetResult, one per account, in the order they finish
+        """
+        import multiprocessing
+        from pyjiit.ratelimit import SharedQuota
+
+        if isinstance(credentials, dict):
+            credentials = credentials.items()
+        accounts = list(credentials)
+
+        context = multiprocessing.get_context(self.context)
+        quota = SharedQuota(self.rate, self.burst, context) if self.rate else None
+        results = context.Queue()
+
+        n = max(1, min(self.processes, len(accounts)))
+        shards = {i: _Shard(i, accounts[i::n], self.threads) for i in range(n)}
+        quarantine = _Shard(n, [], 1)
+        self.stats = {i: WorkerStats(i, accounts=len(shard.accounts)) for i, shard in shards.items()}
+        self.stats[n] = WorkerStats(n)
+        shards[n] = quarantine
+
+        def start(shard):
+            if shard.crashed:
+                self.stats[shard.index].restarts += 1
+            shard.crashed = False
+            shard.running = set()
+            shard.finished = False
+            shard.process = context.Process(
+                target=_work, args=(shard.index, shard.remaining(), self.task, self.api, shard.threads, quota, results),
+                name=f"pyjiit-fleet-{shard.index}", daemon=True
+            )
+            shard.process.start()
+            self.stats[shard.index].pid = shard.process.pid
+
+        def handle(message):
+            kind, i = message[:2]
+            shard = shards[i]
+            if kind == "stats":
+                _, _, pid, requests, cpu_time, wall_time = message
+                stats = self.stats[i]
+                stats.pid = pid
+                stats.requests += requests
+                stats.cpu_time += cpu_time
+                stats.wall_time += wall_time
+                shard.finished = True
+                return None
+
+            username = message[2]
+            if username not in shard.pending:
+                return None # from a run which crashed, the account was moved or reported already
+            if kind == "start":
+                shard.running.add(username)
+                return None
+
+            shard.pending.discard(username)
+            shard.running.discard(username)
+            if kind == "result":
+                self.stats[i].ok += 1
+                return FleetResult(username, pickle.loads(message[3]), None, i)
+            self.stats[i].failed += 1
+            return FleetResult(username, None, message[3], i)
+
+        def crashed(shard) -> list:
+            # returns the results of accounts given up on
+            stats = self.stats[shard.index]
+            stats.crashes += 1
+            stats.exitcode = shard.process.exitcode
+            shard.crashed = True
+            error = WorkerCrashed(f"worker {shard.index} exited with code {shard.process.exitcode}")
+
+            if shard is quarantine:
+                given_up = [u for u, _ in shard.accounts if u in shard.running]
+            else:
+                # the accounts running during the crash are retried alone, so a bad one only fails itself
+                moved = [account for account in shard.accounts if account[0] in shard.running]
+                quarantine.accounts += moved
+                quarantine.pending.update(username for username, _ in moved)
+                self.stats[quarantine.index].accounts += len(moved)
+                shard.pending.difference_update(shard.running)
+                given_up = []
+
+            if not shard.running:
+                # nothing was running, so the crash is not the fault of an account
+                shard.idle_crashes += 1
+                if shard.idle_crashes > self.max_restarts:
+                    given_up = [u for u, _ in shard.accounts if u in shard.pending]
+            shard.pending.difference_update(given_up)
+            stats.failed += len(given_up)
+            return [FleetResult(username, None, error, shard.index) for username in given_up]
+
+        for i in range(n):
+            start(shards[i])
+
+        try:
+            while any(shard.process is not None for shard in shards.values()):
+                try:
+                    result = handle(results.get(timeout=0.1))
+                except queue.Empty:
+                    result = None
+                if result is not None:
+                    yield result
+                    continue
+
+                for shard in list(shards.values()):
+                    if shard.process is None or shard.process.is_alive():
+                        continue
+                    shard.process.join()
+
+                    # whatever the worker sent before exiting is handled before deciding it crashed
+                    while True:
+                        try:
+                            result = handle(results.get_nowait())
+                        except queue.Empty:
+                            break
+                        if result is not None:
+                            yield result
+
+                    if not shard.finished:
+                        yield from crashed(shard)
+                    shard.process = None
+                    for restart in (shard, quarantine):
+                        if restart.process is None and restart.pending:
+                            start(restart)
+        finally:
+            for shard in shards.values():
+                if shard.process is not None:
+                    if shard.process.is_alive():
+                        shard.process.terminate()
+                    shard.process.join()
+            results.close()
+
+    def run_all(self, credentials) -> list:
+        """
+        :returns: A list of FleetResult of every account
+        """
+        return list(self.run(credentials))
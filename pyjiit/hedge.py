@@ -0,0 +1,235 @@
+from collections import deque
+import threading
+
+
+# idempotent reads, a duplicate of one of these is harmless
+HEDGEABLE = frozenset({
+    "/studentbankdetails/getstudentbankinfo",
+    "/StudentClassAttendance/getstudentInforegistrationforattendence",
+    "/StudentClassAttendance/getstudentattendancedetail",
+    "/reqsubfaculty/getregistrationList",
+    "/reqsubfaculty/getfaculties",
+    "/studentcommonsontroller/getsemestercode-withstudentexamevents",
+    "/studentcommonsontroller/getstudentexamevents",
+    "/studentsttattview/getstudent-examschedule",
+})
+
+# logins and password changes are never sent twice
+NEVER_HEDGED = frozenset({
+    "/token/pretoken-check",
+    "/token/generate-token1",
+    "/token/getcaptcha",
+    "/clxuser/changepassword",
+})
+
+
+class Hedger:
+    """
+    Class which sends a duplicate of a slow read request and returns whichever response comes back first
+
+    The duplicate (hedge) goes out once the first request has taken longer than the given percentile of the
+    recent latencies of its endpoint. The loser is cancelled (async) or abandoned until its transport timeout (sync).
+    Hedges are paid for from a budget which grows by max_rate per request, so at most about max_rate of the requests
+    are hedged, even when the portal is slow everywhere. Only endpoints in :code:`endpoints` are hedged.
+    Pass it as :code:`Webportal(hedger=...)`, one Hedger can be shared by many clients. Methods are thread safe.
+    """
+    def __init__(self, percentile: float = 0.95, max_rate: float = 0.05, burst: float = 10.0, initial_delay: float = 1.0,
+                 min_delay: float = 0.01, window: int = 512, min_samples: int = 20, endpoints=HEDGEABLE,
+                 max_workers: int = 64, max_primaries: int = 64) -> None:
+        """
+        :param percentile: Latency percentile (a fraction like 0.95) after which a hedge is sent
+        :param max_rate: Fraction of requests which may be hedged over time
+        :param burst: Maximum number of hedges which can be sent back to back
+        :param initial_delay: Seconds to wait before hedging until an endpoint has min_samples latencies
+        :param min_delay: Seconds to wait at least, whatever the percentile is
+        :param window: Number of recent latencies kept per endpoint
+        :param endpoints: Endpoints which may be hedged (defaults to the read endpoints in HEDGEABLE)
+        :param max_workers: Threads used to send hedges of sync clients
+        :param max_primaries: Threads used to send first requests of sync clients. A first request made while all of
+                              them are busy is sent on the calling thread and not hedged, rather than queued
+        :raises ValueError: Raised if endpoints contains a login or password endpoint
+        """
+        never = NEVER_HEDGED.intersection(endpoints)
+        if never:
+            raise ValueError(f"{', '.join(sorted(never))} must never be hedged")
+
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.burst = burst
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.endpoints = frozenset(endpoints)
+        self.max_workers = max_workers
+        self.max_primaries = max_primaries
+
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0 # hedges which answered first
+
+        self._lock = threading.Lock()
+        self._budget = burst
+        self._recorded = 0
+        self._latencies: dict[str, deque] = {}
+        self._delays: dict[str, float] = {}
+        self._pool = None
+        self._primaries = None
+        self._slots = threading.BoundedSemaphore(max_primaries) # free threads of _primaries
+
+    def hedges(self, endpoint: str) -> bool:
+        return endpoint in self.endpoints
+
+    def delay(self, endpoint: str) -> float:
+        """
+        :returns: Seconds to wait for a request to endpoint before hedging it
+        """
+        with self._lock:
+            return self._delays.get(endpoint, self.initial_delay)
+
+    def record(self, endpoint: str, latency: float):
+        """Adds the latency of a request which was actually sent to endpoint"""
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = deque(maxlen=self.window)
+            latencies.append(latency)
+            self._recorded += 1
+
+            # sorting the window is cheap next to a request, but there is no need to do it on every one
+            n = len(latencies)
+            if n >= self.min_samples and (n < self.window or self._recorded % 16 == 0):
+                ordered = sorted(latencies)
+                self._delays[endpoint] = max(self.min_delay, ordered[min(n - 1, int(self.percentile * n))])
+
+    def close(self):
+        """Stops the threads of sync clients"""
+        with self._lock:
+            pools = [self._pool, self._primaries]
+            self._pool = self._primaries = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=False)
+
+    def _start(self):
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self.burst, self._budget + self.max_rate)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.hedged += 1
+            return True
+
+    def _won(self):
+        with self._lock:
+            self.wins += 1
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="pyjiit-hedge")
+            return self._pool
+
+    def _get_primaries(self):
+        with self._lock:
+            if self._primaries is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._primaries = ThreadPoolExecutor(self.max_primaries, thread_name_prefix="pyjiit-request")
+            return self._primaries
+
+    def run(self, endpoint: str, send):
+        """
+        :param endpoint: Endpoint of the request
+        :param send: A callable sending the request once, called with hedge=False for the first request
+                     and hedge=True for the duplicate
+        :returns: The first successful result (the first error is raised if both fail)
+        """
+        from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+        self._start()
+        delay = self.delay(endpoint)
+
+        # the first request runs on a thread of its own, so the caller can return as soon as a hedge answers.
+        # Those threads are capped at max_primaries, but a request never queues for one (that would cap the
+        # concurrency of every client and count the time spent queued as latency): without a free thread it is
+        # sent on the calling thread, unhedged
+        if not self._slots.acquire(blocking=False):
+            return send(False)
+
+        primary = Future()
+        primary.set_running_or_notify_cancel() # so it can not be cancelled like a queued one
+        sent = threading.Event()
+        def send_primary():
+            sent.set()
+            try:
+                primary.set_result(send(False))
+            except BaseException as e:
+                primary.set_exception(e)
+            finally:
+                self._slots.release()
+
+        try:
+            self._get_primaries().submit(send_primary)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        # the hedge delay counts from the moment the request is sent
+        sent.wait()
+        done, _ = wait([primary], delay)
+        if done or not self._spend():
+            return primary.result()
+
+        hedge = self._get_pool().submit(send, True)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        self._won()
+                    return future.result()
+                if error is None:
+                    error = future.exception()
+        raise error
+
+    async def async_run(self, endpoint: str, send):
+        """
+        Same as run, send is a coroutine function and the loser is cancelled
+        """
+        import asyncio
+
+        self._start()
+        primary = asyncio.ensure_future(send(False))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay(endpoint))
+            if done or not self._spend():
+                return await primary
+
+            hedge = asyncio.ensure_future(send(True))
+            tasks.append(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._won()
+                        return task.result()
+                    if error is None:
+                        error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
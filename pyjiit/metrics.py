@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+import bisect
+import threading
+
+
+@dataclass
+class RequestEvent:
+    """
+    Class containing timings and outcome of one request made by Webportal, passed to every hook
+
+    All times are in seconds.
+    """
+    endpoint: str
+    method: str
+    status: int = None
+    latency: float = 0.0
+    serialize_time: float = 0.0
+    local_name_time: float = 0.0
+    decode_time: float = 0.0
+    response_bytes: int = 0
+    failed: bool = False
+    cached: bool = False
+    coalesced: bool = False
+    hedge: bool = False
+    error: Exception = None
+
+
+# upper bounds in seconds, the portal is slow so they go up to a minute
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+class Histogram:
+    """
+    Class which counts observations into fixed buckets and estimates percentiles from them
+    """
+    def __init__(self, buckets: tuple = BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float) -> float:
+        """
+        :param q: A fraction like 0.99
+        :returns: Estimated value at q, interpolated linearly inside the bucket (0.0 if empty)
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+
+        return self.buckets[-2]
+
+
+class EndpointStats:
+    """Class containing aggregated stats of one endpoint"""
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.requests = 0
+        self.failures = 0
+        self.errors = 0
+        self.cached = 0
+        self.coalesced = 0
+        self.hedges = 0
+        self.response_bytes = 0
+        self.client_time = 0.0
+
+
+class MetricsRegistry:
+    """
+    Hook which aggregates RequestEvents per endpoint
+
+    Pass it to :code:`Webportal(hooks=[registry])`, then read :code:`snapshot()` or :code:`render_prometheus()`
+    from a long running poller. Thread safe, one registry can be shared by many clients.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.endpoints: dict[str, EndpointStats] = {}
+
+    def __call__(self, event: RequestEvent):
+        with self._lock:
+            stats = self.endpoints.get(event.endpoint)
+            if stats is None:
+                stats = self.endpoints[event.endpoint] = EndpointStats()
+
+            stats.requests += 1
+            if event.cached:
+                stats.cached += 1
+                return
+            if event.coalesced:
+                stats.coalesced += 1
+                return
+            if event.hedge:
+                stats.hedges += 1
+
+            stats.latency.observe(event.latency)
+            stats.response_bytes += event.response_bytes
+            stats.client_time += event.serialize_time + event.local_name_time + event.decode_time
+            if event.failed:
+                stats.failures += 1
+            if event.error is not None and not event.failed:
+                stats.errors += 1
+
+    def reset(self):
+        """Drops everything recorded so far"""
+        with self._lock:
+            self.endpoints = {}
+
+    def percentiles(self, endpoint: str, qs: tuple = (0.5, 0.9, 0.99)) -> dict:
+        """
+        :returns: A dictionary of q -> latency in seconds for endpoint
+        """
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            return {q: stats.latency.percentile(q) if stats else 0.0 for q in qs}
+
+    def snapshot(self) -> dict:
+        """
+        :returns: A dictionary of endpoint -> dictionary of counters, mean latency and p50/p90/p99 latency
+        """
+        out = {}
+        with self._lock:
+            for endpoint, stats in self.endpoints.items():
+                sent = stats.latency.count
+                out[endpoint] = {
+                    "requests": stats.requests,
+                    "failures": stats.failures,
+                    "errors": stats.errors,
+                    "cached": stats.cached,
+                    "coalesced": stats.coalesced,
+                    "hedges": stats.hedges,
+                    "response_bytes": stats.response_bytes,
+                    "mean": stats.latency.sum / sent if sent else 0.0,
+                    "client_time_mean": stats.client_time / sent if sent else 0.0,
+                    "p50": stats.latency.percentile(0.5),
+                    "p90": stats.latency.percentile(0.9),
+                    "p99": stats.latency.percentile(0.99),
+                }
+        return out
+
+    def render_prometheus(self) -> str:
+        """
+        :returns: The metrics in Prometheus text format
+        """
+        lines = ["# TYPE pyjiit_request_duration_seconds histogram"]
+        counters = []
+        with self._lock:
+            for endpoint, stats in sorted(self.endpoints.items()):
+                label = f'endpoint="{endpoint}"'
+                cumulative = 0
+                for bound, n in zip(stats.latency.buckets, stats.latency.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'pyjiit_request_duration_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+                lines.append(f"pyjiit_request_duration_seconds_sum{{{label}}} {stats.latency.sum}")
+                lines.append(f"pyjiit_request_duration_seconds_count{{{label}}} {stats.latency.count}")
+
+                counters.append(f"pyjiit_requests_total{{{label}}} {stats.requests}")
+                counters.append(f"pyjiit_request_failures_total{{{label}}} {stats.failures}")
+                counters.append(f"pyjiit_request_errors_total{{{label}}} {stats.errors}")
+                counters.append(f"pyjiit_cache_hits_total{{{label}}} {stats.cached}")
+                counters.append(f"pyjiit_coalesced_total{{{label}}} {stats.coalesced}")
+                counters.append(f"pyjiit_hedges_total{{{label}}} {stats.hedges}")
+                counters.append(f"pyjiit_response_bytes_total{{{label}}} {stats.response_bytes}")
+
+        for name in ("pyjiit_requests_total", "pyjiit_request_failures_total", "pyjiit_request_errors_total", "pyjiit_cache_hits_total", "pyjiit_coalesced_total", "pyjiit_hedges_total", "pyjiit_response_bytes_total"):
+            lines.append(f"# TYPE {name} counter")
+            lines += [c for c in counters if c.startswith(name + "{")]
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,217 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Step:
+    """
+    Class describing one kind of data a plan can ask for
+
+    A step without parent is one call per user. A step with a parent is one call per item that
+    expand returns for every result of the parent (e.g. one get_exam_events per exam semester).
+    """
+    call: object # (client, arg) -> result, arg is None for steps without parent
+    parent: str = None
+    expand: object = None # (parent result) -> list of (key, arg)
+
+
+def _nested_key(parent_key, key):
+    return key if parent_key is None else (parent_key, key)
+
+STEPS = {
+    "bank_info": Step(lambda c, _: c.get_student_bank_info()),
+    "attendance_meta": Step(lambda c, _: c.get_attendance_meta()),
+    "attendance": Step(
+        lambda c, arg: c.get_attendance(*arg), "attendance_meta",
+        lambda meta: [(s.registration_code, (meta.latest_header(), s)) for s in meta.semesters]
+    ),
+    "registered_semesters": Step(lambda c, _: c.get_registered_semesters()),
+    "registrations": Step(
+        lambda c, semester: c.get_registered_subjects_and_faculties(semester), "registered_semesters",
+        lambda semesters: [(s.registration_code, s) for s in semesters]
+    ),
+    "exam_semesters": Step(lambda c, _: c.get_semesters_for_exam_events()),
+    "exam_events": Step(
+        lambda c, semester: c.get_exam_events(semester), "exam_semesters",
+        lambda semesters: [(s.registration_code, s) for s in semesters]
+    ),
+    "exam_schedules": Step(
+        lambda c, event: c.get_exam_schedule(event), "exam_events",
+        lambda events: [(e.exam_event_code, e) for e in events]
+    ),
+}
+
+
+class Plan:
+    """
+    Class declaring which data to get, e.g. :code:`Plan("exam_schedules", "registrations")`
+
+    The names are keys of STEPS. Steps needed by the requested ones (like exam_events for exam_schedules)
+    are run too, but only requested ones are part of the result.
+    """
+    def __init__(self, *wants: str) -> None:
+        for name in wants:
+            if name not in STEPS:
+                raise ValueError(f"unknown step {name!r}, expected one of {', '.join(STEPS)}")
+
+        self.wants = set(wants)
+        self.steps = set()
+        for name in wants:
+            while name is not None:
+                self.steps.add(name)
+                name = STEPS[name].parent
+
+    def want(self, name: str) -> 'Plan':
+        """
+        :returns: A new plan which also asks for name
+        """
+        return Plan(*self.wants, name)
+
+
+@dataclass
+class PlanResult:
+    """
+    Class containing what a plan got, and the errors of the calls which failed
+
+    results is a dictionary of user -> step name -> value for steps without parent, or
+    user -> step name -> {key: value} for the others, where key is a registration code
+    (or (registration code, exam event code) for exam_schedules).
+    errors is a dictionary of (user, step name, key) -> exception, key being None for steps without parent.
+    If the expand of a step raises, the error is recorded under the step name with the key of the parent call.
+    Steps below a failed call are not run.
+    """
+    results: dict = field(default_factory=dict)
+    errors: dict = field(default_factory=dict)
+    calls: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+class _Graph:
+    # expands a plan node by node, shared by the sync and async executors
+    def __init__(self, plan: Plan, users) -> None:
+        self.plan = plan
+        self.users = list(users)
+        self.children = {}
+        for name in plan.steps:
+            parent = STEPS[name].parent
+            if parent is not None:
+                self.children.setdefault(parent, []).append(name)
+
+        self.seen = set()
+        self.result = PlanResult({user: {} for user in self.users})
+
+    def initial(self) -> list:
+        nodes = []
+        for user in self.users:
+            for name in self.plan.steps:
+                if STEPS[name].parent is None:
+                    nodes += self._node(user, name, None, None)
+        return nodes
+
+    def done(self, node, value) -> list:
+        user, name, key, _ = node
+        if name in self.plan.wants:
+            if STEPS[name].parent is None:
+                self.result.results[user][name] = value
+            else:
+                self.result.results[user].setdefault(name, {})[key] = value
+
+        nodes = []
+        for child in self.children.get(name, []):
+            try:
+                expanded = list(STEPS[child].expand(value))
+            except Exception as e:
+                # an unexpected response only costs this user the calls below it
+                self.result.errors[(user, child, key)] = e
+                continue
+            for child_key, arg in expanded:
+                nodes += self._node(user, child, _nested_key(key, child_key), arg)
+        return nodes
+
+    def failed(self, node, error):
+        user, name, key, _ = node
+        self.result.errors[(user, name, key)] = error
+
+    def _node(self, user, name, key, arg) -> list:
+        # the same call is never made twice, even if two branches lead to it
+        if (user, name, key) in self.seen:
+            return []
+        self.seen.add((user, name, key))
+        self.result.calls += 1
+        return [(user, name, key, arg)]
+
+
+class PlanExecutor:
+    """
+    Class which runs a Plan for many users, running independent calls concurrently
+
+    A call is started as soon as the call it depends on has finished, with at most max_workers calls at a time.
+    """
+    def __init__(self, max_workers: int = 8) -> None:
+        """
+        :param max_workers: Maximum number of concurrent calls (over all users)
+        """
+        self.max_workers = max_workers
+
+    def run(self, plan: Plan, clients: dict) -> PlanResult:
+        """
+        :param plan: A Plan
+        :param clients: A dictionary of user -> logged in Webportal
+        :returns: PlanResult with everything that could be fetched
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        graph = _Graph(plan, clients)
+
+        def call(node):
+            user, name, _, arg = node
+            return STEPS[name].call(clients[user], arg)
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            running = {pool.submit(call, node): node for node in graph.initial()}
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        graph.failed(node, e)
+                        continue
+                    for child in graph.done(node, value):
+                        running[pool.submit(call, child)] = child
+
+        return graph.result
+
+    async def async_run(self, plan: Plan, clients: dict) -> PlanResult:
+        """
+        :param plan: A Plan
+        :param clients: A dictionary of user -> logged in AsyncWebportal
+        :returns: PlanResult with everything that could be fetched
+        """
+        import asyncio
+
+        graph = _Graph(plan, clients)
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def call(node):
+            user, name, _, arg = node
+            async with semaphore:
+                return await STEPS[name].call(clients[user], arg)
+
+        running = {asyncio.ensure_future(call(node)): node for node in graph.initial()}
+        while running:
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                node = running.pop(task)
+                try:
+                    value = task.result()
+                except Exception as e:
+                    graph.failed(node, e)
+                    continue
+                for child in graph.done(node, value):
+                    running[asyncio.ensure_future(call(child))] = child
+
+        return graph.result
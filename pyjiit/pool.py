@@ -0,0 +1,214 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import heapq
+import threading
+
+from pyjiit.ratelimit import RateLimiter
+from pyjiit.token import Captcha
+from pyjiit.transport import Transport, RequestsTransport
+from pyjiit.vault import SessionVault
+from pyjiit.wrapper import API, Webportal, WebportalSession
+
+
+class SessionPool:
+    """
+    Class which keeps many logged in Webportal clients keyed by username.
+
+    A background thread logs every client in again some time before its token expires,
+    so callers of :code:`get` almost never wait for a login or hit SessionExpired.
+    All clients share one transport (and its connection pool).
+    """
+
+    def __init__(self, transport: Transport = None, captcha: Captcha = None, refresh_before: timedelta = timedelta(minutes=5),
+                 retry_after: timedelta = timedelta(seconds=30), workers: int = 4, api: str = API,
+                 limiter: RateLimiter = None, vault: SessionVault = None, hooks: list = None) -> None:
+        """
+        :param transport: Transport shared by all clients (defaults to a RequestsTransport)
+        :param captcha: Captcha object used for every login (defaults to pyjiit.default.CAPTCHA)
+        :param refresh_before: How long before expiry a session is refreshed
+        :param retry_after: Delay before a failed background login is tried again
+        :param workers: Number of threads doing background logins
+        :param api: Base URL of the StudentPortalAPI
+        :param limiter: RateLimiter shared by all clients, so the background logins can not flood the portal
+        :param vault: SessionVault to restore sessions from (instead of logging in) and to store new sessions in
+        :param hooks: A list of callables passed to every client, see Webportal
+        """
+        self.api = api
+        self.limiter = limiter
+        self.vault = vault
+        self.hooks = hooks
+        self.transport = transport if transport is not None else RequestsTransport(pool_size=max(10, workers))
+        if captcha is None:
+            from pyjiit.default import CAPTCHA as captcha
+        self.captcha = captcha
+        self.refresh_before = refresh_before
+        self.retry_after = retry_after
+
+        self._clients: dict[str, Webportal] = {}
+        self._credentials: dict[str, str] = {}
+        self._login_locks: dict[str, threading.Lock] = {}
+        self.errors: dict[str, Exception] = {}
+
+        self._due: dict[str, datetime] = {}
+        self._schedule = []
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="pyjiit-refresh")
+        self._thread = None
+        self._closed = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._credentials)
+
+    def __contains__(self, username: str) -> bool:
+        return username in self._credentials
+
+    def start(self):
+        """Starts the background refresh thread"""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pyjiit-session-pool", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stops the background thread and closes the shared transport"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+        self.transport.close()
+
+    def add(self, username: str, password: str):
+        """
+        Registers an account, its session is restored from the vault if possible,
+        otherwise it is logged in by the background thread as soon as possible
+
+        :param username: A username
+        :param password: A password
+        """
+        session = None
+        if self.vault is not None:
+            session = self.vault.load(username, self.refresh_before)
+        self._add(username, password, session)
+
+    def add_many(self, accounts):
+        """
+        Registers many accounts, restoring every valid session from the vault with one query
+
+        :param accounts: An iterable of (username, password) or a dictionary of username -> password
+        """
+        if isinstance(accounts, dict):
+            accounts = accounts.items()
+
+        sessions = self.vault.load_all(self.refresh_before) if self.vault is not None else {}
+        for username, password in accounts:
+            self._add(username, password, sessions.get(username))
+
+    def _add(self, username, password, session):
+        with self._cond:
+            self._credentials[username] = password
+            self._login_locks.setdefault(username, threading.Lock())
+            client = self._clients.setdefault(username, Webportal(self.transport, api=self.api, limiter=self.limiter, hooks=self.hooks))
+            if session is not None and client.session is None:
+                client.session = session
+
+        if client.session is not None:
+            self._schedule_at(username, client.session.expiry - self.refresh_before)
+        else:
+            self._schedule_at(username, datetime.now())
+
+    def remove(self, username: str):
+        """
+        :param username: A username added earlier
+        """
+        with self._cond:
+            self._credentials.pop(username, None)
+            self._clients.pop(username, None)
+            self._login_locks.pop(username, None)
+            self._due.pop(username, None)
+            self.errors.pop(username, None)
+
+    def get(self, username: str) -> Webportal:
+        """
+        :param username: A username added earlier
+        :returns: A logged in Webportal client (logs in on the calling thread only if there is no valid session yet)
+        :raises KeyError: Raised if the username was never added
+        :raises LoginError: Raised if a required login fails
+        """
+        if username not in self._credentials:
+            raise KeyError(username)
+
+        return self._login(username, timedelta(0))
+
+    def session(self, username: str) -> WebportalSession:
+        """
+        :param username: A username added earlier
+        :returns: A valid WebportalSession for the user
+        """
+        return self.get(username).session
+
+    def _login(self, username: str, min_ttl: timedelta) -> Webportal:
+        # the per user lock makes concurrent callers wait for one login instead of each doing their own
+        with self._login_locks[username]:
+            client = self._clients[username]
+            session = client.session
+            if session is not None and session.expiry - datetime.now() > min_ttl:
+                return client
+
+            try:
+                session = client.student_login(username, self._credentials[username], self.captcha)
+            except Exception as e:
+                self.errors[username] = e
+                self._schedule_at(username, datetime.now() + self.retry_after)
+                raise
+
+            self.errors.pop(username, None)
+            if self.vault is not None:
+                self.vault.save(username, session)
+            self._schedule_at(username, session.expiry - self.refresh_before)
+            return client
+
+    def _refresh(self, username: str):
+        try:
+            self._login(username, self.refresh_before)
+        except KeyError:
+            pass # removed while queued
+        except Exception:
+            pass # recorded in self.errors and rescheduled
+
+    def _schedule_at(self, username: str, when: datetime):
+        with self._cond:
+            if username not in self._credentials:
+                return
+            self._due[username] = when
+            heapq.heappush(self._schedule, (when, username))
+            self._cond.notify()
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                if not self._schedule:
+                    self._cond.wait()
+                    continue
+
+                when, username = self._schedule[0]
+                delay = (when - datetime.now()).total_seconds()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                heapq.heappop(self._schedule)
+                if self._due.get(username) != when:
+                    continue # stale entry, the user was rescheduled since
+
+                self._due.pop(username)
+                self._executor.submit(self._refresh, username)
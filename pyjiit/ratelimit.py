@@ -0,0 +1,232 @@
+import random
+import sys
+import threading
+import time
+
+from pyjiit.exceptions import APIError, LoginError, AccountAPIError
+
+
+# failures of these are final, and calls which raise them (login, password change) are never retried
+FATAL = (LoginError, AccountAPIError)
+
+
+class TokenBucket:
+    """
+    Class which implements a token bucket whose rate can be changed while in use
+    """
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        :param rate: Tokens added per second
+        :param burst: Maximum number of tokens
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes one token, going into debt if there is none
+
+        :returns: Seconds to wait before the token may be used
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class SharedQuota:
+    """
+    Class which implements a token bucket shared by several processes, like TokenBucket but in shared memory
+
+    Create it in the parent and pass it to the processes when they are started (e.g. as an argument of
+    :code:`multiprocessing.Process`), then to :code:`RateLimiter(quota=...)` in every process.
+    """
+    def __init__(self, rate: float, burst: float = None, context=None) -> None:
+        """
+        :param rate: Tokens added per second, over all processes
+        :param burst: Maximum number of tokens (defaults to rate, at least 1)
+        :param context: multiprocessing context the processes are started with (defaults to the default one)
+        """
+        if context is None:
+            import multiprocessing as context
+
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._state = context.Array("d", [self.burst, time.monotonic()]) # tokens, updated
+
+    def reserve(self) -> float:
+        """
+        Takes one token, going into debt if there is none
+
+        :returns: Seconds to wait before the token may be used
+        """
+        with self._state.get_lock():
+            now = time.monotonic()
+            tokens = min(self.burst, self._state[0] + (now - self._state[1]) * self.rate) - 1
+            self._state[0] = tokens
+            self._state[1] = now
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Class which paces requests with one token bucket per host and one per endpoint, and adapts their rates
+
+    Every transient failure (non "Success" responseStatus, non JSON error pages, connection errors and timeouts) divides
+    the rate of the endpoint and of the host by :code:`1/decrease`. Every success adds :code:`increase` back,
+    up to the configured maximum. Failures of that kind are retried with exponential backoff and jitter, while
+    LoginError and AccountAPIError are never retried. One instance is meant to be shared by every client of a process,
+    see :code:`shared_limiter()`. A SharedQuota given as quota caps every request on top of that, across processes.
+    """
+    def __init__(self, host_rate: float = 50.0, endpoint_rate: float = 10.0, endpoint_rates: dict = None,
+                 min_rate: float = 0.2, decrease: float = 0.5, increase: float = 0.5,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 30.0, quota: SharedQuota = None) -> None:
+        """
+        :param host_rate: Maximum requests per second to one host
+        :param endpoint_rate: Maximum requests per second to one endpoint
+        :param endpoint_rates: A dictionary of endpoint to maximum rate, overriding endpoint_rate
+        :param min_rate: The rate is never lowered below this
+        :param decrease: Factor applied to the rate on every retryable failure
+        :param increase: Requests per second added to the rate on every success
+        :param retries: Retries of a retryable failure
+        :param backoff: Delay before the first retry, doubled on every further retry
+        :param max_backoff: Upper limit of the retry delay
+        :param quota: SharedQuota every request also takes a token from (not adapted on failures)
+        """
+        self.host_rate = host_rate
+        self.endpoint_rate = endpoint_rate
+        self.endpoint_rates = endpoint_rates or {}
+        self.min_rate = min_rate
+        self.decrease = decrease
+        self.increase = increase
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.quota = quota
+
+        self._lock = threading.Lock()
+        self._hosts: dict[str, TokenBucket] = {}
+        self._endpoints: dict[tuple, TokenBucket] = {}
+
+    def _buckets(self, host: str, endpoint: str) -> tuple:
+        with self._lock:
+            host_bucket = self._hosts.get(host)
+            if host_bucket is None:
+                host_bucket = self._hosts[host] = TokenBucket(self.host_rate, max(1.0, self.host_rate))
+
+            endpoint_bucket = self._endpoints.get((host, endpoint))
+            if endpoint_bucket is None:
+                rate = self.max_endpoint_rate(endpoint)
+                endpoint_bucket = self._endpoints[(host, endpoint)] = TokenBucket(rate, max(1.0, rate))
+
+        return host_bucket, endpoint_bucket
+
+    def max_endpoint_rate(self, endpoint: str) -> float:
+        return self.endpoint_rates.get(endpoint, self.endpoint_rate)
+
+    def rate(self, host: str, endpoint: str) -> tuple:
+        """
+        :returns: A tuple of the current host rate and endpoint rate
+        """
+        host_bucket, endpoint_bucket = self._buckets(host, endpoint)
+        return host_bucket.rate, endpoint_bucket.rate
+
+    def delay(self, host: str, endpoint: str) -> float:
+        """
+        Reserves a request to endpoint on host
+
+        :returns: Seconds to wait before sending it
+        """
+        delay = max(bucket.reserve() for bucket in self._buckets(host, endpoint))
+        if self.quota is not None:
+            delay = max(delay, self.quota.reserve())
+        return delay
+
+    def wait(self, host: str, endpoint: str):
+        """Blocks until a request to endpoint on host may be sent"""
+        delay = self.delay(host, endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_wait(self, host: str, endpoint: str):
+        """Waits (without blocking the event loop) until a request to endpoint on host may be sent"""
+        import asyncio
+
+        delay = self.delay(host, endpoint)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, host: str, endpoint: str, ok: bool):
+        """
+        Adapts the rates after a request
+
+        :param ok: False for a transient failure, True for a success
+        """
+        host_bucket, endpoint_bucket = self._buckets(host, endpoint)
+        limits = ((host_bucket, self.host_rate), (endpoint_bucket, self.max_endpoint_rate(endpoint)))
+        for bucket, limit in limits:
+            with bucket._lock:
+                if ok:
+                    bucket.rate = min(limit, bucket.rate + self.increase)
+                else:
+                    bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+
+    @staticmethod
+    def is_transient(error: Exception, status: int = None) -> bool:
+        """
+        :param error: The exception raised by the request
+        :param status: HTTP status of the response, if there was one
+        :returns: True if error looks like an overloaded or flaky portal (and not like a wrong password, etc)
+        """
+        if isinstance(error, FATAL) or status in (400, 401, 403, 404):
+            return False
+        if isinstance(error, (APIError, TimeoutError)):
+            return True
+
+        # the HTTP libraries are only looked up if loaded, an error can not come from one which is not
+        requests = sys.modules.get("requests")
+        if requests is not None and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        asyncio = sys.modules.get("asyncio")
+        if asyncio is not None and isinstance(error, asyncio.TimeoutError):
+            return True
+        aiohttp = sys.modules.get("aiohttp")
+        return aiohttp is not None and isinstance(error, aiohttp.ClientConnectionError)
+
+    def should_retry(self, error: Exception, exception: type, attempt: int, status: int = None) -> bool:
+        """
+        :param error: The exception raised by the request
+        :param exception: The exception class used by the calling method (LoginError for logins, etc)
+        :param attempt: Number of retries done so far
+        :param status: HTTP status of the response, if there was one
+        :returns: True if the request should be sent again
+        """
+        if attempt >= self.retries or issubclass(exception, FATAL):
+            return False
+        return self.is_transient(error, status)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        :param attempt: Number of the retry, starting at 0
+        :returns: Seconds to wait before the retry (with full jitter)
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_limiter() -> RateLimiter:
+    """
+    :returns: The RateLimiter shared by the whole process (created with default settings on first use)
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimiter()
+        return _shared
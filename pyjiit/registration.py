@@ -1,4 +1,11 @@
+from array import array
 from dataclasses import dataclass
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
 
 @dataclass
 class RegisteredSubject:
@@ -35,9 +42,329 @@ class RegisteredSubject:
 
 class Registrations:
     """Class containing all registered subjects and total course credits for the semester"""
-    def __init__(self, resp: dict) -> None:
-        self.raw_response = resp
+    def __init__(self, resp: dict, keep_raw: bool = True) -> None:
+        """
+        :param resp: Response of the registered subjects API
+        :param keep_raw: Keep the response in raw_response after parsing (None otherwise)
+        """
+        self.raw_response = resp if keep_raw else None
         self.total_credits = resp["totalcreditpoints"]
         self.subjects = [RegisteredSubject.from_json(i) for i in resp["registrations"]]
 
 
+
+
+# fields of RegisteredSubject in the on-disk order
+_FIELDS = (
+    "employee_name", "employee_code", "minor_subject", "remarks", "stytype", "credits", "subject_code",
+    "subject_component_code", "subject_desc", "subject_id", "audtsubject"
+)
+
+INDEX_MAGIC = b"PYJIITR1"
+
+_COUNTS = struct.Struct("<III") # bytes of the value table, subjects, entries
+
+
+def _little(a: array) -> bytes:
+    if sys.byteorder == "big":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+def _unpack(data: bytes, offset: int, n: int) -> array:
+    a = array("I")
+    a.frombytes(data[offset:offset + n * a.itemsize])
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a
+
+
+@dataclass(eq=False)
+class RegistrationEntry:
+    """
+    Class containing one registered subject of one student in one semester, as stored by RegistrationIndex
+
+    subject is shared by every student registered to the same subject, component and faculty, so do not modify it.
+    """
+    student: str
+    registration_id: str
+    subject: RegisteredSubject
+
+
+class RegistrationIndex:
+    """
+    Class which indexes the registrations of many students by subject code, employee code, component and semester
+
+    Each distinct string is stored once, and so is each distinct RegisteredSubject: students of the same section
+    share one object, and the subject, employee and component keys index those shared subjects rather than every
+    entry. The registrations of one student and semester can be replaced on their own with :code:`update`.
+    The index can be written to a compact binary file with :code:`save` and read with :code:`load`.
+    Methods are thread safe.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._strings: dict[str, str] = {}
+        self._subjects: dict[tuple, RegisteredSubject] = {} # field values -> shared subject
+        self._holders: dict[int, dict] = {} # id of a shared subject -> its entries, as an insertion ordered set
+        self._entries: dict[tuple, list] = {} # (student, registration id) -> entries
+        self._by_registration: dict[str, dict] = {} # registration id -> entries
+        # key -> {id of a shared subject: subject}
+        self._by_subject: dict[str, dict] = {}
+        self._by_employee: dict[str, dict] = {}
+        self._by_component: dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def __iter__(self):
+        with self._lock:
+            return iter([entry for entries in self._entries.values() for entry in entries])
+
+    def _intern(self, value):
+        if isinstance(value, str):
+            return self._strings.setdefault(value, value)
+        return value
+
+    def _subject_postings(self, subject: RegisteredSubject):
+        return (
+            (self._by_subject, subject.subject_code),
+            (self._by_employee, subject.employee_code),
+            (self._by_component, subject.subject_component_code),
+        )
+
+    def _share(self, key: tuple) -> RegisteredSubject:
+        # key has to be interned already
+        shared = self._subjects.get(key)
+        if shared is None:
+            shared = self._subjects[key] = RegisteredSubject(*key)
+            self._holders[id(shared)] = {}
+            for postings, value in self._subject_postings(shared):
+                postings.setdefault(value, {})[id(shared)] = shared
+        return shared
+
+    def _key(self, subject: RegisteredSubject) -> tuple:
+        return tuple(self._intern(getattr(subject, name)) for name in _FIELDS)
+
+    def update(self, student: str, registration_id: str, registrations) -> bool:
+        """
+        Replaces the registrations of student in a semester
+
+        :param student: A student identifier (e.g. a username)
+        :param registration_id: A registration id (or any other key of the semester)
+        :param registrations: A Registrations object, a response of the registered subjects API or a list of
+                              RegisteredSubject
+        :returns: False if they were the same as the indexed ones (nothing is changed), True otherwise
+        """
+        if isinstance(registrations, Registrations):
+            subjects = registrations.subjects
+        elif isinstance(registrations, dict):
+            subjects = [RegisteredSubject.from_json(i) for i in registrations["registrations"]]
+        else:
+            subjects = list(registrations)
+
+        with self._lock:
+            student, registration_id = self._intern(student), self._intern(registration_id)
+            keys = [self._key(s) for s in subjects]
+            old = self._entries.get((student, registration_id))
+            if old is not None and len(old) == len(keys) and all(
+                self._subjects.get(key) is entry.subject for entry, key in zip(old, keys)
+            ):
+                return False
+
+            # shared only after the old entries are dropped, which may drop subjects nobody else has
+            self._drop(student, registration_id)
+            if keys:
+                self._add(student, registration_id, [self._share(key) for key in keys])
+            return True
+
+    def update_many(self, registrations: dict) -> int:
+        """
+        :param registrations: A dictionary of (student, registration id) -> registrations, as taken by update
+        :returns: Number of students and semesters which changed
+        """
+        return sum(self.update(student, registration_id, r) for (student, registration_id), r in registrations.items())
+
+    def _add(self, student, registration_id, subjects):
+        entries = self._entries[(student, registration_id)] = []
+        registration = self._by_registration.get(registration_id)
+        if registration is None:
+            registration = self._by_registration[registration_id] = {}
+
+        holders = self._holders
+        for subject in subjects:
+            entry = RegistrationEntry(student, registration_id, subject)
+            entries.append(entry)
+            holders[id(subject)][entry] = None
+            registration[entry] = None
+
+    def _drop(self, student, registration_id):
+        entries = self._entries.pop((student, registration_id), None)
+        if entries is None:
+            return
+
+        registration = self._by_registration[registration_id]
+        for entry in entries:
+            del registration[entry]
+            subject = entry.subject
+            holders = self._holders[id(subject)]
+            del holders[entry]
+            if not holders:
+                # nobody has the subject any more
+                del self._holders[id(subject)]
+                del self._subjects[tuple(getattr(subject, name) for name in _FIELDS)]
+                for postings, value in self._subject_postings(subject):
+                    keyed = postings[value]
+                    del keyed[id(subject)]
+                    if not keyed:
+                        del postings[value]
+        if not registration:
+            del self._by_registration[registration_id]
+
+    def remove(self, student: str, registration_id: str = None):
+        """
+        Drops the registrations of student in a semester (in every semester if registration_id is None)
+        """
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if key[0] == student and (registration_id is None or key[1] == registration_id)
+            ]
+            for key in keys:
+                self._drop(*key)
+
+    def find(self, subject_code: str = None, employee_code: str = None, subject_component_code: str = None,
+             registration_id: str = None) -> list:
+        """
+        :returns: A list of RegistrationEntry matching every given key (every entry if none is given)
+        """
+        keys = (
+            (self._by_subject, subject_code),
+            (self._by_employee, employee_code),
+            (self._by_component, subject_component_code),
+        )
+        with self._lock:
+            postings = [postings.get(key, {}) for postings, key in keys if key is not None]
+            if not postings:
+                if registration_id is not None:
+                    return list(self._by_registration.get(registration_id, ()))
+                return [entry for entries in self._entries.values() for entry in entries]
+
+            # intersect the few shared subjects first, from the smallest posting
+            postings.sort(key=len)
+            first, rest = postings[0], postings[1:]
+            out = []
+            for i in first:
+                if all(i in other for other in rest):
+                    holders = self._holders[i]
+                    if registration_id is None:
+                        out += holders
+                    else:
+                        out += [entry for entry in holders if entry.registration_id == registration_id]
+            return out
+
+    def students(self, subject_code: str = None, employee_code: str = None, subject_component_code: str = None,
+                 registration_id: str = None) -> list:
+        """
+        e.g. :code:`index.students(employee_code="JIIT1234")` for every student taught by an employee
+
+        :returns: Sorted list of the students of the entries matching every given key
+        """
+        return sorted({e.student for e in self.find(subject_code, employee_code, subject_component_code, registration_id)})
+
+    def sections(self, subject_code: str, registration_id: str = None) -> dict:
+        """
+        :returns: A dictionary of (subject component code, employee code) -> sorted list of students, for every
+                  section of subject_code (in registration_id, or in every semester if None)
+        """
+        out = {}
+        for entry in self.find(subject_code=subject_code, registration_id=registration_id):
+            subject = entry.subject
+            out.setdefault((subject.subject_component_code, subject.employee_code), set()).add(entry.student)
+        return {key: sorted(students) for key, students in out.items()}
+
+    def registrations(self, student: str, registration_id: str) -> list:
+        """
+        :returns: A list of the RegisteredSubjects of student in a semester (empty if it is not indexed)
+        """
+        with self._lock:
+            return [entry.subject for entry in self._entries.get((student, registration_id), [])]
+
+    def to_bytes(self) -> bytes:
+        """
+        :returns: The index in its compact binary format, see :code:`save`
+        """
+        with self._lock:
+            values, ids, subject_ids = [], {}, {}
+            subjects, entries = array("I"), array("I")
+
+            def value_id(value) -> int:
+                key = (type(value), value) # so 1 and 1.0 (and True) stay apart
+                i = ids.get(key)
+                if i is None:
+                    i = ids[key] = len(values)
+                    values.append(value)
+                return i
+
+            for (student, registration_id), indexed in self._entries.items():
+                for entry in indexed:
+                    s = subject_ids.get(id(entry.subject))
+                    if s is None:
+                        s = subject_ids[id(entry.subject)] = len(subject_ids)
+                        subjects.extend(value_id(getattr(entry.subject, name)) for name in _FIELDS)
+                    entries.extend((value_id(student), value_id(registration_id), s))
+
+        table = json.dumps(values, separators=(",", ":")).encode()
+        body = _COUNTS.pack(len(table), len(subject_ids), len(entries) // 3) + table + _little(subjects) + _little(entries)
+        return INDEX_MAGIC + zlib.compress(body)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'RegistrationIndex':
+        """
+        :raises ValueError: Raised if data is not a registration index
+        """
+        if data[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError("not a pyjiit registration index")
+        body = zlib.decompress(data[len(INDEX_MAGIC):])
+
+        size, n_subjects, n_entries = _COUNTS.unpack_from(body)
+        offset = _COUNTS.size
+        values = json.loads(body[offset:offset + size])
+        offset += size
+        subject_ids = _unpack(body, offset, n_subjects * len(_FIELDS))
+        offset += subject_ids.itemsize * len(subject_ids)
+        entry_ids = _unpack(body, offset, n_entries * 3)
+
+        # json.loads already returns one object per table value, so the strings are shared without interning
+        index = RegistrationIndex()
+        index._strings = {v: v for v in values if isinstance(v, str)}
+        n = len(_FIELDS)
+        subjects = [index._share(tuple(values[j] for j in subject_ids[i:i + n])) for i in range(0, len(subject_ids), n)]
+
+        grouped = {}
+        for i in range(0, len(entry_ids), 3):
+            grouped.setdefault((values[entry_ids[i]], values[entry_ids[i + 1]]), []).append(subjects[entry_ids[i + 2]])
+        for (student, registration_id), indexed in grouped.items():
+            index._add(student, registration_id, indexed)
+        return index
+
+    def save(self, path: str):
+        """
+        Writes the index to path, replacing the file at once so a crash never leaves half an index
+
+        The file is a zlib compressed table of the distinct values, one row of value ids per distinct subject and
+        one (student, registration id, subject) row per entry.
+        """
+        data = self.to_bytes()
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str) -> 'RegistrationIndex':
+        """
+        :raises ValueError: Raised if path is not a registration index
+        """
+        with open(path, "rb") as f:
+            return RegistrationIndex.from_bytes(f.read())
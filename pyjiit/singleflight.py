@@ -0,0 +1,113 @@
+import copy
+import json
+import threading
+
+
+def flight_key(api: str, user: str, endpoint: str, payload) -> tuple:
+    """
+    :returns: A hashable key identifying a request of user to endpoint with payload
+    """
+    return (api, user, endpoint, json.dumps(payload, sort_keys=True, separators=(",", ":")))
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Class which makes concurrent identical calls share one upstream request
+
+    The first caller of :code:`do` for a key runs the call, every caller arriving while it is in flight
+    waits for it and gets a copy of its result (or the same exception), so callers can change what they got without
+    affecting each other. Nothing is kept once the call is done.
+    Thread safe, one instance is meant to be shared by many Webportal clients.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[tuple, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: tuple, fn):
+        """
+        :param key: A hashable key, see :code:`flight_key`
+        :param fn: A callable without arguments making the request
+        :returns: The result of fn, run by this caller or by the one which came first
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            # nobody can join any more. The waiters copy a private snapshot, the leader may change its result as
+            # soon as it returns
+            if call.error is None and call.waiters:
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+        return result
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio version of SingleFlight, to be used from one event loop
+
+    The call runs in its own task, so cancelling the caller which started it does not cancel it for the others.
+    Callers of a shared call each get their own copy of its result.
+    """
+    def __init__(self) -> None:
+        self._calls = {} # key -> _AsyncCall
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: tuple, fn):
+        """
+        :param key: A hashable key, see :code:`flight_key`
+        :param fn: A coroutine function without arguments making the request
+        :returns: The result of fn, run by this caller or by the one which came first
+        """
+        import asyncio
+
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: self._calls.pop(key, None))
+        call.waiters += 1
+
+        result = await asyncio.shield(call.task)
+        # every caller of a shared call gets its own copy, the task's result is never handed out
+        return result if call.waiters == 1 else copy.deepcopy(result)
@@ -0,0 +1,180 @@
+import json
+import threading
+import weakref
+
+
+DEFAULT_TIMEOUT = (5, 30)
+
+class Response:
+    """
+    Minimal response object returned by async transports (mirrors the parts of :code:`requests.Response` used by pyjiit)
+    """
+    __slots__ = ("status_code", "content")
+
+    def __init__(self, status_code: int, content: bytes) -> None:
+        self.status_code = status_code
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Transport:
+    """
+    Base class for the HTTP layer used by Webportal.
+    Subclass this and implement :code:`request` to plug in a different HTTP client (or a fake one for tests)
+    """
+    def request(self, method: str, url: str, **kwargs):
+        """
+        :param method: HTTP method
+        :param url: Absolute URL
+        :param kwargs: Keyword arguments as accepted by :code:`requests.request`
+        :returns: A response object which has a :code:`json()` method
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Releases any resource held by the transport"""
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Transport backed by pooled, keep-alive :code:`requests.Session` objects
+
+    requests.Session is not thread safe, so every thread gets its own, and they all share one
+    HTTPAdapter, so keep-alive connections are pooled across threads (the urllib3 pool is thread safe).
+    """
+    def __init__(self, pool_size: int = 10, timeout=DEFAULT_TIMEOUT, retries: int = 3, backoff_factor: float = 0.5) -> None:
+        """
+        :param pool_size: Maximum number of connections kept alive per host
+        :param timeout: Default timeout for every request, either seconds or a (connect, read) tuple
+        :param retries: Number of retries on connection errors
+        :param backoff_factor: Backoff factor between retries (0.5 -> 0.5s, 1s, 2s...)
+        """
+        # imported here so that importing pyjiit does not pay for requests/urllib3
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.timeout = timeout
+        self._requests = requests
+        self._local = threading.local()
+        self._sessions = weakref.WeakSet() # sessions of threads which exit are dropped with them
+        self._lock = threading.Lock()
+
+        # only connection errors are retried, the request was never sent so it is safe even for login
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=0,
+            backoff_factor=backoff_factor,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+
+    @property
+    def session(self):
+        """The requests.Session of the calling thread"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            with self._lock:
+                self._sessions.add(session)
+        return session
+
+    def request(self, method: str, url: str, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        # closing a session closes the shared adapter too, which drops the pooled connections
+        with self._lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        self.adapter.close()
+
+
+class AsyncTransport:
+    """
+    Base class for the HTTP layer used by AsyncWebportal
+    """
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        :param method: HTTP method
+        :param url: Absolute URL
+        :param kwargs: Keyword arguments as accepted by :code:`requests.request` (data, json, headers, timeout)
+        :returns: A Response object
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Releases any resource held by the transport"""
+        pass
+
+
+class AiohttpTransport(AsyncTransport):
+    """
+    Transport backed by a shared :code:`aiohttp.ClientSession` (needs the :code:`async` extra)
+
+    The connector caps the number of open connections, so any number of
+    concurrent calls can be awaited and they will queue for a free connection.
+    """
+    def __init__(self, pool_size: int = 100, timeout=DEFAULT_TIMEOUT, retries: int = 3, backoff_factor: float = 0.5) -> None:
+        """
+        :param pool_size: Maximum number of simultaneous connections
+        :param timeout: Default timeout for every request, either seconds or a (connect, read) tuple
+        :param retries: Number of retries on connection errors
+        :param backoff_factor: Backoff factor between retries (0.5 -> 0.5s, 1s, 2s...)
+        """
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AiohttpTransport requires aiohttp, install it with: pip install pyjiit[async]") from None
+
+        self._aiohttp = aiohttp
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.session = None
+
+    def _client_timeout(self, timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return self._aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        return self._aiohttp.ClientTimeout(total=timeout)
+
+    def _get_session(self):
+        # ClientSession has to be created inside the running event loop
+        if self.session is None or self.session.closed:
+            connector = self._aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = self._aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def request(self, method: str, url: str, **kwargs) -> Response:
+        kwargs["timeout"] = self._client_timeout(kwargs.get("timeout", self.timeout))
+        session = self._get_session()
+
+        attempt = 0
+        while True:
+            try:
+                async with session.request(method, url, **kwargs) as resp:
+                    return Response(resp.status, await resp.read())
+            except self._aiohttp.ClientConnectorError:
+                # like RequestsTransport, only errors before the request was sent are retried
+                if attempt >= self.retries:
+                    raise
+                import asyncio
+                await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                attempt += 1
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -2,9 +2,20 @@ import datetime
 import random
 import string
 
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30), "IST")
+
+def ist_now() -> datetime.datetime:
+    """Returns the current time in IST (the portal's day starts at 0000 hrs IST)"""
+    return datetime.datetime.now(IST)
+
+def next_ist_midnight(date: datetime.date) -> float:
+    """Returns the unix timestamp at which the IST day after date starts"""
+    tomorrow = date + datetime.timedelta(days=1)
+    return datetime.datetime.combine(tomorrow, datetime.time(0), tzinfo=IST).timestamp()
+
 def generate_date_seq(date=None):
     if date is None:
-        date = datetime.date.today()
+        date = ist_now().date()
     i = str(date.day).zfill(2)
     a = str(date.month).zfill(2)
     r = str(date.year)[2:]
@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+import hashlib
+import hmac
+import json
+import os
+import threading
+
+from pyjiit.exceptions import VaultError
+from pyjiit.wrapper import WebportalSession
+
+
+_CHECK = b"pyjiit-session-vault"
+
+
+class SessionVault:
+    """
+    Class which stores WebportalSessions in an SQLite file, encrypted at rest with AES-GCM
+
+    Rows are keyed by an HMAC of the username, and the session data and username are encrypted, so the
+    file only shows how many sessions there are and when they expire. The key is derived from a passphrase
+    with scrypt (salted per file), or given directly as 32 bytes. Methods are thread safe.
+    """
+
+    def __init__(self, path: str, key) -> None:
+        """
+        :param path: Path of the SQLite database, created if missing
+        :param key: A passphrase string, or 32 raw key bytes
+        :raises VaultError: Raised if the key does not open an existing vault
+        """
+        import sqlite3
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, expires REAL, data BLOB)")
+
+        salt = self._meta("salt")
+        if salt is None:
+            salt = os.urandom(16)
+            self._db.execute("INSERT INTO meta VALUES ('salt', ?)", (salt,))
+
+        if isinstance(key, str):
+            from Crypto.Protocol.KDF import scrypt
+            key = scrypt(key.encode(), salt, 32, N=2**14, r=8, p=1)
+        if len(key) != 32:
+            raise VaultError("key must be a passphrase or 32 bytes")
+        self._key = key
+
+        check = self._meta("check")
+        if check is None:
+            self._db.execute("INSERT INTO meta VALUES ('check', ?)", (self._encrypt(_CHECK, b"check"),))
+        elif self._decrypt(check, b"check") != _CHECK:
+            raise VaultError("wrong key for this vault")
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        """Closes the SQLite database"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def save(self, username: str, session: WebportalSession):
+        """
+        Stores session of username, replacing the previous one
+        """
+        self.save_many({username: session})
+
+    def save_many(self, sessions: dict):
+        """
+        :param sessions: A dictionary of username -> WebportalSession, written in one transaction
+        """
+        rows = []
+        for username, session in sessions.items():
+            key = self._row_key(username)
+            data = json.dumps({"username": username, "session": session.to_json()}, separators=(",", ":")).encode()
+            rows.append((key, session.expiry.timestamp(), self._encrypt(data, key.encode())))
+
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", rows)
+            self._db.commit()
+
+    def load(self, username: str, min_ttl: timedelta = timedelta(0), keep_raw: bool = True) -> WebportalSession:
+        """
+        :param username: A username
+        :param min_ttl: Sessions expiring sooner than this are treated as missing
+        :returns: The stored WebportalSession of username (None if there is none or it is expired)
+        """
+        key = self._row_key(username)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM sessions WHERE key = ? AND expires > ?", (key, (datetime.now() + min_ttl).timestamp())
+            ).fetchone()
+
+        if row is None:
+            return None
+        return WebportalSession.from_json(self._open(row[0], key)["session"], keep_raw)
+
+    def load_all(self, min_ttl: timedelta = timedelta(0), keep_raw: bool = True) -> dict:
+        """
+        Restores every session valid for at least min_ttl with a single query and no network calls
+
+        :returns: A dictionary of username -> WebportalSession
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, data FROM sessions WHERE expires > ?", ((datetime.now() + min_ttl).timestamp(),)
+            ).fetchall()
+
+        out = {}
+        for key, blob in rows:
+            data = self._open(blob, key)
+            out[data["username"]] = WebportalSession.from_json(data["session"], keep_raw)
+        return out
+
+    def remove(self, username: str):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE key = ?", (self._row_key(username),))
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        """
+        :returns: Number of expired sessions deleted
+        """
+        with self._lock:
+            n = self._db.execute("DELETE FROM sessions WHERE expires <= ?", (datetime.now().timestamp(),)).rowcount
+            self._db.commit()
+        return n
+
+    def _meta(self, name):
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _row_key(self, username: str) -> str:
+        return hmac.new(self._key, username.encode(), hashlib.sha256).hexdigest()
+
+    def _encrypt(self, data: bytes, aad: bytes) -> bytes:
+        from Crypto.Cipher import AES
+
+        nonce = os.urandom(12)
+        cipher = AES.new(self._key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(aad)
+        ciphertext, tag = cipher.encrypt_and_digest(data)
+        return nonce + tag + ciphertext
+
+    def _decrypt(self, blob: bytes, aad: bytes) -> bytes:
+        from Crypto.Cipher import AES
+
+        cipher = AES.new(self._key, AES.MODE_GCM, nonce=blob[:12])
+        cipher.update(aad)
+        try:
+            return cipher.decrypt_and_verify(blob[28:], blob[12:28])
+        except ValueError:
+            return None
+
+    def _open(self, blob: bytes, key: str) -> dict:
+        # the row key is authenticated too, so rows can not be swapped between users
+        data = self._decrypt(blob, key.encode())
+        if data is None:
+            raise VaultError("session data failed authentication")
+        return json.loads(data)
@@ -1,16 +1,26 @@
-from datetime import datetime
-from pprint import pformat
-from pyjiit.encryption import serialize_payload, generate_local_name
-from pyjiit.exam import ExamEvent
+from datetime import datetime, timedelta
+from pyjiit.encryption import serialize_payload, LocalNameProvider, LOCAL_NAMES
+from pyjiit.exam import ExamEvent, ExamScheduleEntry, ExamScheduleIndex
 from pyjiit.registration import Registrations
 from pyjiit.token import Captcha
-from pyjiit.default import CAPTCHA
+from pyjiit.captcha import CaptchaPool, is_captcha_error
 from pyjiit.exceptions import APIError, LoginError, NotLoggedIn, SessionExpired, AccountAPIError
-from pyjiit.attendance import AttendanceMeta, AttendanceHeader, Semester
+from pyjiit.attendance import AttendanceMeta, AttendanceHeader, Semester, AttendanceDetail
+from pyjiit.changes import AttendanceTracker
+from pyjiit.transport import Transport, RequestsTransport
+from pyjiit.cache import ResponseCache
+from pyjiit.fanout import FanOutResult, fan_out
+from pyjiit.metrics import RequestEvent
+from pyjiit.ratelimit import FATAL, RateLimiter
+from pyjiit.hedge import Hedger
+from pyjiit.singleflight import SingleFlight, flight_key
 
 from functools import wraps
-import requests
+from urllib.parse import urlsplit
+import inspect
 import json
+import threading
+import time
 import base64
 
 
@@ -21,24 +31,57 @@ def authenticated(method):
     :param method: A method of Webportal class
     :returns: A wrapper to method with checks for session invalidation
     """
+    if inspect.iscoroutinefunction(method):
+        @wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            check_session(self.session)
+            return await method(self, *args, **kwargs)
+        return async_wrapper
+
     @wraps(method)
     def wrapper(self, *args, **kwargs):
-        if self.session is None:
-            raise NotLoggedIn
-
-        if self.session.expiry < datetime.now():
-            raise SessionExpired
-
+        check_session(self.session)
         return method(self, *args, **kwargs)
     wrapper.__doc__ = method.__doc__
     return wrapper
 
+def check_session(session):
+    """
+    :param session: A WebportalSession object or None
+    :raises NotLoggedIn: Raised if there is no session
+    :raises SessionExpired: Raised if the session token has expired
+    """
+    if session is None:
+        raise NotLoggedIn
+
+    if session.expiry < datetime.now():
+        raise SessionExpired
+
+def check_response(resp: dict, exception=APIError) -> dict:
+    """
+    :param resp: Decoded JSON response from the API
+    :param exception: Exception class to raise on failure
+    :returns: The same response if the API reported success
+    :raises exception: Raised if responseStatus is not "Success", with the status dictionary as its status attribute
+    """
+    if resp["status"]["responseStatus"] != "Success":
+        from pprint import pformat
+        error = exception("status:\n"+pformat(resp["status"]))
+        error.status = resp["status"]
+        raise error
+
+    return resp
+
 class WebportalSession:
     """
     Class which contains session cookies for JIIT Webportal
     """
-    def __init__(self, resp: dict) -> None:
-        self.raw_response = resp
+    def __init__(self, resp: dict, keep_raw: bool = True) -> None:
+        """
+        :param resp: Response of the login API
+        :param keep_raw: Keep the response in raw_response (None otherwise)
+        """
+        self.raw_response = resp if keep_raw else None
         self.regdata: dict = resp['regdata']
         
         institute = self.regdata['institutelist'][0]
@@ -49,6 +92,7 @@ class WebportalSession:
         self.userid: str = self.regdata['userid']
 
         self.token: str = self.regdata['token']
+        self.authorization = f"Bearer {self.token}"
         expiry_timestamp = json.loads(base64.b64decode(self.token.split(".")[1]))['exp']
         self.expiry = datetime.fromtimestamp(expiry_timestamp)
             
@@ -56,86 +100,384 @@ class WebportalSession:
         self.membertype = self.regdata["membertype"]
         self.name = self.regdata["name"]
     
-    def get_headers(self):
+    def to_json(self) -> dict:
+        """
+        :returns: A dictionary (JSON serializable) from which from_json restores the session
+        """
+        return {"regdata": self.regdata}
+
+    @staticmethod
+    def from_json(data: dict, keep_raw: bool = True) -> 'WebportalSession':
+        return WebportalSession(data, keep_raw)
+
+    def get_headers(self, local_names: LocalNameProvider = LOCAL_NAMES):
         """
+        :param local_names: LocalNameProvider to take the LocalName header from
         :returns: A dictionary with Authorization HTTP headers
         """
         return {
-            "Authorization": f"Bearer {self.token}",
-            "LocalName": generate_local_name()
+            "Authorization": self.authorization,
+            "LocalName": local_names.get()
+        }
+
+class _RequestPipeline:
+    """
+    Request preparation and response handling shared by Webportal and AsyncWebportal
+
+    Encryption, headers, caching, decoding, response checks, retry decisions and RequestEvents are all done here.
+    The two clients only differ in how they wait for the transport, the limiter, backoff and hedges.
+    """
+    PRETOKEN_ENDPOINT = "/token/pretoken-check"
+    TOKEN_ENDPOINT = "/token/generate-token1"
+
+    def __init__(self, transport, local_names: LocalNameProvider, cache: ResponseCache, keep_raw: bool, api: str,
+                 hooks: list, limiter: RateLimiter, singleflight, hedger: Hedger) -> None:
+        self.api = api
+        self.host = urlsplit(api).netloc
+        self.limiter = limiter
+        self.singleflight = singleflight
+        self.hedger = hedger
+        self.hooks = list(hooks) if hooks else []
+        self.keep_raw = keep_raw
+        self.session = None
+        self.username = None
+        self.transport = transport
+        self.local_names = local_names if local_names is not None else LOCAL_NAMES
+        self.cache = cache
+
+    def invalidate_cache(self, endpoint: str = None):
+        """
+        Drops cached responses of the logged in user
+
+        :param endpoint: Only drop entries of this endpoint (all endpoints if None)
+        """
+        if self.cache is not None and self.session is not None:
+            self.cache.invalidate(endpoint, self.session.userid)
+
+    def _emit(self, event: RequestEvent, start: float):
+        event.latency = time.perf_counter() - start
+        for hook in self.hooks:
+            hook(event)
+
+    def _options(self, kwargs: dict):
+        # pops the exception class, and pins the session of authenticated calls
+        exception = kwargs.pop("exception", None) or APIError
+        if kwargs.get("authenticated"):
+            # read once, a login elsewhere can not change the session in the middle of this call
+            kwargs["session"] = self.session
+        return exception
+
+    def _flight_key(self, endpoint: str, exception, kwargs: dict):
+        # None if the call is not coalesced: logins, unauthenticated and account changing calls never are
+        if self.singleflight is None or not kwargs.get("authenticated") or issubclass(exception, FATAL):
+            return None
+        return flight_key(self.api, kwargs["session"].userid, endpoint, kwargs.get("json"))
+
+    def _should_retry(self, error: Exception, endpoint: str, exception, attempt: int, event: RequestEvent) -> bool:
+        event.error = error
+        if self.limiter is None:
+            return False
+        if self.limiter.is_transient(error, event.status):
+            self.limiter.record(self.host, endpoint, False)
+        return self.limiter.should_retry(error, exception, attempt, event.status)
+
+    def _succeeded(self, endpoint: str, event: RequestEvent):
+        if self.limiter is not None and not event.cached:
+            self.limiter.record(self.host, endpoint, True)
+
+    def _hedged(self, endpoint: str, kwargs: dict) -> bool:
+        # only authenticated reads listed by the hedger are hedged, never logins or set_password
+        return self.hedger is not None and bool(kwargs.get("authenticated")) and self.hedger.hedges(endpoint)
+
+    def _hedge_done(self, endpoint: str, event: RequestEvent, start: float):
+        # the latency the caller saw is recorded, so a request which lost to its hedge does not raise the percentile
+        if not event.cached:
+            self.hedger.record(endpoint, time.perf_counter() - start)
+
+    def _prepare(self, endpoint: str, event: RequestEvent, kwargs: dict):
+        """
+        :returns: (session, cached response or None, keyword arguments for the transport)
+        """
+        kwargs = dict(kwargs) # may be sent again on retry
+        session = kwargs.pop("session", None)
+        authenticated = kwargs.pop("authenticated", False)
+        if authenticated and self.cache is not None and self.cache.cacheable(endpoint):
+            resp = self.cache.get(endpoint, kwargs.get("json"), session.userid)
+            if resp is not None:
+                event.cached = True
+                return session, resp, kwargs
+
+        t = time.perf_counter()
+        if kwargs.pop("encrypt", False):
+            kwargs["data"] = serialize_payload(kwargs["data"])
+        event.serialize_time = time.perf_counter() - t
+
+        t = time.perf_counter()
+        if authenticated:
+            header = session.get_headers(self.local_names)
+        else:
+            header = {"LocalName": self.local_names.get()}
+        event.local_name_time = time.perf_counter() - t
+
+        kwargs["headers"] = {**kwargs["headers"], **header} if kwargs.get("headers") else header
+        return session, None, kwargs
+
+    def _receive(self, endpoint: str, event: RequestEvent, exception, response, session, payload) -> dict:
+        """
+        :returns: The decoded response, cached if the endpoint is cacheable
+        :raises exception: Raised if the response is not JSON or the API reported a failure
+        """
+        event.status = response.status_code
+
+        t = time.perf_counter()
+        content = response.content
+        try:
+            resp = json.loads(content)
+        except ValueError:
+            raise exception(f"HTTP {response.status_code}: response is not JSON") from None
+        event.decode_time = time.perf_counter() - t
+        event.response_bytes = len(content)
+
+        event.failed = resp["status"]["responseStatus"] != "Success"
+        check_response(resp, exception)
+
+        if session is not None and self.cache is not None and self.cache.cacheable(endpoint):
+            self.cache.set(endpoint, payload, session.userid, resp)
+
+        return resp
+
+    @staticmethod
+    def _pretoken_payload(username: str, captcha: Captcha) -> dict:
+        return {
+            "username": username,
+            "usertype": "S",
+            "captcha": captcha.payload()
         }
 
-class Webportal:
+    @staticmethod
+    def _token_payload(resp: dict, password: str) -> dict:
+        payload = resp["response"]
+        payload.pop("rejectedData")
+
+        payload['Modulename'] = 'STUDENTMODULE'
+        payload['passwordotpvalue'] = password
+        return payload
+
+
+class Webportal(_RequestPipeline):
     """
     Class which implements the functionality for 
     JIIT Webportal
+
+    A client is thread safe and can be shared by a thread pool, as long as it is used for one account:
+
+    - every call reads the session once, so its token, headers and cache key all belong to the same session
+    - logins are serialized and replace the session with one assignment, calls already running finish with the old one
+    - :code:`ensure_login` logs in only if no other thread has already, so threads which hit SessionExpired
+      together cause a single login
+    - the default RequestsTransport gives every thread its own requests.Session on one shared connection pool
     """
 
-    def __init__(self) -> None:
-        self.session = None
+    def __init__(self, transport: Transport = None, local_names: LocalNameProvider = None, cache: ResponseCache = None,
+                 keep_raw: bool = True, api: str = API, hooks: list = None, limiter: RateLimiter = None,
+                 singleflight: SingleFlight = None, hedger: Hedger = None) -> None:
+        """
+        :param transport: Transport used for HTTP requests (defaults to a pooled RequestsTransport)
+        :param local_names: LocalNameProvider for LocalName headers (defaults to the shared one)
+        :param cache: ResponseCache for slow changing endpoints (no caching if None)
+        :param keep_raw: Keep raw_response on returned models, set to False to save memory
+        :param api: Base URL of the StudentPortalAPI (e.g. of a local FakePortal)
+        :param hooks: A list of callables called with a RequestEvent after every request (e.g. a MetricsRegistry)
+        :param limiter: RateLimiter pacing and retrying requests (e.g. the process wide shared_limiter())
+        :param singleflight: SingleFlight coalescing identical concurrent requests, can be shared by many clients
+        :param hedger: Hedger sending a duplicate of read requests which are slower than usual (no hedging if None)
+        """
+        super().__init__(
+            transport if transport is not None else RequestsTransport(), local_names, cache, keep_raw, api, hooks,
+            limiter, singleflight, hedger
+        )
+        self._login_lock = threading.RLock()
     
     def __str__(self) -> str:
         return "Driver Class for JIIT Webportal"
 
-    def __hit(self, *args, **kwargs):
-        exception = APIError
-
-        if kwargs.get("exception"):
-            exception = kwargs["exception"]
-            kwargs.pop("exception")
-
-        if kwargs.get("authenticated"): 
-            header = self.session.get_headers() # Assumes calling method is authenticated
-            kwargs.pop("authenticated")
-        else:
-            header = {"LocalName": generate_local_name()}
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Closes the underlying transport (and its pooled connections)"""
+        self.transport.close()
+
+    def __hit(self, method, endpoint, **kwargs):
+        exception = self._options(kwargs)
+        key = self._flight_key(endpoint, exception, kwargs)
+        if key is None:
+            return self.__call(method, endpoint, exception, **kwargs)
+
+        ran = False
+        def call():
+            nonlocal ran
+            ran = True
+            return self.__call(method, endpoint, exception, **kwargs)
+
+        # callers which only waited for another one's request get a coalesced event
+        event = RequestEvent(endpoint, method, coalesced=True)
+        start = time.perf_counter()
+        try:
+            return self.singleflight.do(key, call)
+        except Exception as e:
+            event.error = e
+            raise
+        finally:
+            if not ran:
+                self._emit(event, start)
+
+    def __call(self, method, endpoint, exception, **kwargs):
+        attempt = 0
+        while True:
+            event = RequestEvent(endpoint, method)
+            start = time.perf_counter()
+            try:
+                resp = self.__attempt(method, endpoint, event, exception, **kwargs)
+            except Exception as e:
+                if not self._should_retry(e, endpoint, exception, attempt, event):
+                    raise
+            else:
+                self._succeeded(endpoint, event)
+                return resp
+            finally:
+                self._emit(event, start)
+
+            time.sleep(self.limiter.backoff_delay(attempt))
+            attempt += 1
+
+    def __attempt(self, method, endpoint, event, exception, **kwargs):
+        if not self._hedged(endpoint, kwargs):
+            return self.__send(method, endpoint, event, exception, **kwargs)
+
+        def send(hedge):
+            # the duplicate gets its own event, the first request fills the event of the attempt
+            sent = RequestEvent(endpoint, method, hedge=True) if hedge else event
+            start = time.perf_counter()
+            try:
+                return self.__send(method, endpoint, sent, exception, **kwargs)
+            except Exception as e:
+                sent.error = e
+                raise
+            finally:
+                if hedge:
+                    self._emit(sent, start)
+
+        start = time.perf_counter()
+        resp = self.hedger.run(endpoint, send)
+        self._hedge_done(endpoint, event, start)
+        return resp
 
-        if kwargs.get("headers"):
-            kwargs["headers"].update(header)
-        else:
-            kwargs["headers"] = header
-        
+    def __send(self, method, endpoint, event, exception, **kwargs):
+        session, resp, kwargs = self._prepare(endpoint, event, kwargs)
+        if resp is not None:
+            return resp
 
-        resp = requests.request(*args, **kwargs).json()
-        if resp["status"]["responseStatus"] != "Success":
-            raise exception("status:\n"+pformat(resp["status"]))
+        if self.limiter is not None:
+            self.limiter.wait(self.host, endpoint)
 
-        return resp
+        response = self.transport.request(method, self.api+endpoint, **kwargs)
+        return self._receive(endpoint, event, exception, response, session, kwargs.get("json"))
 
 
     def student_login(self, username: str, password: str, captcha: Captcha) -> WebportalSession:
         """
         :param username: A username
         :param password: A password
-        :param captcha: Captcha object
+        :param captcha: Captcha object, or a CaptchaPool to take one from (a rejected captcha is replaced by a fresh one once)
         :returns: WebportalSession object (Also sets the internal session variable to this)
         :raises LoginError: Raised for any error in the remote API while Logging in
         """
-        pretoken_endpoint = "/token/pretoken-check"
-        token_endpoint = "/token/generate-token1"     
+        if isinstance(captcha, CaptchaPool):
+            return self.__pooled_login(username, password, captcha)
 
+        with self._login_lock:
+            session = self.__login(username, password, captcha)
+            # swapped in one assignment, calls running on other threads finish with the session they read
+            self.username = username
+            self.session = session
 
-        payload = {
-            "username": username,
-            "usertype": "S",
-            "captcha": captcha.payload()
-        }
-        payload = serialize_payload(payload)
+        return session
 
-        resp = self.__hit("POST", API+pretoken_endpoint, data=payload, exception=LoginError)
+    def __login(self, username, password, captcha):
+        payload = self._pretoken_payload(username, captcha)
+        resp = self.__hit("POST", self.PRETOKEN_ENDPOINT, data=payload, encrypt=True, exception=LoginError)
 
-        payload = resp["response"]
-        payload.pop("rejectedData")
+        payload = self._token_payload(resp, password)
+        resp = self.__hit("POST", self.TOKEN_ENDPOINT, data=payload, encrypt=True, exception=LoginError)
 
-        payload['Modulename'] = 'STUDENTMODULE'
-        payload['passwordotpvalue'] = password
-        payload = serialize_payload(payload)
+        return WebportalSession(resp['response'], self.keep_raw)
 
-        resp = self.__hit("POST", API+token_endpoint, data=payload, exception=LoginError)
-        
-        self.session = WebportalSession(resp['response'])
+    def ensure_login(self, username: str, password: str, captcha: Captcha, min_ttl: timedelta = timedelta(minutes=1)) -> WebportalSession:
+        """
+        Logs in only if the client has no session of username valid for at least min_ttl.
+        Threads calling it at the same time (e.g. all of them after SessionExpired) wait for a single login
+
+        :param username: A username
+        :param password: A password
+        :param captcha: Captcha object, or a CaptchaPool to take one from
+        :param min_ttl: Sessions expiring sooner than this are replaced
+        :returns: WebportalSession object (Also sets the internal session variable to this)
+        :raises LoginError: Raised for any error in the remote API while Logging in
+        """
+        with self._login_lock:
+            session = self.session
+            if session is not None and self.username == username and session.expiry - datetime.now() > min_ttl:
+                return session
+            return self.student_login(username, password, captcha)
+
+    def __pooled_login(self, username, password, pool):
+        captcha = pool.get(self.get_captcha)
+        try:
+            session = self.student_login(username, password, captcha)
+        except LoginError as e:
+            if not is_captcha_error(e):
+                raise
+            pool.reject(captcha)
+            captcha = pool.get(self.get_captcha)
+            session = self.student_login(username, password, captcha)
+
+        pool.accept(captcha)
+        return session
+
+    def restore_session(self, vault, username: str, password: str = None, captcha: Captcha = None,
+                        min_ttl: timedelta = timedelta(0)) -> WebportalSession:
+        """
+        Restores the session of username from a SessionVault without any network call, and logs in
+        (then stores the new session in the vault) only if there is no session valid for min_ttl
 
-        return self.session
+        :param vault: A SessionVault
+        :param username: A username
+        :param password: A password, needed only if a login is required
+        :param captcha: Captcha object for the login (defaults to pyjiit.default.CAPTCHA)
+        :param min_ttl: Sessions expiring sooner than this are not restored
+        :returns: WebportalSession object (Also sets the internal session variable to this), None if there is
+                  no valid session and no password was given
+        :raises LoginError: Raised for any error in the remote API while Logging in
+        """
+        with self._login_lock:
+            session = vault.load(username, min_ttl, self.keep_raw)
+            if session is not None:
+                self.username = username
+                self.session = session
+                return session
+
+            if password is None:
+                return None
+
+            if captcha is None:
+                from pyjiit.default import CAPTCHA as captcha
+            session = self.student_login(username, password, captcha)
+            vault.save(username, session)
+            return session
 
     def get_captcha(self) -> Captcha:
         """
@@ -144,7 +486,7 @@ class Webportal:
         """
         ENDPOINT = "/token/getcaptcha"
 
-        resp = self.__hit("GET", API+ENDPOINT)
+        resp = self.__hit("GET", ENDPOINT)
 
         return Captcha.from_json(resp["response"])
     
@@ -160,7 +502,7 @@ class Webportal:
                 "instituteid": self.session.instituteid,
                 "studentid": self.session.memberid
         }
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
 
         return resp["response"]
 
@@ -178,9 +520,9 @@ class Webportal:
             "membertype": self.session.membertype
         }
         
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
 
-        return AttendanceMeta(resp["response"])
+        return AttendanceMeta(resp["response"], self.keep_raw)
 
     @authenticated
     def get_attendance(self, header: AttendanceHeader, semester: Semester):
@@ -200,10 +542,32 @@ class Webportal:
             "stynumber": header.stynumber
         }
         
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
         
         return resp["response"]
 
+    @authenticated
+    def get_attendance_detail(self, header: AttendanceHeader, semester: Semester) -> AttendanceDetail:
+        """
+        :param header: An AttendanceHeader object
+        :param semester: A Semester object
+        :returns: AttendanceDetail object (same data as get_attendance, parsed lazily into compact columns)
+        :raises APIError: Raised for generic API error
+        """
+        return AttendanceDetail(self.get_attendance(header, semester), self.keep_raw)
+
+    @authenticated
+    def get_attendance_changes(self, header: AttendanceHeader, semester: Semester, tracker: AttendanceTracker) -> list:
+        """
+        :param header: An AttendanceHeader object
+        :param semester: A Semester object
+        :param tracker: AttendanceTracker holding the previous snapshot of this student and semester
+        :returns: A list of AttendanceChange since the previous call (empty if nothing changed)
+        :raises APIError: Raised for generic API error
+        """
+        resp = self.get_attendance(header, semester)
+        return tracker.update(self.session.userid, semester.registration_id, resp)
+
     @authenticated
     def set_password(self, old_pswd: str, new_pswd: str):
         """
@@ -220,7 +584,7 @@ class Webportal:
             "confirmpassword": new_pswd
         }
 
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True, exception=AccountAPIError)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True, exception=AccountAPIError)
 
     
     @authenticated
@@ -236,7 +600,7 @@ class Webportal:
             "studentid": self.session.memberid
         }
 
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
         
         return [Semester.from_json(i) for i in resp["response"]["registrations"]]
 
@@ -255,9 +619,9 @@ class Webportal:
             "registrationid": semester.registration_id
         }
 
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
 
-        return Registrations(resp["response"])
+        return Registrations(resp["response"], self.keep_raw)
 
     
     @authenticated
@@ -274,7 +638,7 @@ class Webportal:
             "memberid": self.session.memberid
         }
         
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
 
         return [Semester.from_json(i) for i in resp["response"]["semesterCodeinfo"]["semestercode"]]
 
@@ -292,7 +656,7 @@ class Webportal:
             "registationid": semester.registration_id # not a typo
         }
 
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
 
         return [ExamEvent.from_json(i) for i in resp["response"]["eventcode"]["examevent"]]
 
@@ -311,6 +675,94 @@ class Webportal:
             "exameventid": exam_event.exam_event_id
         }
 
-        resp = self.__hit("POST", API+ENDPOINT, json=payload, authenticated=True)
+        resp = self.__hit("POST", ENDPOINT, json=payload, authenticated=True)
 
         return resp["response"]
+
+    @authenticated
+    def get_all_attendance(self, header: AttendanceHeader = None, max_workers: int = 4) -> FanOutResult:
+        """
+        :param header: An AttendanceHeader object (defaults to the latest header)
+        :param max_workers: Maximum number of concurrent requests
+        :returns: A FanOutResult of registration code -> attendance data for every semester
+        :raises APIError: Raised for generic API error while getting the attendance meta
+        """
+        meta = self.get_attendance_meta()
+        if header is None:
+            header = meta.latest_header()
+
+        return fan_out(
+            lambda semester: self.get_attendance(header, semester),
+            meta.semesters,
+            lambda semester: semester.registration_code,
+            max_workers
+        )
+
+    @authenticated
+    def get_all_exam_schedules(self, max_workers: int = 4) -> FanOutResult:
+        """
+        :param max_workers: Maximum number of concurrent requests
+        :returns: A FanOutResult of registration code -> {exam event code: exam schedule data}.
+                  Errors are keyed by registration code if the events could not be fetched,
+                  or by (registration code, exam event code) if one schedule could not be fetched
+        :raises APIError: Raised for generic API error while getting the semesters
+        """
+        semesters = self.get_semesters_for_exam_events()
+
+        events = fan_out(self.get_exam_events, semesters, lambda semester: semester.registration_code, max_workers)
+        schedules = fan_out(
+            lambda pair: self.get_exam_schedule(pair[1]),
+            [(code, event) for code, semester_events in events.results.items() for event in semester_events],
+            lambda pair: (pair[0], pair[1].exam_event_code),
+            max_workers
+        )
+
+        result = FanOutResult(errors=events.errors)
+        for code in events.results:
+            result.results[code] = {}
+        for (code, event_code), schedule in schedules.results.items():
+            result.results[code][event_code] = schedule
+        result.errors.update(schedules.errors)
+
+        return result
+
+    @authenticated
+    def get_exam_schedule_entries(self, exam_event: ExamEvent) -> list:
+        """
+        :param exam_event: An ExamEvent object
+        :returns: A list of ExamScheduleEntry, one per subject
+        :raises APIError: Raised for generic API error
+        """
+        return ExamScheduleEntry.list_from_json(self.get_exam_schedule(exam_event), exam_event)
+
+    @authenticated
+    def get_exam_index(self, max_workers: int = 4, index: ExamScheduleIndex = None) -> ExamScheduleIndex:
+        """
+        :param max_workers: Maximum number of concurrent requests
+        :param index: An ExamScheduleIndex to update (a new one if None)
+        :returns: index with the schedules of every exam event of every semester.
+                  Events which could not be fetched keep their previous entries, the errors are in index.errors
+                  keyed like in get_all_exam_schedules
+        :raises APIError: Raised for generic API error while getting the semesters
+        """
+        if index is None:
+            index = ExamScheduleIndex()
+
+        semesters = self.get_semesters_for_exam_events()
+
+        events = fan_out(self.get_exam_events, semesters, lambda semester: semester.registration_code, max_workers)
+        pairs = [(code, event) for code, semester_events in events.results.items() for event in semester_events]
+        entries = fan_out(
+            lambda pair: self.get_exam_schedule_entries(pair[1]),
+            pairs,
+            lambda pair: (pair[0], pair[1].exam_event_code),
+            max_workers
+        )
+
+        for code, event in pairs:
+            key = (code, event.exam_event_code)
+            if key in entries.results:
+                index.update(event, entries.results[key])
+
+        index.errors = {**events.errors, **entries.errors}
+        return index
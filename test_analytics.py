@@ -0,0 +1,147 @@
+import math
+import random
+
+import pytest
+
+from pyjiit.analytics import ALL, AttendanceTable
+from pyjiit.attendance import COMPONENTS
+
+
+@pytest.fixture(params=["numpy", "array"])
+def use_numpy(request):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    return request.param == "numpy"
+
+
+def detail(*subjects):
+    """An attendance detail response of subjects given as (code, {component: (attended, total)})"""
+    rows = []
+    for slno, (code, components) in enumerate(subjects, 1):
+        row = {"slno": slno, "subjectcode": f"SUBJECT({code})", "individualsubjectcode": code, "subjectid": code}
+        for c, (attended, total) in components.items():
+            row.update({c + "totalclass": total, c + "totalpres": attended, c + "subjectcomponentcode": c})
+        rows.append(row)
+    return {"currentSem": "1", "studentattendancelist": rows}
+
+
+def brute_required(a, t, p):
+    x = 0
+    while t + x == 0 or (a + x) / (t + x) < p:
+        x += 1
+    return x
+
+
+def brute_skippable(a, t, p):
+    y = 0
+    while a / (t + y + 1) >= p:
+        y += 1
+    return y
+
+
+def test_rows(use_numpy):
+    table = AttendanceTable.from_details({
+        "a": detail(("X1", {"L": (6, 10), "T": (3, 4)}), ("X2", {"P": (9, 10)})),
+        "b": detail(("X2", {"P": (0, 0)})),
+    }, use_numpy)
+    assert len(table) == 4
+    assert table.students == ["a", "b"]
+    assert table.subjects == ["X1", "X2"]
+    assert list(table.component) == [COMPONENTS.index("L"), COMPONENTS.index("T"), COMPONENTS.index("P"),
+                                      COMPONENTS.index("P")]
+
+    percentages = list(table.percentages())
+    assert percentages[:3] == [60.0, 75.0, 90.0]
+    assert math.isnan(percentages[3])
+    assert list(table.required(75)) == [6, 0, 0, 0]
+    assert list(table.skippable(75)) == [0, 0, 2, 0]
+    assert table.below(75) == [0]
+    assert table.below(75, margin=1) == [0, 1]
+
+
+@pytest.mark.parametrize("threshold", [50.0, 66.0, 75.0, 80.0, 90.0])
+def test_matches_brute_force(use_numpy, threshold):
+    rng = random.Random(threshold)
+    subjects = [(f"S{i}", {"L": (a, t)}) for i in range(200) for t in [rng.randint(1, 40)] for a in [rng.randint(0, t)]]
+    table = AttendanceTable.from_details({"a": detail(*subjects)}, use_numpy)
+
+    p = threshold / 100
+    assert list(table.required(threshold)) == [brute_required(a, t, p) for _, c in subjects for a, t in c.values()]
+    assert list(table.skippable(threshold)) == [brute_skippable(a, t, p) for _, c in subjects for a, t in c.values()]
+
+
+def test_edge_thresholds(use_numpy):
+    table = AttendanceTable.from_details({"a": detail(("X1", {"L": (10, 10), "T": (9, 10)}))}, use_numpy)
+    assert list(table.required(100)) == [0, math.inf]
+    assert list(table.skippable(0)) == [math.inf, math.inf]
+
+
+def test_alerts(use_numpy):
+    table = AttendanceTable.from_details({
+        "a": detail(("X1", {"L": (6, 10), "T": (4, 4)})),
+        "b": detail(("X1", {"L": (7, 10)})),
+    }, use_numpy)
+    alerts = table.alerts(75)
+    assert [(a.student, a.subject_code, a.component, a.attended, a.total, a.required) for a in alerts] == [
+        ("a", "X1", "L", 6.0, 10.0, 6),
+        ("b", "X1", "L", 7.0, 10.0, 2),
+    ]
+    assert alerts[0].percentage == 60.0
+    assert table.alerts(50) == []
+
+
+def test_combined(use_numpy):
+    table = AttendanceTable.from_details({
+        "a": detail(("X1", {"L": (6, 10), "T": (3, 4)}), ("X2", {"P": (9, 10)})),
+        "b": detail(("X1", {"L": (1, 2), "P": (2, 2)})),
+    }, use_numpy)
+    combined = table.combined()
+    rows = [(combined.students[s], combined.subjects[j], a, t)
+            for s, j, a, t in zip(combined.student, combined.subject, combined.attended, combined.total)]
+    assert rows == [("a", "X1", 9.0, 14.0), ("a", "X2", 9.0, 10.0), ("b", "X1", 3.0, 4.0)]
+    assert set(combined.component) == {ALL}
+    assert [a.component for a in combined.alerts(75)] == ["ALL"]
+
+
+def test_add_after_columns(use_numpy):
+    table = AttendanceTable(use_numpy)
+    table.add("a", detail(("X1", {"L": (6, 10)})))
+    attended, total = table.columns()
+    percentages = table.percentages()
+
+    # columns are copies, so the table can grow while they are alive
+    table.add("b", detail(("X1", {"L": (9, 10)})))
+    attended[0] = 0
+    assert list(table.attended) == [6.0, 9.0]
+    assert len(total) == len(percentages) == 1
+    assert list(table.percentages()) == [60.0, 90.0]
+
+
+def test_backends_agree():
+    pytest.importorskip("numpy")
+    details = {"a": detail(*[(f"S{i}", {"L": (i % 7, 10), "P": (i % 3, 4)}) for i in range(30)])}
+    fast, slow = AttendanceTable.from_details(details), AttendanceTable.from_details(details, use_numpy=False)
+    for name in ["percentages", "required", "skippable"]:
+        assert list(getattr(fast, name)()) == list(getattr(slow, name)())
+    assert fast.alerts(75, margin=5) == slow.alerts(75, margin=5)
+    assert list(fast.combined().total) == list(slow.combined().total)
+
+
+def test_alerts_unreachable(use_numpy):
+    # at 100% a missed class can never be made up
+    table = AttendanceTable.from_details({"a": detail(("X1", {"L": (9, 10), "T": (4, 4)}))}, use_numpy)
+    alerts = table.alerts(100)
+    assert [(a.component, a.required) for a in alerts] == [("L", math.inf)]
+    assert [a.required for a in table.combined().alerts(100)] == [math.inf]
+
+
+def test_combined_keeps_backend(monkeypatch):
+    table = AttendanceTable.from_details({"a": detail(("X1", {"L": (6, 10)}))}, use_numpy=False)
+
+    def no_numpy():
+        raise AssertionError("NumPy imported")
+
+    monkeypatch.setattr("pyjiit.analytics._numpy", no_numpy)
+    combined = table.combined()
+    assert combined.np is None
+    assert list(combined.total) == [10.0]
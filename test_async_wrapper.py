@@ -0,0 +1,143 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+from pyjiit.async_wrapper import AsyncWebportal
+from pyjiit.cache import ResponseCache
+from pyjiit.captcha import CaptchaPool
+from pyjiit.default import CAPTCHA
+from pyjiit.exceptions import APIError, LoginError, NotLoggedIn, SessionExpired
+from pyjiit.fakeportal import FakePortal
+from pyjiit.ratelimit import RateLimiter
+from pyjiit.wrapper import Webportal
+
+
+BANK = "/studentbankdetails/getstudentbankinfo"
+
+
+def run(portal, coro, **options):
+    """Runs coro(client) with an AsyncWebportal of portal logged in as user, returns its result"""
+    async def main():
+        w = AsyncWebportal(portal.async_transport(), api=portal.url, **options)
+        await w.student_login("user", "password", CAPTCHA)
+        return await coro(w)
+    return asyncio.run(main())
+
+
+def test_matches_sync_client(portal, client):
+    async def read(w):
+        meta = await w.get_attendance_meta()
+        sem = (await w.get_registered_semesters())[0]
+        events = await w.get_exam_events((await w.get_semesters_for_exam_events())[0])
+        return (
+            await w.get_student_bank_info(),
+            (await w.get_attendance_detail(meta.latest_header(), meta.semesters[0])).subject_codes,
+            (await w.get_registered_subjects_and_faculties(sem)).total_credits,
+            await w.get_exam_schedule(events[0]),
+        )
+
+    meta = client.get_attendance_meta()
+    sem = client.get_registered_semesters()[0]
+    events = client.get_exam_events(client.get_semesters_for_exam_events()[0])
+    assert run(portal, read) == (
+        client.get_student_bank_info(),
+        client.get_attendance_detail(meta.latest_header(), meta.semesters[0]).subject_codes,
+        client.get_registered_subjects_and_faculties(sem).total_credits,
+        client.get_exam_schedule(events[0]),
+    )
+
+
+def test_login_errors(portal):
+    async def main():
+        w = AsyncWebportal(portal.async_transport(), api=portal.url)
+        with pytest.raises(NotLoggedIn):
+            await w.get_student_bank_info()
+        with pytest.raises(LoginError):
+            await w.student_login("user", "wrong", CAPTCHA)
+        assert w.session is None
+
+    asyncio.run(main())
+
+
+def test_session_expired():
+    portal = FakePortal(token_ttl=60)
+
+    async def expire(w):
+        w.session.expiry = datetime.now() - timedelta(seconds=1)
+        with pytest.raises(SessionExpired):
+            await w.get_student_bank_info()
+
+    run(portal, expire)
+
+
+def test_same_events_as_sync_client(portal):
+    sync_events, async_events = [], []
+    w = Webportal(portal.transport(), api=portal.url, hooks=[sync_events.append])
+    w.student_login("user", "password", CAPTCHA)
+    w.get_student_bank_info()
+
+    async def read(w):
+        await w.get_student_bank_info()
+    run(portal, read, hooks=[async_events.append])
+
+    def fields(e):
+        return e.endpoint, e.method, e.status, e.failed, e.cached, e.response_bytes > 0, e.serialize_time >= 0
+    assert [fields(e) for e in async_events] == [fields(e) for e in sync_events]
+
+
+def test_cache(portal):
+    cache = ResponseCache()
+
+    async def read(w):
+        first = await w.get_student_bank_info()
+        before = portal.requests
+        second = await w.get_student_bank_info()
+        hits = portal.requests - before
+        w.invalidate_cache(BANK)
+        await w.get_student_bank_info()
+        return first, second, hits, portal.requests - before
+
+    first, second, hits, after = run(portal, read, cache=cache)
+    assert first == second
+    assert hits == 0
+    assert after == 1
+
+
+def test_retries_transient_errors():
+    portal = FakePortal(error_rate={BANK: 1.0})
+    limiter = RateLimiter(host_rate=1000, endpoint_rate=1000, retries=2, backoff=0.001, max_backoff=0.001)
+
+    async def read(w):
+        before = portal.requests
+        with pytest.raises(APIError):
+            await w.get_student_bank_info()
+        return portal.requests - before
+
+    assert run(portal, read, limiter=limiter) == 3
+
+
+def test_pooled_login_replaces_a_rejected_captcha(portal):
+    portal.captchas = {} # only captchas it issued are accepted
+    pool = CaptchaPool(known=[CAPTCHA], solver=lambda c: base64.b64decode(c.image).decode(), background=False)
+
+    async def main():
+        w = AsyncWebportal(portal.async_transport(), api=portal.url)
+        return await w.student_login("user", "password", pool)
+
+    assert asyncio.run(main()) is not None
+    assert CAPTCHA not in pool._known
+    assert len(pool._known) == 1
+
+
+def test_pooled_login_without_solver(portal):
+    portal.captchas = {}
+    pool = CaptchaPool(known=[CAPTCHA], background=False)
+
+    async def main():
+        w = AsyncWebportal(portal.async_transport(), api=portal.url)
+        with pytest.raises(LookupError):
+            await w.student_login("user", "password", pool)
+
+    asyncio.run(main())
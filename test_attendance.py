@@ -0,0 +1,108 @@
+from array import array
+import math
+
+import pytest
+
+from pyjiit.attendance import COMPONENTS, AttendanceDetail
+from pyjiit.default import CAPTCHA
+from pyjiit.wrapper import Webportal
+
+
+RESPONSE = {
+    "currentSem": "2",
+    "studentattendancelist": [
+        {
+            "slno": 1, "individualsubjectcode": "15B11CI111", "subjectcode": "SOFTWARE DEVELOPMENT(15B11CI111)",
+            "subjectid": "S1", "LTpercantage": 80.0,
+            "Ltotalclass": 20, "Ltotalpres": 16, "Lpercentage": 80.0,
+            "Ttotalclass": 10, "Ttotalpres": 8, "Tpercentage": 80.0,
+        },
+        {
+            "slno": 2, "individualsubjectcode": "15B17CI171", "subjectcode": "SOFTWARE DEVELOPMENT LAB(15B17CI171)",
+            "subjectid": "S2", "LTpercantage": "",
+            "Ptotalclass": 12, "Ptotalpres": 9, "Ppercentage": 75.0,
+        },
+    ],
+}
+
+
+class Rows(list):
+    """A list counting how often it was iterated, to see when the response is parsed"""
+    def __init__(self, rows) -> None:
+        super().__init__(rows)
+        self.reads = 0
+
+    def __iter__(self):
+        self.reads += 1
+        return super().__iter__()
+
+
+def test_parsed_lazily_once():
+    rows = Rows(RESPONSE["studentattendancelist"])
+    detail = AttendanceDetail({**RESPONSE, "studentattendancelist": rows})
+    assert rows.reads == 0
+
+    assert detail.subject_codes == ["15B11CI111", "15B17CI171"]
+    reads = rows.reads
+    assert reads > 0
+    detail.total, detail.attended, list(detail), detail.current_sem
+    assert rows.reads == reads
+
+
+def test_columns():
+    detail = AttendanceDetail(RESPONSE)
+    assert len(detail) == 2
+    assert detail.current_sem == "2"
+    assert set(detail.attended) == set(detail.total) == set(detail.percentage) == set(COMPONENTS)
+    for columns in [detail.attended, detail.total, detail.percentage]:
+        assert all(isinstance(c, array) and c.typecode == "d" and len(c) == 2 for c in columns.values())
+    assert isinstance(detail.overall_percentage, array)
+
+    assert list(detail.total["L"])[0] == 20.0
+    assert list(detail.attended["P"])[1] == 9.0
+
+
+def test_missing_components_are_nan():
+    detail = AttendanceDetail(RESPONSE)
+    assert math.isnan(detail.total["P"][0])
+    assert math.isnan(detail.attended["L"][1])
+    assert math.isnan(detail.total["T"][1])
+    assert math.isnan(detail.overall_percentage[1]) # an empty string
+
+    lab = detail.subject("15B17CI171")
+    assert lab.attended == {"P": 9.0}
+    assert lab.total == {"P": 12.0}
+    assert detail[0].percentage == {"L": 80.0, "T": 80.0}
+    with pytest.raises(KeyError):
+        detail.subject("NOPE")
+
+
+def test_keep_raw():
+    kept = AttendanceDetail(RESPONSE)
+    kept.subject_codes
+    assert kept.raw_response is RESPONSE
+
+    dropped = AttendanceDetail(RESPONSE, keep_raw=False)
+    assert dropped.raw_response is RESPONSE # until it is parsed
+    dropped.subject_codes
+    assert dropped.raw_response is None
+    assert [s.total for s in dropped] == [s.total for s in kept]
+
+
+def test_interned_strings():
+    copy = {**RESPONSE, "studentattendancelist": [
+        {k: "".join(v) if isinstance(v, str) else v for k, v in row.items()} for row in RESPONSE["studentattendancelist"]
+    ]}
+    first, second = AttendanceDetail(RESPONSE), AttendanceDetail(copy)
+    assert all(a is b for a, b in zip(first.subject_descs, second.subject_descs))
+
+
+def test_from_client(portal):
+    w = Webportal(portal.transport(), api=portal.url, keep_raw=False)
+    w.student_login("user", "password", CAPTCHA)
+    meta = w.get_attendance_meta()
+    detail = w.get_attendance_detail(meta.latest_header(), meta.semesters[0])
+    raw = w.get_attendance(meta.latest_header(), meta.semesters[0])
+
+    assert detail.subject_codes == [row["individualsubjectcode"] for row in raw["studentattendancelist"]]
+    assert detail.raw_response is None
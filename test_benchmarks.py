@@ -0,0 +1,22 @@
+from benchmarks.harness import best, compare
+
+
+def result(value, higher_is_better=False):
+    return {"value": value, "unit": "us", "higher_is_better": higher_is_better}
+
+
+def test_best_of_runs():
+    runs = [{"call": result(12.0), "rate": result(90.0, True)}, {"call": result(10.0), "rate": result(80.0, True)},
+            {"call": result(11.0), "new": result(1.0)}]
+    merged = best(runs)
+    assert {name: r["value"] for name, r in merged.items()} == {"call": 10.0, "rate": 90.0, "new": 1.0}
+    assert runs[0]["call"]["value"] == 12.0
+
+
+def test_compare_tolerance():
+    baseline = {"call": result(10.0), "rate": result(100.0, True), "gone": result(1.0)}
+    assert compare({"call": result(12.9), "rate": result(71.0, True), "new": result(99.0)}, baseline, 0.3) == []
+    assert compare({"call": result(13.1), "rate": result(69.0, True)}, baseline, 0.3) == [
+        "call: 10.00 -> 13.10 us",
+        "rate: 100.00 -> 69.00 us",
+    ]
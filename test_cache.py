@@ -0,0 +1,133 @@
+import pytest
+
+from pyjiit.cache import DAY, ResponseCache
+from pyjiit.default import CAPTCHA
+from pyjiit.wrapper import Webportal
+
+
+BANK = "/studentbankdetails/getstudentbankinfo"
+REGISTRATIONS = "/reqsubfaculty/getregistrationList"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("pyjiit.cache.time", clock)
+    return clock
+
+
+def login(portal, cache, username: str = "user") -> Webportal:
+    w = Webportal(portal.transport(), api=portal.url, cache=cache)
+    w.student_login(username, "password", CAPTCHA)
+    return w
+
+
+def test_hit_sends_no_request(portal):
+    w = login(portal, ResponseCache())
+    first = w.get_student_bank_info()
+    before = portal.requests
+    assert w.get_student_bank_info() == first
+    assert [s.registration_id for s in w.get_registered_semesters()]
+    assert portal.requests == before + 1 # only the registrations, which were not cached yet
+    w.get_registered_semesters()
+    assert portal.requests == before + 1
+
+
+def test_other_endpoints_are_not_cached(portal):
+    w = login(portal, ResponseCache())
+    meta = w.get_attendance_meta()
+    before = portal.requests
+    w.get_attendance(meta.latest_header(), meta.semesters[0])
+    w.get_attendance(meta.latest_header(), meta.semesters[0])
+    assert portal.requests == before + 2
+
+
+def test_ttl_expiry(portal, clock):
+    cache = ResponseCache(ttls={BANK: 60})
+    w = login(portal, cache)
+    w.get_student_bank_info()
+    before = portal.requests
+
+    clock.now += 59
+    w.get_student_bank_info()
+    assert portal.requests == before
+
+    clock.now += 2
+    w.get_student_bank_info()
+    assert portal.requests == before + 1
+
+
+def test_persists_across_reopen(portal, tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path)
+    expected = login(portal, cache).get_student_bank_info()
+    cache.close()
+
+    cache = ResponseCache(path)
+    w = login(portal, cache)
+    before = portal.requests
+    assert w.get_student_bank_info() == expected
+    assert portal.requests == before
+    cache.close()
+
+    # expired rows are dropped when the file is opened
+    clock.now += 8 * DAY
+    cache = ResponseCache(path)
+    assert cache.get(BANK, None, "x") is None
+    assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+    cache.close()
+
+
+def test_invalidate_cache_forces_a_fetch(portal):
+    w = login(portal, ResponseCache())
+    w.get_student_bank_info()
+    w.get_registered_semesters()
+    before = portal.requests
+
+    w.invalidate_cache(BANK)
+    w.get_student_bank_info()
+    w.get_registered_semesters()
+    assert portal.requests == before + 1
+
+    w.invalidate_cache()
+    w.get_registered_semesters()
+    assert portal.requests == before + 2
+
+
+def test_users_do_not_share_entries(portal):
+    cache = ResponseCache()
+    a, b = login(portal, cache, "user1"), login(portal, cache, "user2")
+    first = a.get_student_bank_info()
+    before = portal.requests
+    assert b.get_student_bank_info() != first
+    assert portal.requests == before + 1
+
+    # invalidating one user keeps the other's entries
+    b.invalidate_cache()
+    a.get_student_bank_info()
+    assert portal.requests == before + 1
+
+
+def test_returned_responses_are_copies():
+    cache = ResponseCache()
+    cache.set(BANK, {"a": 1}, "user", {"response": {"bank": "A"}})
+    cache.get(BANK, {"a": 1}, "user")["response"]["bank"] = "changed"
+    assert cache.get(BANK, {"a": 1}, "user") == {"response": {"bank": "A"}}
+    assert cache.get(BANK, {"a": 2}, "user") is None
+
+
+def test_lru_keeps_max_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_entries=2)
+    for i in range(5):
+        cache.set(REGISTRATIONS, i, "user", {"i": i})
+    assert len(cache) == 2
+    assert cache.get(REGISTRATIONS, 0, "user") == {"i": 0} # evicted from memory, read back from the file
+    cache.close()
@@ -0,0 +1,126 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from pyjiit.captcha import CaptchaPool, is_captcha_error
+from pyjiit.default import CAPTCHA
+from pyjiit.exceptions import APIError, LoginError
+from pyjiit.token import Captcha
+from pyjiit.wrapper import Webportal
+
+
+def solver(captcha: Captcha) -> str:
+    # FakePortal's captcha image is its answer in base64
+    return base64.b64decode(captcha.image).decode()
+
+
+@pytest.fixture
+def strict_portal(portal):
+    portal.captchas = {} # only captchas it issued are accepted
+    return portal
+
+
+def login_error(portal, password: str = "password", captcha: Captcha = CAPTCHA) -> LoginError:
+    w = Webportal(portal.transport(), api=portal.url)
+    with pytest.raises(LoginError) as info:
+        w.student_login("user", password, captcha)
+    return info.value
+
+
+def test_rejected_captcha_is_a_captcha_error(strict_portal):
+    assert is_captcha_error(login_error(strict_portal))
+
+
+def test_other_login_failures_are_not(portal):
+    assert not is_captcha_error(login_error(portal, password="wrong"))
+
+
+def test_only_the_exact_message_matches():
+    def error(*messages):
+        e = LoginError("status")
+        e.status = {"responseStatus": "Failure", "errors": list(messages)}
+        return e
+
+    assert is_captcha_error(error("Invalid Captcha"))
+    assert is_captcha_error(error(" invalid captcha "))
+    assert not is_captcha_error(error("Captcha service is down, wrong password"))
+    assert not is_captcha_error(error())
+    assert not is_captcha_error(LoginError("Invalid Captcha")) # no status from the portal
+    assert not is_captcha_error(APIError("captcha"))
+
+
+def test_pool_replaces_a_rejected_captcha(strict_portal):
+    w = Webportal(strict_portal.transport(), api=strict_portal.url)
+    pool = CaptchaPool(known=[CAPTCHA], solver=solver, background=False)
+    assert w.student_login("user", "password", pool) is not None
+    assert CAPTCHA not in pool._known
+    assert len(pool._known) == 1
+
+
+def test_pool_does_not_retry_a_wrong_password(strict_portal):
+    fetched = []
+    w = Webportal(strict_portal.transport(), api=strict_portal.url)
+    known = w.get_captcha()
+    known.captcha = solver(known)
+    pool = CaptchaPool(known=[known], fetch=lambda: fetched.append(1) or w.get_captcha(), solver=solver, background=False, size=0)
+
+    with pytest.raises(LoginError):
+        w.student_login("user", "wrong", pool)
+    assert fetched == []
+    assert pool._known == [known]
+
+
+def test_concurrent_fills_stay_within_size():
+    count = []
+    def fetch():
+        count.append(1)
+        time.sleep(0.05)
+        return Captcha("", f"hidden{len(count)}", "")
+
+    pool = CaptchaPool(known=[], fetch=fetch, solver=lambda c: "answer", size=4, background=False)
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: pool.fill(), range(8)))
+    assert len(count) == 4
+    assert len(pool._fresh) == 4
+    assert pool._fetching == 0
+
+
+def test_failed_fetch_releases_its_slot():
+    def fetch():
+        raise APIError("portal down")
+
+    pool = CaptchaPool(known=[], fetch=fetch, solver=lambda c: "answer", size=2, background=False)
+    with pytest.raises(APIError):
+        pool.fill()
+    assert pool._fetching == 0
+
+
+def test_ready_never_fetches_without_background():
+    fetched = []
+    pool = CaptchaPool(known=[CAPTCHA], fetch=lambda: fetched.append(1) or Captcha("", "h", ""), solver=lambda c: "a",
+                       size=2, background=False)
+    assert pool.ready() is CAPTCHA
+    pool.reject(CAPTCHA)
+    assert pool.ready() is None
+    assert fetched == []
+
+    pool.fill()
+    assert len(fetched) == 2
+    assert pool.ready() is not None
+
+
+def test_ready_refills_in_background():
+    fetching = threading.Event()
+    release = threading.Event()
+    def fetch():
+        fetching.set()
+        release.wait(5)
+        return Captcha("", "h", "")
+
+    pool = CaptchaPool(known=[CAPTCHA], fetch=fetch, solver=lambda c: "a", size=1)
+    assert pool.ready() is CAPTCHA # returns at once, the fetch runs on the refill thread
+    assert fetching.wait(5)
+    release.set()
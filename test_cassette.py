@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from pyjiit.async_wrapper import AsyncWebportal
+from pyjiit.cassette import (
+    REDACTED, REDACTED_TOKEN, AsyncRecordingTransport, AsyncReplayTransport, Cassette, RecordingTransport,
+    ReplayTransport, _canonical, _redact, read_cassette,
+)
+from pyjiit.default import CAPTCHA
+from pyjiit.fakeportal import FakePortal
+from pyjiit.wrapper import Webportal
+
+
+PASSWORD = "s3cret-Pa55"
+
+
+def record(portal, path, password=PASSWORD):
+    # logs in and reads the registered subjects of the first semester, recording everything
+    with Cassette(path) as cassette:
+        w = Webportal(RecordingTransport(portal.transport(), cassette), api=portal.url)
+        w.student_login("user", password, CAPTCHA)
+        sem = w.get_registered_semesters()[0]
+        subjects = w.get_registered_subjects_and_faculties(sem)
+        w.set_password(password, "n3w-Pa55")
+    return w, sem, subjects
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "traffic.cassette")
+    portal = FakePortal(accounts={"user": PASSWORD})
+    _, sem, subjects = record(portal, path)
+    exchanges = list(read_cassette(path))
+    assert [e.endpoint for e in exchanges[:3]] == ["/token/pretoken-check", "/token/generate-token1",
+                                                 "/reqsubfaculty/getregistrationList"]
+    assert len(exchanges) == portal.requests
+
+    w = Webportal(ReplayTransport(path), api=portal.url)
+    w.student_login("user", PASSWORD, CAPTCHA)
+    assert w.get_registered_semesters()[0].registration_id == sem.registration_id
+    assert w.get_registered_subjects_and_faculties(sem).total_credits == subjects.total_credits
+
+
+def test_no_secrets_written(tmp_path):
+    path = str(tmp_path / "traffic.cassette")
+    portal = FakePortal(accounts={"user": PASSWORD})
+    w, _, _ = record(portal, path)
+
+    dump = "".join(json.dumps(e.payload) + e.content.decode() for e in read_cassette(path))
+    assert PASSWORD not in dump
+    assert "n3w-Pa55" not in dump
+    assert w.session.token not in dump
+
+    login = next(e for e in read_cassette(path) if e.endpoint == "/token/generate-token1")
+    assert login.payload["passwordotpvalue"] == REDACTED
+    assert json.loads(login.content)["response"]["regdata"]["token"] == REDACTED_TOKEN
+    change = next(e for e in read_cassette(path) if e.endpoint == "/clxuser/changepassword")
+    assert change.payload["oldpassword"] == change.payload["newpassword"] == REDACTED
+
+
+def test_redacted_token_parses():
+    claims = json.loads(base64.b64decode(REDACTED_TOKEN.split(".")[1]))
+    assert claims["exp"] > 2_000_000_000
+
+
+def test_replay_matches_login_by_key(tmp_path):
+    # a login with another password still gets the recorded answer, not a round robin pick
+    path = str(tmp_path / "traffic.cassette")
+    record(FakePortal(accounts={"user": PASSWORD}), path)
+    replay = ReplayTransport(path)
+    w = Webportal(replay, api="http://replay/StudentPortalAPI")
+    w.student_login("user", "another password", CAPTCHA)
+    assert w.session.token == REDACTED_TOKEN
+    assert replay.missed == 0
+
+
+def test_old_cassettes_match_by_key(tmp_path):
+    # exchanges recorded before redaction hold the real password, they are matched like redacted ones
+    path = str(tmp_path / "traffic.cassette")
+    record(FakePortal(accounts={"user": PASSWORD}), path)
+    exchanges = list(read_cassette(path))
+    login = next(e for e in exchanges if e.endpoint == "/token/generate-token1")
+    login.payload["passwordotpvalue"] = PASSWORD
+    replay = ReplayTransport(exchanges)
+    payload = dict(login.payload, passwordotpvalue="another password")
+    assert replay._pick("POST", "http://replay/StudentPortalAPI/token/generate-token1", {"json": payload}) is login
+    assert ("POST", "/token/generate-token1", _canonical(_redact(payload))) in replay._exact
+
+
+def test_truncated_cassette(tmp_path):
+    path = str(tmp_path / "traffic.cassette")
+    record(FakePortal(accounts={"user": PASSWORD}), path)
+    count = len(list(read_cassette(path)))
+    with open(path, "r+b") as f:
+        f.seek(-5, 2)
+        f.truncate()
+    assert len(list(read_cassette(path))) == count - 1
+
+
+def test_append_to_existing(tmp_path):
+    path = str(tmp_path / "traffic.cassette")
+    record(FakePortal(accounts={"user": PASSWORD}), path)
+    count = len(list(read_cassette(path)))
+    record(FakePortal(accounts={"user": PASSWORD}), path)
+    assert len(list(read_cassette(path))) == 2 * count
+
+
+def test_not_recorded(tmp_path):
+    path = str(tmp_path / "traffic.cassette")
+    record(FakePortal(accounts={"user": PASSWORD}), path)
+    replay = ReplayTransport(path)
+    resp = replay.request("POST", "http://replay/StudentPortalAPI/studentbankdetails/getstudentbankinfo", json={})
+    assert resp.status_code == 404
+    assert replay.missed == 1
+
+
+def test_async_round_trip(tmp_path):
+    pytest.importorskip("aiohttp")
+    from pyjiit.transport import AiohttpTransport
+
+    path = str(tmp_path / "traffic.cassette")
+
+    async def main():
+        with FakePortal(accounts={"user": PASSWORD}) as portal, Cassette(path) as cassette:
+            w = AsyncWebportal(AsyncRecordingTransport(AiohttpTransport(), cassette), api=portal.url)
+            await w.student_login("user", PASSWORD, CAPTCHA)
+            sem = (await w.get_registered_semesters())[0]
+            await w.close()
+
+        w = AsyncWebportal(AsyncReplayTransport(path), api=portal.url)
+        await w.student_login("user", "any", CAPTCHA)
+        assert (await w.get_registered_semesters())[0].registration_id == sem.registration_id
+
+    asyncio.run(main())
+    assert all(PASSWORD not in json.dumps(e.payload) for e in read_cassette(path))
@@ -0,0 +1,105 @@
+import sqlite3
+import struct
+
+import pytest
+
+from pyjiit.changes import ADDED, CHANGED, REMOVED, AttendanceSnapshot, AttendanceTracker
+
+
+def response(**subjects):
+    """An attendance detail response of subjects given as code=(attended, total), all lectures"""
+    return {"studentattendancelist": [
+        {"individualsubjectcode": code, "Ltotalpres": attended, "Ltotalclass": total}
+        for code, (attended, total) in subjects.items()
+    ]}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "attendance.db")
+
+
+def test_first_snapshot(path):
+    tracker = AttendanceTracker(path)
+    changes = tracker.update("user", "S1", response(X1=(6, 10), X2=(3, 4)))
+    assert [(c.subject_code, c.kind, c.attended, c.total) for c in changes] == [
+        ("X1", ADDED, 6.0, 10.0), ("X2", ADDED, 3.0, 4.0)
+    ]
+    assert tracker.update("user", "S1", response(X1=(6, 10), X2=(3, 4))) == []
+
+
+def test_changed_count(path):
+    tracker = AttendanceTracker(path)
+    tracker.update("user", "S1", response(X1=(6, 10), X2=(3, 4)))
+    changes = tracker.update("user", "S1", response(X1=(7, 11), X2=(3, 4)))
+    assert len(changes) == 1
+    change = changes[0]
+    assert (change.subject_code, change.kind, change.new_classes, change.new_attended) == ("X1", CHANGED, 1.0, 1.0)
+    assert change.row["Ltotalclass"] == 11
+
+
+def test_removed_subject(path):
+    tracker = AttendanceTracker(path)
+    tracker.update("user", "S1", response(X1=(6, 10), X2=(3, 4)))
+    changes = tracker.update("user", "S1", response(X1=(6, 10)))
+    assert [(c.subject_code, c.kind, c.attended_before, c.row) for c in changes] == [("X2", REMOVED, 3.0, None)]
+
+
+def test_users_and_semesters_are_separate(path):
+    tracker = AttendanceTracker(path)
+    tracker.update("user", "S1", response(X1=(6, 10)))
+    assert len(tracker.update("user", "S2", response(X1=(6, 10)))) == 1
+    assert len(tracker.update("other", "S1", response(X1=(6, 10)))) == 1
+
+
+def test_reload_from_database(path):
+    tracker = AttendanceTracker(path)
+    tracker.update("user", "S1", response(X1=(6, 10), X2=(3, 4)))
+    tracker.close()
+
+    tracker = AttendanceTracker(path)
+    assert tracker.update("user", "S1", response(X1=(6, 10), X2=(3, 4))) == []
+    assert [c.kind for c in tracker.update("user", "S1", response(X1=(6, 12), X2=(3, 4)))] == [CHANGED]
+
+
+def test_forget(path):
+    tracker = AttendanceTracker(path)
+    tracker.update("user", "S1", response(X1=(6, 10)))
+    tracker.forget(user="user")
+    tracker.close()
+    assert len(AttendanceTracker(path).update("user", "S1", response(X1=(6, 10)))) == 1
+
+
+def test_bytes_are_portable():
+    snapshot = AttendanceSnapshot.from_json(response(X1=(6, 10), ABC=(1.5, 2)))
+    data = snapshot.to_bytes()
+    # little endian without padding: digest, count, then per subject length, row hash, attended, total and code
+    assert len(data) == 20 + (26 + 2) + (26 + 3)
+    assert data[16:20] == (2).to_bytes(4, "little")
+    assert struct.unpack_from("<d", data, 20 + 10) == (6.0,)
+
+    loaded = AttendanceSnapshot.from_bytes(data)
+    assert (loaded.digest, loaded.subjects) == (snapshot.digest, snapshot.subjects)
+
+
+def test_native_databases_are_converted(path):
+    # a database written before snapshots were little endian
+    snapshot = AttendanceSnapshot.from_json(response(X1=(6, 10)))
+    native = [struct.pack("16sI", snapshot.digest, 1)]
+    for code, (row_hash, attended, total) in snapshot.subjects.items():
+        native += [struct.pack("H8sdd", len(code), row_hash, attended, total), code.encode()]
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE snapshots (user TEXT, semester TEXT, snapshot BLOB, PRIMARY KEY (user, semester))")
+    db.execute("INSERT INTO snapshots VALUES (?, ?, ?)", ("user", "S1", b"".join(native)))
+    db.commit()
+    db.close()
+
+    tracker = AttendanceTracker(path)
+    assert tracker.snapshot("user", "S1").subjects == snapshot.subjects
+    assert tracker.update("user", "S1", response(X1=(6, 10))) == []
+    tracker.close()
+
+    db = sqlite3.connect(path)
+    blob, = db.execute("SELECT snapshot FROM snapshots").fetchone()
+    assert blob == snapshot.to_bytes()
+    assert db.execute("PRAGMA user_version").fetchone()[0] == 1
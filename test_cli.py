@@ -0,0 +1,100 @@
+import io
+import json
+
+import pytest
+
+from pyjiit.cli import ColumnarWriter, NDJSONWriter, main, read_checkpoint, read_credentials
+from pyjiit.fakeportal import FakePortal
+
+
+@pytest.fixture
+def http_portal():
+    with FakePortal(accounts={"a": "password", "b": "password", "c": "password"}, semesters=2, subjects=3) as portal:
+        yield portal
+
+
+def lines(path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def export(http_portal, tmp_path, accounts, *args):
+    credentials = tmp_path / "accounts.csv"
+    credentials.write_text("".join(f"{u},{p}\n" for u, p in accounts))
+    return main([
+        "export", str(credentials), "-o", str(tmp_path / "out.ndjson"), "--checkpoint", str(tmp_path / "done"),
+        "--sections", "registrations", "--api", http_portal.url, *args
+    ])
+
+
+def test_writer_holds_records_until_done():
+    out, checkpoint = io.StringIO(), io.StringIO()
+    writer = NDJSONWriter(out, checkpoint)
+    writer.write({"type": "x", "user": "a", "n": 1})
+    writer.write({"type": "x", "user": "b", "n": 1})
+    writer.write({"type": "x", "user": "a", "n": 2})
+    assert out.getvalue() == ""
+
+    writer.done("a")
+    writer.fail("b", {"type": "error", "user": "b"})
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {"type": "x", "user": "a", "n": 1}, {"type": "x", "user": "a", "n": 2}, {"type": "error", "user": "b"}
+    ]
+    assert checkpoint.getvalue().split("\t")[0] == "a"
+
+
+def test_columnar_batches_only_finished_accounts():
+    out = io.StringIO()
+    writer = ColumnarWriter(out, batch_size=2)
+    writer.write({"type": "x", "user": "a"})
+    writer.write({"type": "x", "user": "a"})
+    writer.write({"type": "x", "user": "b"})
+    assert out.getvalue() == ""
+
+    writer.done("a")
+    assert json.loads(out.getvalue())["columns"]["user"] == ["a", "a"]
+
+
+def test_resume_drops_partial_output(http_portal, tmp_path):
+    assert export(http_portal, tmp_path, [("a", "password")]) == 0
+    first = lines(tmp_path / "out.ndjson")
+
+    # an export interrupted while writing another account
+    with open(tmp_path / "out.ndjson", "a") as f:
+        f.write('{"type":"registration","user":"b"}\n{"type":"regis')
+
+    assert export(http_portal, tmp_path, [("a", "password"), ("b", "password"), ("c", "password")]) == 0
+    records = lines(tmp_path / "out.ndjson")
+    assert records[:len(first)] == first
+    assert [r["user"] for r in records].count("a") == len(first)
+    assert {"type": "registration", "user": "b"} not in records
+    assert {r["user"] for r in records} == {"a", "b", "c"}
+    assert read_checkpoint(str(tmp_path / "done")) == {"a", "b", "c"}
+
+
+def test_failed_account_writes_only_its_error(http_portal, tmp_path):
+    assert export(http_portal, tmp_path, [("a", "password"), ("b", "wrong")]) == 1
+    records = lines(tmp_path / "out.ndjson")
+    assert [r["type"] for r in records if r["user"] == "b"] == ["error"]
+    assert read_checkpoint(str(tmp_path / "done")) == {"a"}
+
+
+def test_credentials_skip_blank_lines_and_comments():
+    f = io.StringIO("a,pass\n\n   \n# comment\n , \nb, p,w\n")
+    assert list(read_credentials(f)) == [("a", "pass"), ("b", " p")]
+
+
+def test_malformed_credentials_name_their_line():
+    with pytest.raises(ValueError, match="line 3"):
+        list(read_credentials(io.StringIO("a,pass\n\nbroken\nc,pass\n")))
+
+
+def test_malformed_credentials_stop_before_writing(http_portal, tmp_path, capsys):
+    (tmp_path / "out.ndjson").write_text("kept\n")
+    (tmp_path / "accounts.csv").write_text("a,password\nbroken\n")
+    with pytest.raises(SystemExit) as info:
+        main(["export", str(tmp_path / "accounts.csv"), "-o", str(tmp_path / "out.ndjson"), "--api", http_portal.url])
+    assert info.value.code == 2
+    assert "line 2" in capsys.readouterr().err
+    assert (tmp_path / "out.ndjson").read_text() == "kept\n"
+    assert http_portal.requests == 0
@@ -0,0 +1,93 @@
+import base64
+import datetime
+import json
+import types
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+import pytest
+
+import pyjiit.encryption
+import pyjiit.utils
+from pyjiit.encryption import (
+    IV, CryptoContext, LocalNameProvider, deserialize_payloads, generate_key, serialize_payload, serialize_payloads
+)
+from pyjiit.utils import IST
+
+
+MESSAGES = [b"", b"x", b"a" * 15, b"b" * 16, b"c" * 17, json.dumps({"username": "21103000", "usertype": "S"}).encode()]
+
+
+def reference_encrypt(date, data: bytes) -> bytes:
+    return AES.new(generate_key(date), AES.MODE_CBC, IV).encrypt(pad(data, 16))
+
+def reference_decrypt(date, data: bytes) -> bytes:
+    return unpad(AES.new(generate_key(date), AES.MODE_CBC, IV).decrypt(data), 16)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Pins the time seen by pyjiit.encryption to clock.now (an IST datetime)"""
+    clock = types.SimpleNamespace(now=datetime.datetime(2024, 8, 14, 23, 59, 58, tzinfo=IST))
+    monkeypatch.setattr(pyjiit.encryption, "time", types.SimpleNamespace(time=lambda: clock.now.timestamp()))
+    monkeypatch.setattr(pyjiit.utils, "ist_now", lambda: clock.now)
+    return clock
+
+
+def test_reused_cipher_matches_fresh_aes():
+    date = datetime.date(2024, 8, 14)
+    context = CryptoContext(date)
+    # the reused cipher objects carry their chain from one message to the next, the output must not
+    for _ in range(3):
+        for data in MESSAGES:
+            encrypted = context.encrypt(data)
+            assert encrypted == reference_encrypt(date, data)
+            assert context.decrypt(encrypted) == data
+
+
+def test_batches_match_single_calls():
+    date = datetime.date(2024, 8, 14)
+    context = CryptoContext(date)
+    encrypted = context.encrypt_many(MESSAGES)
+    assert encrypted == [reference_encrypt(date, data) for data in MESSAGES]
+    assert context.decrypt_many(encrypted) == MESSAGES
+    assert [context.decrypt(e) for e in reversed(encrypted)] == list(reversed(MESSAGES))
+
+
+def test_ist_day_rollover(clock):
+    context = CryptoContext()
+    before = clock.now.date()
+    assert context.encrypt(b"payload") == reference_encrypt(before, b"payload")
+
+    clock.now += datetime.timedelta(seconds=4) # past 0000 hrs IST
+    after = clock.now.date()
+    assert after != before
+    assert context.key() == generate_key(after)
+    assert context.date_seq() == pyjiit.utils.generate_date_seq(after)
+    for data in MESSAGES:
+        encrypted = context.encrypt(data)
+        assert encrypted == reference_encrypt(after, data)
+        assert context.decrypt(encrypted) == reference_decrypt(after, encrypted)
+
+
+def test_local_names_roll_over(clock):
+    context = CryptoContext()
+    provider = LocalNameProvider(size=8, background=False, context=context)
+    name = provider.get()
+    assert reference_decrypt(clock.now.date(), base64.b64decode(name))[4:11].decode() == context.date_seq()
+
+    clock.now += datetime.timedelta(seconds=4)
+    name = provider.get()
+    assert reference_decrypt(clock.now.date(), base64.b64decode(name))[4:11].decode() == context.date_seq()
+
+
+def test_payload_batches_round_trip():
+    payloads = [{"n": i, "text": "x" * i} for i in range(40)]
+    serialized = serialize_payloads(payloads)
+    assert serialized[3] == serialize_payload(payloads[3])
+    assert deserialize_payloads(serialized) == payloads
+
+
+def test_decrypt_rejects_unpadded_data():
+    with pytest.raises(ValueError):
+        CryptoContext().decrypt(b"short")
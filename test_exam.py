@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from pyjiit.exam import ExamEvent, ExamScheduleEntry, ExamScheduleIndex
+from pyjiit.utils import IST
+
+
+SCHEDULE = "/studentsttattview/getstudent-examschedule"
+
+
+@pytest.fixture
+def index(portal, client):
+    portal.semesters = 2
+    return client.get_exam_index()
+
+
+def event(i: int) -> ExamEvent:
+    return ExamEvent(f"T{i}", 0, f"T{i}", "R", f"E{i}")
+
+
+def entry(e: ExamEvent, code: str, start: datetime) -> ExamScheduleEntry:
+    return ExamScheduleEntry(code, code, start, None, "G1", "1", e.exam_event_code, e.exam_event_id)
+
+
+def test_entries_are_parsed():
+    e = event(1)
+    parsed = ExamScheduleEntry.from_json({
+        "subjectcode": "DATA STRUCTURES(15B11CI311)", "subjectdesc": "DATA STRUCTURES",
+        "datetime": "14/08/2024", "datetimefrom": "02:00 PM", "datetimeupto": "", "roomcode": "G1", "seatno": "7",
+    }, e)
+    assert parsed.subject_code == "15B11CI311"
+    assert parsed.start == datetime(2024, 8, 14, 14, 0, tzinfo=IST)
+    assert parsed.end is None
+    assert parsed.exam_event_id == "E1"
+
+
+def test_index_of_every_event(portal, index):
+    # 2 semesters, 3 events each
+    assert len(index) > 0
+    assert len({e.exam_event_id for e in index}) == 6
+    starts = [e.start for e in index]
+    assert starts == sorted(starts)
+    assert not index.errors
+
+
+def test_between_matches_a_scan(index):
+    entries = list(index)
+    start, end = entries[3].start, entries[-3].start
+    assert index.between(start, end) == [e for e in entries if start <= e.start < end]
+    assert index.upcoming(timedelta(days=2), now=start) == [e for e in entries if start <= e.start < start + timedelta(days=2)]
+    assert index.next(start + timedelta(seconds=1)) == next(e for e in entries if e.start > start)
+    assert index.next(entries[-1].start + timedelta(seconds=1)) is None
+
+
+def test_subject_lookup(index):
+    code = next(iter(index)).subject_code
+    entries = index.subject(code)
+    assert entries and all(e.subject_code == code for e in entries)
+    assert entries == sorted(entries, key=lambda e: e.start)
+    assert index.subjects()[code] == entries
+
+
+def test_update_replaces_one_event():
+    index = ExamScheduleIndex()
+    t = datetime(2024, 8, 14, 9, 0, tzinfo=IST)
+    a, b = event(1), event(2)
+    index.update(a, [entry(a, "X", t), entry(a, "Y", t + timedelta(days=1))])
+    index.update(b, [entry(b, "X", t + timedelta(hours=1))])
+    assert [e.exam_event_id for e in index.subject("X")] == ["E1", "E2"]
+
+    index.update(a, [entry(a, "X", t + timedelta(days=3)), entry(a, "Z", None)])
+    assert [e.start for e in index] == [t + timedelta(hours=1), t + timedelta(days=3)]
+    assert [e.exam_event_id for e in index.subject("X")] == ["E2", "E1"] # the cached lookup was dropped
+    assert [e.subject_code for e in index.undated] == ["Z"]
+    assert index.subject("Y") == []
+
+    index.remove(a)
+    assert len(index) == 1 and index.undated == []
+
+
+def test_refresh_keeps_events_which_failed(portal, client, index):
+    before = list(index)
+    portal.error_rate = {SCHEDULE: 1.0}
+    client.get_exam_index(index=index)
+    assert list(index) == before
+    assert len(index.errors) == 6
@@ -0,0 +1,46 @@
+import pytest
+
+from pyjiit.default import CAPTCHA
+from pyjiit.exceptions import LoginError, SessionExpired
+from pyjiit.fakeportal import FakePortal
+from pyjiit.transport import RequestsTransport
+from pyjiit.wrapper import Webportal
+
+
+def test_login_and_read(client):
+    meta = client.get_attendance_meta()
+    assert meta.semesters
+    detail = client.get_attendance(meta.latest_header(), meta.latest_semester())
+    assert detail["studentattendancelist"]
+
+
+def test_wrong_password(portal):
+    w = Webportal(portal.transport(), api=portal.url)
+    with pytest.raises(LoginError):
+        w.student_login("user", "wrong", CAPTCHA)
+
+
+def test_data_is_deterministic(portal):
+    def registrations():
+        w = Webportal(portal.transport(), api=portal.url)
+        w.student_login("user", "password", CAPTCHA)
+        return w.get_registered_subjects_and_faculties(w.get_registered_semesters()[0]).subjects
+
+    assert registrations() == registrations()
+
+
+def test_expired_token(portal):
+    portal.token_ttl = -1
+    w = Webportal(portal.transport(), api=portal.url)
+    w.student_login("user", "password", CAPTCHA)
+    with pytest.raises(SessionExpired):
+        w.get_attendance_meta()
+
+
+def test_over_http():
+    with FakePortal() as portal:
+        w = Webportal(RequestsTransport(), api=portal.url)
+        w.student_login("user", "password", CAPTCHA)
+        assert w.get_student_bank_info()
+        assert portal.logins == 1
+        w.close()
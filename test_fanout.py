@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+from pyjiit.async_wrapper import AsyncWebportal
+from pyjiit.default import CAPTCHA
+from pyjiit.exceptions import LoginError
+from pyjiit.fakeportal import FakePortal
+from pyjiit.fanout import async_fan_out, fan_out
+from pyjiit.wrapper import Webportal
+
+
+ACCOUNTS = {"user1": "password", "user2": "password", "user3": "password", "user4": "password"}
+CREDENTIALS = [("user1", "password"), ("user2", "wrong"), ("user3", "password"), ("user4", "password")]
+
+
+def test_fan_out_partial_failure():
+    portal = FakePortal(accounts=dict(ACCOUNTS))
+
+    def bank_info(credentials):
+        w = Webportal(portal.transport(), api=portal.url)
+        w.student_login(*credentials, CAPTCHA)
+        return w.get_student_bank_info()
+
+    result = fan_out(bank_info, CREDENTIALS, lambda credentials: credentials[0], max_workers=2)
+    assert not result.ok
+    assert sorted(result.results) == ["user1", "user3", "user4"]
+    assert list(result.errors) == ["user2"]
+    assert isinstance(result.errors["user2"], LoginError)
+    assert len({str(r) for r in result.results.values()}) == 3
+
+
+def test_async_fan_out_partial_failure():
+    portal = FakePortal(accounts=dict(ACCOUNTS))
+
+    async def bank_info(credentials):
+        w = AsyncWebportal(portal.async_transport(), api=portal.url)
+        await w.student_login(*credentials, CAPTCHA)
+        return await w.get_student_bank_info()
+
+    result = asyncio.run(async_fan_out(bank_info, CREDENTIALS, lambda credentials: credentials[0], max_workers=2))
+    assert not result.ok
+    assert sorted(result.results) == ["user1", "user3", "user4"]
+    assert list(result.errors) == ["user2"]
+    assert isinstance(result.errors["user2"], LoginError)
+
+
+def test_fan_out_limits_concurrency():
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def call(i):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return i * i
+
+    result = fan_out(call, range(12), lambda i: i, max_workers=3)
+    assert result.ok
+    assert result.results == {i: i * i for i in range(12)}
+    assert peak <= 3
+
+
+def test_get_all_attendance_keeps_other_semesters(client, portal, monkeypatch):
+    meta = client.get_attendance_meta()
+    assert len(meta.semesters) > 1
+    failing = meta.semesters[0].registration_code
+    get_attendance = client.get_attendance
+
+    def flaky(header, semester):
+        if semester.registration_code == failing:
+            raise LoginError("expired")
+        return get_attendance(header, semester)
+
+    monkeypatch.setattr(client, "get_attendance", flaky)
+    result = client.get_all_attendance()
+    assert list(result.errors) == [failing]
+    assert sorted(result.results) == sorted(s.registration_code for s in meta.semesters[1:])
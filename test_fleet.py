@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from pyjiit.exceptions import WorkerCrashed
+from pyjiit.fakeportal import FakePortal
+from pyjiit.fleet import FleetRunner
+
+
+def task(w):
+    # tasks have to be defined at the top level, so the worker processes can unpickle them
+    if w.username == "crash":
+        os._exit(3)
+    if w.username == "bad":
+        raise ValueError("bad account")
+    return w.session.userid
+
+
+@pytest.fixture
+def server():
+    with FakePortal() as portal:
+        yield portal
+
+
+def accounts(*names):
+    return [(name, "password") for name in names]
+
+
+def test_shards(server):
+    names = [f"user{i}" for i in range(9)]
+    runner = FleetRunner(task, processes=3, threads=2, api=server.url)
+    results = {r.username: r for r in runner.run(accounts(*names))}
+
+    assert sorted(results) == names
+    assert all(r.ok and r.value for r in results.values())
+    # accounts are dealt round robin, so account i runs on worker i % 3
+    assert [results[name].worker for name in names] == [i % 3 for i in range(9)]
+    assert [(s.accounts, s.ok, s.crashes, s.restarts) for s in runner.stats.values()] == [(3, 3, 0, 0)] * 3 + [(0, 0, 0, 0)]
+    assert all(s.requests > 0 for s in list(runner.stats.values())[:3])
+
+
+def test_errors_fail_only_their_account(server):
+    runner = FleetRunner(task, processes=2, threads=2, api=server.url)
+    results = {r.username: r for r in runner.run(accounts("bad", "user1", "user2", "user3"))}
+    assert isinstance(results["bad"].error, ValueError)
+    assert all(results[f"user{i}"].ok for i in range(1, 4))
+    assert sum(s.failed for s in runner.stats.values()) == 1
+    assert sum(s.crashes for s in runner.stats.values()) == 0
+
+
+def test_crash_is_quarantined(server):
+    # threads=1, so only the crashing account was running when its worker died
+    names = ["user0", "crash"] + [f"user{i}" for i in range(2, 10)]
+    runner = FleetRunner(task, processes=2, threads=1, api=server.url)
+    results = {r.username: r for r in runner.run(accounts(*names))}
+
+    assert sorted(results) == sorted(names)
+    crashed = results.pop("crash")
+    assert isinstance(crashed.error, WorkerCrashed)
+    assert crashed.worker == 2 # the quarantine worker, which crashed on it too
+    assert all(r.ok for r in results.values())
+
+    shard, quarantine = runner.stats[1], runner.stats[2]
+    assert (shard.crashes, shard.restarts, shard.exitcode) == (1, 1, 3) # restarted for the rest of its accounts
+    assert (quarantine.accounts, quarantine.crashes, quarantine.restarts, quarantine.failed) == (1, 1, 0, 1)
+    assert shard.ok == 4
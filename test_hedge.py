@@ -0,0 +1,156 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from pyjiit.default import CAPTCHA
+from pyjiit.hedge import Hedger
+from pyjiit.transport import Transport
+from pyjiit.wrapper import Webportal
+
+
+BANK = "/studentbankdetails/getstudentbankinfo"
+
+
+class StallingTransport(Transport):
+    """Passes requests to transport, the first stall requests to an endpoint in BANK hang for delay seconds"""
+    def __init__(self, transport, stall: int = 1, delay: float = 2.0) -> None:
+        self.transport = transport
+        self.stall = stall
+        self.delay = delay
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        if url.endswith(BANK):
+            with self._lock:
+                self.sent += 1
+                stall = self.sent <= self.stall
+            if stall:
+                time.sleep(self.delay)
+        return self.transport.request(method, url, **kwargs)
+
+
+def login(portal, transport, hedger) -> Webportal:
+    w = Webportal(transport, api=portal.url, hedger=hedger)
+    w.student_login("user", "password", CAPTCHA)
+    return w
+
+
+def test_stalled_request_is_hedged(portal):
+    hedger = Hedger(initial_delay=0.1)
+    transport = StallingTransport(portal.transport())
+    w = login(portal, transport, hedger)
+
+    start = time.perf_counter()
+    assert w.get_student_bank_info()
+    assert time.perf_counter() - start < 1.0
+    assert (hedger.hedged, hedger.wins, transport.sent) == (1, 1, 2)
+    hedger.close()
+
+
+def test_logins_are_never_hedged(portal):
+    hedger = Hedger(initial_delay=0.0, min_delay=0.0)
+    login(portal, portal.transport(), hedger)
+    assert hedger.requests == 0
+    with pytest.raises(ValueError):
+        Hedger(endpoints={BANK, "/token/generate-token1"})
+
+
+def test_budget_caps_hedges(portal):
+    hedger = Hedger(initial_delay=0.05, max_rate=0.0, burst=1)
+    w = login(portal, StallingTransport(portal.transport(), stall=4, delay=0.3), hedger)
+    for _ in range(3):
+        w.get_student_bank_info()
+    assert hedger.hedged == 1
+    hedger.close()
+
+
+def test_first_requests_do_not_queue_behind_the_pool(portal):
+    # one hedge thread and 8 concurrent slow requests, none of them should wait for another
+    hedger = Hedger(initial_delay=1.0, max_workers=1)
+    portal.latency = {BANK: 0.2}
+    clients = [login(portal, portal.transport(), hedger) for _ in range(8)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda w: w.get_student_bank_info(), clients))
+    assert time.perf_counter() - start < 0.6
+    assert hedger.hedged == 0
+
+
+def test_delay_follows_the_percentile():
+    hedger = Hedger(percentile=0.9, min_samples=10, min_delay=0.0)
+    assert hedger.delay(BANK) == hedger.initial_delay
+    for i in range(100):
+        hedger.record(BANK, i / 100)
+    assert hedger.delay(BANK) == pytest.approx(0.9, abs=0.02)
+
+
+def test_both_failing_raises_the_first_error():
+    hedger = Hedger(initial_delay=0.01)
+    def send(hedge):
+        time.sleep(0.05 if not hedge else 0.1)
+        raise RuntimeError("hedge" if hedge else "primary")
+    with pytest.raises(RuntimeError, match="primary"):
+        hedger.run(BANK, send)
+    hedger.close()
+
+
+def test_failed_primary_falls_back_to_the_hedge():
+    hedger = Hedger(initial_delay=0.01)
+    def send(hedge):
+        if hedge:
+            return "hedge"
+        time.sleep(0.05)
+        raise RuntimeError("primary")
+    assert hedger.run(BANK, send) == "hedge"
+    hedger.close()
+
+
+def test_async_loser_is_cancelled():
+    hedger = Hedger(initial_delay=0.05)
+    cancelled = []
+
+    async def send(hedge):
+        try:
+            await asyncio.sleep(0.01 if hedge else 5)
+        except asyncio.CancelledError:
+            cancelled.append(hedge)
+            raise
+        return hedge
+
+    async def run():
+        result = await hedger.async_run(BANK, send)
+        await asyncio.sleep(0) # lets the cancellation land
+        return result
+
+    start = time.perf_counter()
+    assert asyncio.run(run()) is True
+    assert time.perf_counter() - start < 1.0
+    assert cancelled == [False]
+
+
+def test_threads_stay_bounded(portal):
+    # 32 concurrent requests, only max_primaries of them get a thread, the others are sent unhedged by their callers
+    hedger = Hedger(initial_delay=1.0, max_workers=2, max_primaries=4)
+    portal.latency = {BANK: 0.1}
+    clients = [login(portal, portal.transport(), hedger) for _ in range(32)]
+
+    peak = 0
+    def read(w):
+        nonlocal peak
+        result = w.get_student_bank_info()
+        ours = [t for t in threading.enumerate() if t.name.startswith(("pyjiit-request", "pyjiit-hedge"))]
+        peak = max(peak, len(ours))
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(32) as executor:
+        assert all(executor.map(read, clients))
+    assert time.perf_counter() - start < 0.5
+    assert 0 < peak <= 6
+    assert hedger.requests == 32
+    hedger.close()
@@ -0,0 +1,129 @@
+import re
+
+import pytest
+
+from pyjiit.cache import ResponseCache
+from pyjiit.default import CAPTCHA
+from pyjiit.metrics import BUCKETS, Histogram, MetricsRegistry, RequestEvent
+from pyjiit.wrapper import Webportal
+
+
+BANK = "/studentbankdetails/getstudentbankinfo"
+
+
+def test_percentile_empty():
+    assert Histogram().percentile(0.5) == 0.0
+
+
+def test_percentile_interpolates_inside_bucket():
+    h = Histogram()
+    for _ in range(4):
+        h.observe(0.2) # (0.1, 0.25]
+    assert h.percentile(0.0) == 0.1
+    assert h.percentile(0.5) == pytest.approx(0.175)
+    assert h.percentile(1.0) == 0.25
+
+
+def test_percentile_bucket_boundaries():
+    h = Histogram()
+    h.observe(0.01) # upper bounds are inclusive, like Prometheus le
+    h.observe(0.0100001)
+    assert h.counts[BUCKETS.index(0.01)] == 1
+    assert h.counts[BUCKETS.index(0.025)] == 1
+    assert h.percentile(0.5) == 0.01
+    assert h.percentile(1.0) == 0.025
+
+    h = Histogram()
+    h.observe(0.0)
+    assert h.counts[0] == 1
+    assert h.percentile(0.99) == pytest.approx(0.005 * 0.99)
+
+
+def test_percentile_overflow_bucket():
+    h = Histogram()
+    h.observe(1.0)
+    h.observe(120.0)
+    assert h.counts[-1] == 1
+    assert h.sum == 121.0
+    # nothing is known above the last finite bound
+    assert h.percentile(0.99) == 60.0
+    assert h.percentile(0.5) == 1.0
+
+
+def test_cached_coalesced_and_hedges_counted_apart():
+    registry = MetricsRegistry()
+    registry(RequestEvent(BANK, "POST", 200, latency=0.2, response_bytes=100))
+    registry(RequestEvent(BANK, "POST", 200, latency=0.3, response_bytes=100, hedge=True))
+    registry(RequestEvent(BANK, "POST", cached=True))
+    registry(RequestEvent(BANK, "POST", coalesced=True))
+    registry(RequestEvent(BANK, "POST", 200, latency=0.4, failed=True, error=Exception()))
+    registry(RequestEvent(BANK, "POST", latency=0.5, error=OSError()))
+
+    stats = registry.snapshot()[BANK]
+    assert {k: stats[k] for k in ("requests", "failures", "errors", "cached", "coalesced", "hedges", "response_bytes")} == {
+        "requests": 6, "failures": 1, "errors": 1, "cached": 1, "coalesced": 1, "hedges": 1, "response_bytes": 200,
+    }
+    # cache hits and coalesced calls sent nothing, so they are left out of the latencies
+    assert registry.endpoints[BANK].latency.count == 4
+    assert stats["mean"] == pytest.approx(0.35)
+
+    registry.reset()
+    assert registry.snapshot() == {}
+    assert registry.percentiles(BANK) == {0.5: 0.0, 0.9: 0.0, 0.99: 0.0}
+
+
+def test_client_events(portal):
+    registry = MetricsRegistry()
+    w = Webportal(portal.transport(), api=portal.url, hooks=[registry], cache=ResponseCache())
+    w.student_login("user", "password", CAPTCHA)
+    w.get_student_bank_info()
+    w.get_student_bank_info()
+
+    snapshot = registry.snapshot()
+    assert snapshot[BANK]["requests"] == 2
+    assert snapshot[BANK]["cached"] == 1
+    assert registry.endpoints[BANK].latency.count == 1
+    assert snapshot["/token/generate-token1"]["requests"] == 1
+
+
+SAMPLE = re.compile(r'^([a-z_]+)\{endpoint="([^"]+)"(?:,le="([^"]+)")?\} (\S+)$')
+
+def test_prometheus_format():
+    registry = MetricsRegistry()
+    registry(RequestEvent(BANK, "POST", 200, latency=0.02, response_bytes=10))
+    registry(RequestEvent(BANK, "POST", 200, latency=0.3, response_bytes=5))
+    registry(RequestEvent("/a", "POST", cached=True))
+    text = registry.render_prometheus()
+    assert text.endswith("\n")
+
+    types, samples = {}, []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line.split()[2:]
+            assert name not in types
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        samples.append(match.groups())
+        # every sample comes after the TYPE line of its family
+        family = re.sub(r"_(bucket|sum|count)$", "", match[1])
+        assert family in types, line
+
+    assert types.pop("pyjiit_request_duration_seconds") == "histogram"
+    assert set(types.values()) == {"counter"}
+
+    buckets = [(le, float(v)) for name, endpoint, le, v in samples
+               if name == "pyjiit_request_duration_seconds_bucket" and endpoint == BANK]
+    assert len(buckets) == len(BUCKETS)
+    assert buckets[-1] == ("+Inf", 2.0)
+    assert dict(buckets)["0.01"] == 0.0 and dict(buckets)["0.025"] == 1.0 and dict(buckets)["0.5"] == 2.0
+    assert [v for _, v in buckets] == sorted(v for _, v in buckets) # cumulative
+
+    values = {(name, endpoint): float(v) for name, endpoint, le, v in samples if le is None}
+    assert values["pyjiit_request_duration_seconds_count", BANK] == 2
+    assert values["pyjiit_request_duration_seconds_sum", BANK] == pytest.approx(0.32)
+    assert values["pyjiit_requests_total", BANK] == 2
+    assert values["pyjiit_response_bytes_total", BANK] == 15
+    assert values["pyjiit_cache_hits_total", "/a"] == 1
+    assert values["pyjiit_request_duration_seconds_count", "/a"] == 0
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+
+import pytest
+
+from pyjiit.async_wrapper import AsyncWebportal
+from pyjiit.default import CAPTCHA
+from pyjiit.plan import Plan, PlanExecutor, Step
+from pyjiit.wrapper import Webportal
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    """
+    Replaces STEPS with a chain root -> items -> details, and records the calls in order
+
+    Clients are dictionaries of step name -> value (or exception to raise), with "async": True for async_run.
+    """
+    calls = []
+    lock = threading.Lock()
+
+    def step(name):
+        def record(client, arg):
+            with lock:
+                calls.append((client["name"], name, arg))
+            if isinstance(client.get(name), Exception):
+                raise client[name]
+            return client.get(name, arg)
+
+        def call(client, arg):
+            if client.get("async"):
+                async def later():
+                    return record(client, arg)
+                return later()
+            return record(client, arg)
+        return call
+
+    monkeypatch.setattr("pyjiit.plan.STEPS", {
+        "root": Step(step("root")),
+        "items": Step(step("items"), "root", lambda root: [(k, k) for k in root]),
+        "details": Step(step("details"), "items", lambda item: [("d", item)]),
+        "other": Step(step("other")),
+    })
+    return calls
+
+
+def test_unknown_step():
+    with pytest.raises(ValueError):
+        Plan("nope")
+    plan = Plan("bank_info")
+    assert plan.want("exam_schedules").steps == {"bank_info", "exam_schedules", "exam_events", "exam_semesters"}
+    assert plan.steps == {"bank_info"}
+
+
+def test_dependency_order(steps):
+    clients = {"a": {"name": "a", "root": ["x", "y"]}, "b": {"name": "b", "root": ["z"]}}
+    result = PlanExecutor(max_workers=4).run(Plan("details"), clients)
+
+    assert result.ok
+    assert result.results == {"a": {"details": {("x", "d"): "x", ("y", "d"): "y"}}, "b": {"details": {("z", "d"): "z"}}}
+    assert result.calls == len(steps) == 8
+    for user, name, arg in steps:
+        if name == "items":
+            assert steps.index((user, "root", None)) < steps.index((user, name, arg))
+        if name == "details":
+            assert steps.index((user, "items", arg)) < steps.index((user, name, arg))
+
+
+def test_calls_are_deduplicated(steps):
+    clients = {"a": {"name": "a", "root": ["x", "x", "y", "x"]}}
+    result = PlanExecutor().run(Plan("items", "details", "root"), clients)
+    assert sorted(arg for _, name, arg in steps if name == "items") == ["x", "y"]
+    assert result.results["a"]["items"] == {"x": "x", "y": "y"}
+    assert result.results["a"]["root"] == ["x", "x", "y", "x"]
+    assert result.calls == len(steps) == 5
+
+
+def test_failed_call_skips_only_its_subtree(steps):
+    error = RuntimeError("down")
+    clients = {"a": {"name": "a", "root": ["x", "y"], "details": error}, "b": {"name": "b", "root": error}}
+    result = PlanExecutor().run(Plan("details", "other"), clients)
+
+    assert not result.ok
+    assert result.errors == {("a", "details", ("x", "d")): error, ("a", "details", ("y", "d")): error,
+                             ("b", "root", None): error}
+    assert result.results == {"a": {"other": None}, "b": {"other": None}}
+    assert not [c for c in steps if c[0] == "b" and c[1] != "root" and c[1] != "other"]
+
+
+@pytest.mark.parametrize("runner", ["run", "async_run"])
+def test_failed_expand_is_recorded_per_client(steps, runner):
+    # b gets a response items cannot be expanded from
+    clients = {"a": {"name": "a", "root": ["x"]}, "b": {"name": "b", "root": None}, "c": {"name": "c", "root": ["y"]}}
+
+    executor, plan = PlanExecutor(), Plan("items", "other")
+    if runner == "run":
+        result = executor.run(plan, clients)
+    else:
+        result = asyncio.run(executor.async_run(plan, {user: {**c, "async": True} for user, c in clients.items()}))
+
+    assert list(result.errors) == [("b", "items", None)]
+    assert isinstance(result.errors["b", "items", None], TypeError)
+    assert result.results["a"] == {"items": {"x": "x"}, "other": None}
+    assert result.results["c"] == {"items": {"y": "y"}, "other": None}
+    assert result.results["b"] == {"other": None}
+
+
+def test_real_clients(portal):
+    clients = {}
+    for user in ("user1", "user2"):
+        clients[user] = Webportal(portal.transport(), api=portal.url)
+        clients[user].student_login(user, "password", CAPTCHA)
+
+    before = portal.requests
+    result = PlanExecutor(max_workers=4).run(Plan("exam_schedules", "registrations", "bank_info"), clients)
+    assert result.ok
+    assert portal.requests - before == result.calls
+
+    for user, w in clients.items():
+        assert set(result.results[user]) == {"exam_schedules", "registrations", "bank_info"}
+        semesters = w.get_semesters_for_exam_events()
+        expected = {(s.registration_code, e.exam_event_code) for s in semesters for e in w.get_exam_events(s)}
+        assert set(result.results[user]["exam_schedules"]) == expected
+        assert set(result.results[user]["registrations"]) == {s.registration_code for s in w.get_registered_semesters()}
+
+
+def test_real_clients_async(portal):
+    async def main():
+        clients = {}
+        for user in ("user1", "user2"):
+            clients[user] = AsyncWebportal(portal.async_transport(), api=portal.url)
+            await clients[user].student_login(user, "password", CAPTCHA)
+        return await PlanExecutor(max_workers=4).async_run(Plan("exam_schedules"), clients)
+
+    result = asyncio.run(main())
+    assert result.ok
+    assert set(result.results) == {"user1", "user2"}
+    assert result.results["user1"]["exam_schedules"]
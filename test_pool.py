@@ -0,0 +1,118 @@
+from datetime import timedelta
+import threading
+import time
+
+import pytest
+
+from pyjiit.exceptions import LoginError
+from pyjiit.fakeportal import FakePortal
+from pyjiit.pool import SessionPool
+from pyjiit.vault import SessionVault
+
+
+KEY = bytes(range(32))
+TOKEN = "/token/generate-token1"
+
+
+def make_pool(portal, **kwargs) -> SessionPool:
+    return SessionPool(portal.transport(), api=portal.url, **kwargs)
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_get_logs_in_once(portal):
+    pool = make_pool(portal)
+    pool.add("user", "password")
+    w = pool.get("user")
+    assert w.session is not None
+    assert pool.get("user") is w
+    assert portal.logins == 1
+    with pytest.raises(KeyError):
+        pool.get("nobody")
+    pool.close()
+
+
+def test_background_login():
+    portal = FakePortal()
+    with make_pool(portal) as pool:
+        pool.add_many({"user1": "password", "user2": "password"})
+        assert wait_for(lambda: portal.logins == 2)
+        before = portal.requests
+        pool.get("user1")
+        pool.get("user2")
+        assert portal.requests == before
+
+
+def test_refresh_before_expiry():
+    portal = FakePortal(token_ttl=3)
+    with make_pool(portal, refresh_before=timedelta(seconds=2)) as pool:
+        pool.add("user", "password")
+        first = pool.session("user")
+
+        # refreshed about a second after the first login, before the token expires
+        assert wait_for(lambda: portal.logins == 2)
+        second = pool.session("user")
+        assert second is not first
+        assert second.expiry > first.expiry
+        assert portal.logins == 2
+
+
+def test_concurrent_gets_share_one_login():
+    portal = FakePortal(latency={TOKEN: 0.2})
+    pool = make_pool(portal)
+    pool.add("user", "password")
+
+    barrier = threading.Barrier(8)
+    clients = []
+    def get():
+        barrier.wait()
+        clients.append(pool.get("user"))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert portal.logins == 1
+    assert all(c is clients[0] for c in clients)
+    pool.close()
+
+
+def test_failed_login_is_recorded():
+    portal = FakePortal(accounts={"user": "password"})
+    pool = make_pool(portal, retry_after=timedelta(hours=1))
+    pool.add("user", "wrong")
+    with pytest.raises(LoginError):
+        pool.get("user")
+    assert isinstance(pool.errors["user"], LoginError)
+
+    pool.remove("user")
+    assert "user" not in pool and "user" not in pool.errors
+    pool.close()
+
+
+def test_vault_warm_start(portal, tmp_path):
+    path = str(tmp_path / "sessions.db")
+    with SessionVault(path, KEY) as vault:
+        pool = make_pool(portal, vault=vault)
+        pool.add_many({"user1": "password", "user2": "password"})
+        tokens = {u: pool.session(u).token for u in ("user1", "user2")}
+        pool.close()
+    assert portal.logins == 2
+
+    # a new process: sessions come from the vault, without any request
+    before = portal.requests
+    with SessionVault(path, KEY) as vault, make_pool(portal, vault=vault) as pool:
+        pool.add_many({"user1": "password", "user2": "password"})
+        assert {u: pool.session(u).token for u in ("user1", "user2")} == tokens
+        time.sleep(0.1) # the background thread has nothing due
+    assert portal.requests == before
+    assert portal.logins == 2
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from pyjiit.default import CAPTCHA
+from pyjiit.exceptions import APIError, LoginError
+from pyjiit.ratelimit import RateLimiter, TokenBucket
+from pyjiit.wrapper import Webportal
+
+
+BANK = "/studentbankdetails/getstudentbankinfo"
+
+
+def fast_limiter(**kwargs) -> RateLimiter:
+    return RateLimiter(host_rate=1000, endpoint_rate=1000, backoff=0.001, max_backoff=0.001, **kwargs)
+
+
+def test_transient_failures_are_retried(portal, client):
+    client.limiter = fast_limiter(retries=3)
+    portal.error_rate = {BANK: 1.0}
+    before = portal.requests
+    with pytest.raises(APIError):
+        client.get_student_bank_info()
+    assert portal.requests - before == 4 # the request and 3 retries
+
+
+def test_retry_recovers(portal, client):
+    client.limiter = fast_limiter(retries=50)
+    portal.error_rate = {BANK: 0.5}
+    assert client.get_student_bank_info()
+
+
+def test_wrong_password_is_not_retried(portal):
+    w = Webportal(portal.transport(), api=portal.url, limiter=fast_limiter(retries=5))
+    before = portal.requests
+    with pytest.raises(LoginError):
+        w.student_login("user", "wrong", CAPTCHA)
+    assert portal.requests - before == 2 # pretoken check and one token request
+
+
+def test_failures_lower_the_rate_and_successes_restore_it():
+    limiter = RateLimiter(host_rate=8, endpoint_rate=4, decrease=0.5, increase=1, min_rate=1)
+    limiter.record("host", BANK, False)
+    assert limiter.rate("host", BANK) == (4, 2)
+    for _ in range(3):
+        limiter.record("host", BANK, False)
+    assert limiter.rate("host", BANK) == (1, 1)
+    for _ in range(10):
+        limiter.record("host", BANK, True)
+    assert limiter.rate("host", BANK) == (8, 4)
+
+
+def test_is_transient():
+    assert RateLimiter.is_transient(APIError("Injected error"))
+    assert RateLimiter.is_transient(TimeoutError())
+    assert not RateLimiter.is_transient(LoginError("Invalid Password"))
+    assert not RateLimiter.is_transient(APIError("Not Found"), 404)
+    assert not RateLimiter.is_transient(ValueError())
+
+
+def test_token_bucket_paces():
+    bucket = TokenBucket(rate=100, burst=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.01, abs=0.005)
+    time.sleep(0.05)
+    assert bucket.reserve() == 0
@@ -0,0 +1,137 @@
+import pytest
+
+from pyjiit.default import CAPTCHA
+from pyjiit.registration import RegisteredSubject, RegistrationIndex
+from pyjiit.wrapper import Webportal
+
+
+USERS = ["user1", "user2", "user3", "user4"]
+
+
+@pytest.fixture
+def responses(portal):
+    """A dictionary of (student, registration id) -> Registrations of two semesters of every user"""
+    out = {}
+    for user in USERS:
+        w = Webportal(portal.transport(), api=portal.url)
+        w.student_login(user, "password", CAPTCHA)
+        for sem in w.get_registered_semesters()[:2]:
+            out[(user, sem.registration_id)] = w.get_registered_subjects_and_faculties(sem)
+    return out
+
+
+@pytest.fixture
+def index(responses):
+    index = RegistrationIndex()
+    assert index.update_many(responses) == len(responses)
+    return index
+
+
+def snapshot(index: RegistrationIndex) -> dict:
+    # everything the index answers: the subjects of each student and semester, and the sections of each subject
+    keys = {(e.student, e.registration_id) for e in index}
+    subjects = {e.subject.subject_code for e in index}
+    return {
+        "registrations": {key: index.registrations(*key) for key in keys},
+        "sections": {code: index.sections(code) for code in subjects},
+        "employees": {e.subject.employee_code: index.students(employee_code=e.subject.employee_code) for e in index},
+    }
+
+
+def subject(code: str, component: str = "L", employee: str = "E1") -> RegisteredSubject:
+    return RegisteredSubject("Faculty", employee, "N", "REG", "REG", 4, code, component, "Subject", code, "N")
+
+
+def test_contents(index, responses):
+    assert len(index) == sum(len(r.subjects) for r in responses.values())
+    for (user, registration_id), r in responses.items():
+        assert index.registrations(user, registration_id) == r.subjects
+    assert index.registrations("nobody", "x") == []
+
+
+def test_find_matches_scan(index):
+    entries = list(index)
+    some = entries[len(entries) // 2].subject
+    for keys in [
+        {"subject_code": some.subject_code},
+        {"employee_code": some.employee_code},
+        {"subject_component_code": some.subject_component_code, "registration_id": entries[0].registration_id},
+        {"subject_code": some.subject_code, "employee_code": "nobody"},
+        {"registration_id": entries[-1].registration_id},
+    ]:
+        expected = [
+            e for e in entries
+            if all(getattr(e.subject, k, e.registration_id if k == "registration_id" else None) == v
+                   for k, v in keys.items())
+        ]
+        assert sorted(map(id, index.find(**keys))) == sorted(map(id, expected))
+
+
+def test_save_load(index, tmp_path):
+    path = str(tmp_path / "registrations.idx")
+    index.save(path)
+    loaded = RegistrationIndex.load(path)
+    assert len(loaded) == len(index)
+    assert snapshot(loaded) == snapshot(index)
+    assert loaded.to_bytes() == index.to_bytes()
+
+
+def test_load_shares_subjects(index, tmp_path):
+    path = str(tmp_path / "registrations.idx")
+    index.save(path)
+    loaded = RegistrationIndex.load(path)
+    by_fields = {}
+    for entry in loaded:
+        assert by_fields.setdefault(tuple(vars(entry.subject).values()), entry.subject) is entry.subject
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.idx"
+    path.write_bytes(b"not an index")
+    with pytest.raises(ValueError):
+        RegistrationIndex.load(str(path))
+
+
+def test_empty_round_trip():
+    assert len(RegistrationIndex.from_bytes(RegistrationIndex().to_bytes())) == 0
+
+
+def test_shared_subjects():
+    index = RegistrationIndex()
+    index.update("a", "S1", [subject("X1"), subject("X2")])
+    index.update("b", "S1", [subject("X1"), subject("X1", "T", "E2")])
+    a, b = index.registrations("a", "S1"), index.registrations("b", "S1")
+    assert a[0] is b[0]
+    assert index.students(subject_code="X1") == ["a", "b"]
+    assert index.students(employee_code="E2") == ["b"]
+    assert index.sections("X1") == {("L", "E1"): ["a", "b"], ("T", "E2"): ["b"]}
+
+
+def test_update(index, responses):
+    key, r = next(iter(responses.items()))
+    before = snapshot(index)
+    assert index.update(*key, r) is False
+    assert index.update(*key, list(r.subjects)) is False
+    assert snapshot(index) == before
+
+    assert index.update(*key, r.subjects[1:]) is True
+    assert index.registrations(*key) == r.subjects[1:]
+    assert len(index) == sum(len(x.subjects) for x in responses.values()) - 1
+
+
+def test_remove_cleans_up():
+    index = RegistrationIndex()
+    index.update("a", "S1", [subject("X1")])
+    index.update("a", "S2", [subject("X2", employee="E2")])
+    index.update("b", "S1", [subject("X1")])
+
+    index.remove("a", "S1")
+    assert index.students(subject_code="X1") == ["b"]
+    index.remove("b")
+    assert index.find(subject_code="X1") == []
+    assert index.find(registration_id="S1") == []
+    assert index.students(employee_code="E2") == ["a"]
+
+    index.remove("a")
+    assert len(index) == 0
+    assert not index._subjects and not index._holders and not index._by_subject and not index._by_registration
@@ -0,0 +1,144 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from pyjiit.default import CAPTCHA
+from pyjiit.exceptions import APIError
+from pyjiit.fakeportal import FakePortal
+from pyjiit.singleflight import AsyncSingleFlight, SingleFlight
+from pyjiit.wrapper import Webportal
+
+
+BANK = "/studentbankdetails/getstudentbankinfo"
+
+
+def login(portal, username: str, flight: SingleFlight) -> Webportal:
+    w = Webportal(portal.transport(), api=portal.url, singleflight=flight)
+    w.student_login(username, "password", CAPTCHA)
+    return w
+
+
+def concurrently(fn, n: int) -> list:
+    """Calls fn(i) on n threads at once, returns the results (or exceptions) in order of i"""
+    barrier = threading.Barrier(n)
+    def call(i):
+        barrier.wait()
+        try:
+            return fn(i)
+        except Exception as e:
+            return e
+    with ThreadPoolExecutor(n) as executor:
+        return list(executor.map(call, range(n)))
+
+
+def test_identical_calls_share_one_request(portal):
+    flight = SingleFlight()
+    clients = [login(portal, "user", flight) for _ in range(4)]
+    portal.latency = {BANK: 0.2}
+    before = portal.requests
+
+    results = concurrently(lambda i: clients[i % 4].get_student_bank_info(), 16)
+    assert portal.requests - before == 1
+    assert all(r == results[0] for r in results)
+    assert len(flight) == 0
+
+
+def test_errors_are_shared(portal):
+    client = login(portal, "user", SingleFlight())
+    portal.latency = {BANK: 0.2}
+    portal.error_rate = {BANK: 1.0}
+    before = portal.requests
+
+    results = concurrently(lambda i: client.get_student_bank_info(), 8)
+    assert portal.requests - before == 1
+    assert all(isinstance(r, APIError) for r in results)
+
+
+def test_other_users_are_not_coalesced(portal):
+    flight = SingleFlight()
+    clients = [login(portal, f"user{i}", flight) for i in range(4)]
+    portal.latency = {BANK: 0.2}
+    before = portal.requests
+
+    concurrently(lambda i: clients[i].get_student_bank_info(), 4)
+    assert portal.requests - before == 4
+
+
+def test_sequential_calls_are_not_cached(client, portal):
+    client.singleflight = SingleFlight()
+    before = portal.requests
+    client.get_student_bank_info()
+    client.get_student_bank_info()
+    assert portal.requests - before == 2
+
+
+def test_async_identical_calls_share_one_request():
+    pytest.importorskip("aiohttp")
+    from pyjiit.async_wrapper import AsyncWebportal
+    from pyjiit.transport import AiohttpTransport
+
+    async def run(portal):
+        transport = AiohttpTransport()
+        w = AsyncWebportal(transport, api=portal.url, singleflight=AsyncSingleFlight())
+        await w.student_login("user", "password", CAPTCHA)
+        before = portal.requests
+        results = await asyncio.gather(*[w.get_student_bank_info() for _ in range(16)])
+        await transport.close()
+        return portal.requests - before, results
+
+    with FakePortal(latency={BANK: 0.2}) as portal:
+        requests, results = asyncio.run(run(portal))
+    assert requests == 1
+    assert all(r == results[0] for r in results)
+
+
+def test_callers_get_their_own_results():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    def fetch():
+        started.set()
+        release.wait(5)
+        return {"response": {"banks": ["A"]}}
+
+    def call(i):
+        if i:
+            started.wait(5)
+        result = flight.do("key", fetch)
+        result["response"]["banks"].append(i) # every caller changes what it got
+        return result
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(call, i) for i in range(4)]
+        started.wait(5)
+        while flight._calls["key"].waiters < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert [r["response"]["banks"] for r in results] == [["A", i] for i in range(4)]
+
+
+def test_async_callers_get_their_own_results():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"response": {"banks": ["A"]}}
+
+    async def call(i):
+        result = await flight.do("key", fetch)
+        result["response"]["banks"].append(i)
+        return result
+
+    async def main():
+        return await asyncio.gather(*[call(i) for i in range(4)])
+
+    results = asyncio.run(main())
+    assert calls == [1]
+    assert [r["response"]["banks"] for r in results] == [["A", i] for i in range(4)]
@@ -0,0 +1,118 @@
+import sqlite3
+from datetime import timedelta
+
+import pytest
+
+from pyjiit.default import CAPTCHA
+from pyjiit.exceptions import VaultError
+from pyjiit.vault import SessionVault
+from pyjiit.wrapper import Webportal
+
+
+KEY = bytes(range(32))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def login(portal, username: str) -> Webportal:
+    w = Webportal(portal.transport(), api=portal.url)
+    w.student_login(username, "password", CAPTCHA)
+    return w
+
+
+def flip_byte(path):
+    # flips a bit of the last ciphertext byte of a stored session
+    db = sqlite3.connect(path)
+    rowid, blob = db.execute("SELECT rowid, data FROM sessions LIMIT 1").fetchone()
+    blob = bytearray(blob)
+    blob[-1] ^= 1
+    db.execute("UPDATE sessions SET data = ? WHERE rowid = ?", (bytes(blob), rowid))
+    db.commit()
+    db.close()
+
+
+def test_round_trip(portal, path):
+    w = login(portal, "user")
+    with SessionVault(path, KEY) as vault:
+        vault.save("user", w.session)
+    with SessionVault(path, KEY) as vault:
+        assert vault.load("user").to_json() == w.session.to_json()
+        assert vault.load("nobody") is None
+
+
+def test_restored_session_needs_no_login(portal, path):
+    with SessionVault(path, KEY) as vault:
+        vault.save("user", login(portal, "user").session)
+
+        logins = portal.logins
+        w = Webportal(portal.transport(), api=portal.url)
+        w.restore_session(vault, "user")
+        assert w.get_student_bank_info()
+        assert portal.logins == logins
+
+
+def test_restore_logs_in_without_a_session(portal, path):
+    with SessionVault(path, KEY) as vault:
+        w = Webportal(portal.transport(), api=portal.url)
+        assert w.restore_session(vault, "user") is None
+        assert w.restore_session(vault, "user", "password") is not None
+        assert vault.load("user") is not None
+
+
+def test_flipped_ciphertext_byte(portal, path):
+    with SessionVault(path, KEY) as vault:
+        vault.save("user", login(portal, "user").session)
+    flip_byte(path)
+    with SessionVault(path, KEY) as vault:
+        with pytest.raises(VaultError):
+            vault.load("user")
+        with pytest.raises(VaultError):
+            vault.load_all()
+
+
+def test_rows_can_not_be_swapped(portal, path):
+    with SessionVault(path, KEY) as vault:
+        vault.save_many({"a": login(portal, "a").session, "b": login(portal, "b").session})
+
+    db = sqlite3.connect(path)
+    (a, _), (_, b_data) = db.execute("SELECT key, data FROM sessions ORDER BY key").fetchall()
+    db.execute("UPDATE sessions SET data = ? WHERE key = ?", (b_data, a))
+    db.commit()
+    db.close()
+
+    with SessionVault(path, KEY) as vault:
+        with pytest.raises(VaultError):
+            vault.load_all()
+
+
+def test_wrong_key(path):
+    SessionVault(path, "correct horse").close()
+    with pytest.raises(VaultError):
+        SessionVault(path, "battery staple")
+    SessionVault(path, "correct horse").close()
+
+
+def test_bad_key_length(path):
+    with pytest.raises(VaultError):
+        SessionVault(path, b"short")
+
+
+def test_expiry(portal, path):
+    portal.token_ttl = 60
+    with SessionVault(path, KEY) as vault:
+        vault.save("user", login(portal, "user").session)
+        assert vault.load("user") is not None
+        assert vault.load("user", min_ttl=timedelta(minutes=5)) is None
+        assert vault.load_all(min_ttl=timedelta(minutes=5)) == {}
+        assert vault.purge_expired() == 0
+        assert len(vault) == 1
+
+
+def test_usernames_are_not_stored_in_clear(portal, path):
+    with SessionVault(path, KEY) as vault:
+        vault.save("21103000", login(portal, "21103000").session)
+    with open(path, "rb") as f:
+        assert b"21103000" not in f.read()